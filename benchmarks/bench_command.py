@@ -0,0 +1,56 @@
+"""Micro-benchmark of `Command` argument binding.
+
+Compares precompiled `BindingPlan` with per-call `inspect.signature` binding
+that `Command.execute()` used to perform, and shows the cost of measuring
+the command (`Riposte(metrics=MetricsSettings())`).
+
+    python -m benchmarks.bench_command
+"""
+import inspect
+import timeit
+
+from riposte.command import Command
+from riposte.metrics import CommandMetrics
+
+NUMBER = 100_000
+
+
+def handler(x: str, y: str, *args: str):
+    pass
+
+
+def signature_execute(command: Command, *args):
+    """Per-call introspection path replaced by `BindingPlan`."""
+    bound_arguments = inspect.signature(command._func).bind(*args)
+    processed = []
+    for name, value in bound_arguments.arguments.items():
+        values = (
+            value
+            if bound_arguments.signature.parameters[name].kind
+            is inspect.Parameter.VAR_POSITIONAL
+            else (value,)
+        )
+        for arg in values:
+            for guide in command._guides.get(name, []):
+                arg = guide(arg)
+            processed.append(arg)
+    return command._func(*processed)
+
+
+def main():
+    command = Command("foo", handler, "")
+    measured = Command("foo", handler, "")
+    measured.measure(CommandMetrics("foo"))
+    args = ("scoo", "bee", "doo", "bee")
+
+    for label, stmt in (
+        ("inspect.signature", lambda: signature_execute(command, *args)),
+        ("binding plan", lambda: command.execute(*args)),
+        ("measured", lambda: measured.execute(*args)),
+    ):
+        elapsed = min(timeit.repeat(stmt, number=NUMBER, repeat=5))
+        print(f"{label:>20}: {NUMBER / elapsed:>12,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
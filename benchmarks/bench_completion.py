@@ -0,0 +1,65 @@
+"""Completions/sec benchmark of command name completion.
+
+Compares the bisect based `CommandIndex` with scanning every command name
+with `startswith`, as `Riposte._raw_command_completer` used to do, and
+measures ranked search of `FuzzyIndex` (`CompletionStrategy.FUZZY`).
+
+    python -m benchmarks.bench_completion
+"""
+import timeit
+
+from riposte.completion import CommandIndex, HistoryUsage
+
+NUMBER = 2_000
+
+NAMES = [
+    f"{plugin}.{action}{idx}"
+    for plugin in ("git", "docker", "kube", "aws", "net")
+    for action in ("get", "set", "list", "delete")
+    for idx in range(500)
+]
+
+PREFIXES = ("git.list1", "kube.", "aws.set24", "missing")
+QUERIES = ("gtl12", "kubdel", "awsst499", "zzz")
+HISTORY = [f"git.list{idx} --all" for idx in range(100)]
+
+
+def linear_complete(names, prefix: str):
+    return [name for name in list(names) if name.startswith(prefix)]
+
+
+def main():
+    index = CommandIndex(NAMES)
+    commands = dict.fromkeys(NAMES)
+    for prefix in PREFIXES:
+        assert index.complete(prefix) == sorted(
+            linear_complete(commands, prefix)
+        )
+        for label, func in (
+            ("linear scan", lambda: linear_complete(commands, prefix)),
+            ("index", lambda: index.complete(prefix)),
+        ):
+            elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+            print(
+                f"{prefix:>10} {label:>12}: "
+                f"{NUMBER / elapsed:>14,.0f} completions/s"
+            )
+
+    fuzzy = index.fuzzy()
+    usage = HistoryUsage(HISTORY)
+    for query in QUERIES:
+        elapsed = min(
+            timeit.repeat(
+                lambda: fuzzy.search(query, usage),
+                number=NUMBER // 100,
+                repeat=5,
+            )
+        )
+        print(
+            f"{query:>10} {'fuzzy':>12}: "
+            f"{elapsed / (NUMBER // 100) * 1000:>14.2f} ms/completion"
+        )
+
+
+if __name__ == "__main__":
+    main()
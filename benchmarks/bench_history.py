@@ -0,0 +1,51 @@
+"""Search latency benchmark of the input history index.
+
+Compares `History.search` over 100k entries with scanning all of them, the
+way readline's reverse search does.
+
+    python -m benchmarks.bench_history
+"""
+import random
+import timeit
+
+from riposte.history import History
+
+NUMBER = 100
+LIMIT = 20
+
+WORDS = (
+    "git push pull ssh deploy kubectl get pods --all origin main docker run "
+    "-it ubuntu user@host"
+).split()
+
+QUERIES = ("kubectl get", "get pods --all", "ubuntu 777", "pods 1234", "zzz")
+
+
+def linear_search(entries, text: str):
+    return [entry for entry in reversed(entries) if text in entry][:LIMIT]
+
+
+def main():
+    generator = random.Random(0)
+    entries = [
+        f"{' '.join(generator.choices(WORDS, k=4))} {idx}"
+        for idx in range(100_000)
+    ]
+    history = History(entries)
+    elapsed = timeit.timeit(lambda: len(History(entries)), number=1)
+    print(f"{'indexing':>15}: {elapsed * 1000:>10.2f} ms")
+
+    for query in QUERIES:
+        for label, func in (
+            ("linear scan", lambda: linear_search(entries, query)),
+            ("index", lambda: history.search(query, LIMIT)),
+        ):
+            elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+            print(
+                f"{query:>15} {label:>12}: "
+                f"{elapsed / NUMBER * 1000:>10.3f} ms/search"
+            )
+
+
+if __name__ == "__main__":
+    main()
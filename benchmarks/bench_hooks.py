@@ -0,0 +1,80 @@
+"""Micro-benchmark of hooks composed into `Command.execute`.
+
+Shows the cost of executing a command with 0, 1 and 10 no-op hooks of every
+kind installed (`Riposte.hook`), compared with looking the hooks up on every
+call, and the cost of a whole line of input going through pre-parse hooks,
+parsing and execution.
+
+    python -m benchmarks.bench_hooks
+"""
+from pathlib import Path
+import tempfile
+import timeit
+
+from riposte import Riposte
+from riposte.command import Command
+from riposte.hooks import Hook
+
+NUMBER = 100_000
+HOOKS = (0, 1, 10)
+
+
+def handler(x: str, y: str):
+    pass
+
+
+def noop(*args):
+    pass
+
+
+def lookup_execute(command: Command, hooks: dict, *args):
+    """Hooks looked up per call, the path composition avoids."""
+    for hook in hooks.get(Hook.PRE_EXECUTE, ()):
+        hook(command, args)
+    try:
+        result = command.execute(*args)
+    except Exception as err:
+        for hook in hooks.get(Hook.ON_ERROR, ()):
+            hook(command, args, err)
+        raise
+    for hook in hooks.get(Hook.POST_EXECUTE, ()):
+        hook(command, args)
+    return result
+
+
+def hooked_repl(count: int) -> Riposte:
+    repl = Riposte(history_file=Path(tempfile.mkdtemp()) / ".riposte")
+    repl.command("foo")(handler)
+    for hook in Hook:
+        for _ in range(count):
+            repl.hook(hook)(noop)
+    return repl
+
+
+def dispatch(repl: Riposte, line: str):
+    for command, args in repl._resolve_input(line):
+        command.execute(*args)
+
+
+def main():
+    args = ("scoo", "bee")
+    for count in HOOKS:
+        repl = hooked_repl(count)
+        command = repl._commands["foo"]
+        plain = Command("foo", handler, "")
+        hooks = {hook: [noop] * count for hook in Hook}
+
+        for label, stmt in (
+            ("per-call lookup", lambda: lookup_execute(plain, hooks, *args)),
+            ("composed", lambda: command.execute(*args)),
+            ("line dispatch", lambda: dispatch(repl, "foo scoo bee")),
+        ):
+            elapsed = min(timeit.repeat(stmt, number=NUMBER, repeat=5))
+            print(
+                f"{count:>3} hooks {label:>16}: "
+                f"{NUMBER / elapsed:>12,.0f} calls/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Tokens/sec benchmark of the input line lexer.
+
+Compares single-pass `lexer.tokenize` with the two-pass `shlex` split that
+`Riposte._process` used to perform.
+
+    python -m benchmarks.bench_lexer
+"""
+import shlex
+import timeit
+
+from riposte import lexer
+
+NUMBER = 2_000
+
+LINES = {
+    "plain": "; ".join(f"scoo bee doo {idx} bee doo" for idx in range(20)),
+    "quoted": "; ".join(
+        f"scoo 'bee doo' \"{idx} bee\" doo\\ bee" for idx in range(20)
+    ),
+}
+
+
+def two_pass_tokenize(line: str):
+    commands = []
+    command = []
+    for element in shlex.split(line, posix=False):
+        if element[-1] == ";":
+            command.append(element[:-1])
+            commands.append(command)
+            command = []
+        else:
+            command.append(element)
+    if command:
+        commands.append(command)
+
+    return [shlex.split(" ".join(command)) for command in commands]
+
+
+def main():
+    for name, line in LINES.items():
+        tokens = sum(len(args) + 1 for _, args in lexer.tokenize(line))
+        for label, func in (
+            ("two-pass shlex", two_pass_tokenize),
+            ("lexer", lexer.tokenize),
+        ):
+            elapsed = min(
+                timeit.repeat(lambda: func(line), number=NUMBER, repeat=5)
+            )
+            print(
+                f"{name:>8} {label:>16}: "
+                f"{tokens * NUMBER / elapsed:>14,.0f} tokens/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Lines/sec benchmark of the printer thread.
+
+Compares batched `PrinterThread` with the thread printing every resource
+separately using builtin `print()`.
+
+    python -m benchmarks.bench_printer
+"""
+import os
+import time
+
+from riposte.printer.thread import PrinterThread, PrintResource
+
+LINES = 200_000
+
+
+class UnbatchedPrinterThread(PrinterThread):
+    def run(self):
+        while True:
+            resource = PrintResource(*self.queue.get())
+            print(
+                *resource.content,
+                sep=resource.sep,
+                end=resource.end,
+                file=resource.file,
+            )
+            resource.file.flush()
+            self.queue.task_done()
+
+
+def main():
+    with open(os.devnull, "w") as devnull:
+        resources = [
+            PrintResource(("scoo", "bee", idx), sep=" ", end="\n", file=devnull)
+            for idx in range(LINES)
+        ]
+
+        for label, printer_thread in (
+            ("print() per line", UnbatchedPrinterThread()),
+            ("batched", PrinterThread()),
+        ):
+            printer_thread.start()
+            start = time.perf_counter()
+            for resource in resources:
+                printer_thread.put(resource)
+            printer_thread.wait()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>20}: {LINES / elapsed:>12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Benchmark suite of the whole `Riposte` dispatch pipeline.
+
+Runs headless, input is fed by a fake input stream and output goes to
+`os.devnull`, so it can run in CI. Results are printed and optionally saved
+as JSON, which can be compared against a stored baseline:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --json results.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+    python -m benchmarks.suite --save benchmarks/baseline.json
+
+Comparison exits with status 1 if any benchmark got worse than the baseline
+by more than `--tolerance`. Baselines are machine specific, record one on
+the machine running the comparison. Speed of a pure Python reference loop
+is recorded along with the results and the baseline is scaled by it, so
+comparisons survive a change of CPU frequency or load between the runs.
+"""
+import argparse
+import atexit
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import typing
+
+from riposte import Riposte
+from riposte.printer.thread import PrinterThread, PrintResource
+
+TOLERANCE = 0.25
+LINES = 10_000
+CALLS = 20_000
+COMPLETIONS = 2_000
+PRINTED = 100_000
+COMMAND_COUNTS = (10, 1_000, 10_000)
+CALIBRATION = 1_000_000
+
+Result = typing.Dict[str, typing.Any]
+
+_workdir = Path(tempfile.mkdtemp(prefix="riposte-bench-"))
+# registered before any `Riposte`, so it runs after history is written
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+_devnull = open(os.devnull, "w")
+
+
+def best_of(
+    repeat: int,
+    run: typing.Callable[[], None],
+    setup: typing.Optional[typing.Callable[[], None]] = None,
+) -> float:
+    """The shortest time of `repeat` runs, `setup` isn't measured."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def throughput(count: int, elapsed: float, unit: str) -> Result:
+    return {"value": count / elapsed, "unit": f"{unit}/s"}
+
+
+def latency(count: int, elapsed: float) -> Result:
+    return {"value": elapsed / count * 1_000_000, "unit": "us"}
+
+
+def fake_input(lines: typing.Iterable[str]) -> typing.Iterator[typing.Callable]:
+    """Input stream delivering `lines` without a terminal."""
+    return ((lambda line=line: line) for line in lines)
+
+
+def make_repl(**kwargs: typing.Any) -> Riposte:
+    repl = Riposte(history_file=_workdir / ".riposte", **kwargs)
+    repl.pipelined = True  # no interactive prompt and history
+
+    @repl.command("foo")
+    def foo(x: int, y: int):
+        pass
+
+    @repl.command("bar")
+    def bar(name: str):
+        pass
+
+    @repl.command("echo")
+    def echo(*words: str):
+        repl.print(*words, file=_devnull)
+
+    return repl
+
+
+def dispatch(repl: Riposte, lines: typing.Sequence[str]) -> None:
+    repl.input_stream = fake_input(lines)
+    try:
+        while True:
+            repl._process()
+    except StopIteration:
+        pass
+
+
+def bench_dispatch(repeat: int) -> typing.Dict[str, Result]:
+    repl = make_repl()
+    variants = {
+        "cached": ["foo 1 2", "bar scoo", "foo 3 4"] * (LINES // 3),
+        "unique": [f"foo {idx} {idx + 1}" for idx in range(LINES)],
+        "chained": ["foo 1 2; bar 'scoo bee'; foo 3 4"] * LINES,
+    }
+
+    results = {}
+    for name, lines in variants.items():
+        elapsed = best_of(
+            repeat,
+            lambda: dispatch(repl, lines),
+            setup=repl._resolve.cache_clear,
+        )
+        results[f"dispatch.{name}"] = throughput(len(lines), elapsed, "lines")
+    return results
+
+
+def bench_guides(repeat: int) -> typing.Dict[str, Result]:
+    repl = Riposte(history_file=_workdir / ".riposte")
+
+    @repl.command("scalars")
+    def scalars(x: int, y: float, flag: bool):
+        pass
+
+    @repl.command("literals")
+    def literals(items: typing.List[int], options: typing.Dict[str, int]):
+        pass
+
+    variants = {
+        "scalar": (repl._commands["scalars"], ("1", "2.5", "true")),
+        "literal": (
+            repl._commands["literals"],
+            ("[1, 2, 3]", "{'scoo': 1, 'bee': 2}"),
+        ),
+    }
+
+    results = {}
+    for name, (command, args) in variants.items():
+
+        def run():
+            for _ in range(CALLS):
+                command.execute(*args)
+
+        elapsed = best_of(repeat, run)
+        results[f"guides.{name}"] = throughput(CALLS, elapsed, "calls")
+    return results
+
+
+def bench_completion(repeat: int) -> typing.Dict[str, Result]:
+    results = {}
+    for count in COMMAND_COUNTS:
+        repl = Riposte(history_file=_workdir / ".riposte")
+        for idx in range(count):
+            repl.command(f"cmd{idx}")(lambda: None)
+        prefixes = ("cmd1", "cmd42", "missing")
+
+        def run():
+            for _ in range(COMPLETIONS // len(prefixes)):
+                for prefix in prefixes:
+                    repl._call_completer(
+                        repl._raw_command_completer,
+                        prefix,
+                        prefix,
+                        0,
+                        len(prefix),
+                    )
+
+        elapsed = best_of(repeat, run)
+        total = COMPLETIONS // len(prefixes) * len(prefixes)
+        results[f"completion.commands_{count}"] = latency(total, elapsed)
+    return results
+
+
+def bench_printer(repeat: int) -> typing.Dict[str, Result]:
+    resources = [
+        PrintResource(("scoo", "bee", idx), sep=" ", end="\n", file=_devnull)
+        for idx in range(PRINTED)
+    ]
+    printer_thread = PrinterThread()
+    printer_thread.start()
+
+    def run():
+        for resource in resources:
+            printer_thread.put(resource)
+        printer_thread.wait()
+
+    elapsed = best_of(repeat, run)
+    return {"printer.lines": throughput(PRINTED, elapsed, "lines")}
+
+
+def bench_script(repeat: int) -> typing.Dict[str, Result]:
+    script = _workdir / "script.rpt"
+    script.write_text(
+        "".join(
+            f"foo {idx} {idx}\nbar 'scoo {idx}'\necho bee {idx} doo\n"
+            for idx in range(LINES // 3)
+        )
+    )
+    lines = LINES // 3 * 3
+
+    results = {}
+    for name, script_cache in (
+        ("plain", False),
+        ("compiled", _workdir / "cache"),
+    ):
+        repl = make_repl(script_cache=script_cache)
+        repl._printer_thread.start()
+
+        def setup():
+            repl.input_stream = repl._file_input(script)
+
+        def run():
+            repl._run_sequential()
+            repl._printer_thread.wait()
+
+        if script_cache:  # warm up the cache of the compiled script
+            setup()
+            run()
+        elapsed = best_of(repeat, run, setup)
+        results[f"script.{name}"] = throughput(lines, elapsed, "lines")
+    return results
+
+
+def calibrate(repeat: int) -> float:
+    """Iterations/sec of a reference loop, measuring speed of the machine."""
+
+    def run():
+        total = 0
+        for idx in range(CALIBRATION):
+            total += idx % 7
+
+    return CALIBRATION / best_of(repeat, run)
+
+
+BENCHMARKS = (
+    bench_dispatch,
+    bench_guides,
+    bench_completion,
+    bench_printer,
+    bench_script,
+)
+
+
+def run_all(repeat: int) -> Result:
+    results: typing.Dict[str, Result] = {}
+    for benchmark in BENCHMARKS:
+        results.update(benchmark(repeat))
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration": calibrate(repeat),
+        "results": results,
+    }
+
+
+def higher_is_better(result: Result) -> bool:
+    return result["unit"].endswith("/s")
+
+
+def compare(
+    current: Result, baseline: Result, tolerance: float
+) -> typing.List[str]:
+    """Names of the benchmarks which got worse than `tolerance` allows."""
+    speed = current["calibration"] / baseline["calibration"]
+    print(f"{'machine speed vs baseline':<28} {speed:>14.2f}x")
+
+    regressions = []
+    for name, result in current["results"].items():
+        expected = baseline["results"].get(name)
+        if expected is None:
+            continue
+
+        if higher_is_better(result):
+            change = result["value"] / (expected["value"] * speed) - 1
+        else:
+            change = expected["value"] / (result["value"] * speed) - 1
+        if change < -tolerance:
+            regressions.append(name)
+        print(
+            f"{name:<28} {expected['value']:>14,.2f} -> "
+            f"{result['value']:>14,.2f} {result['unit']:<9} {change:>+8.1%}"
+        )
+    return regressions
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results as JSON")
+    parser.add_argument("--save", type=Path, help="store results as baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to compare to")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    arguments = parser.parse_args(argv)
+
+    current = run_all(arguments.repeat)
+    for path in (arguments.json, arguments.save):
+        if path is not None:
+            path.write_text(json.dumps(current, indent=2) + "\n")
+
+    if arguments.compare is None:
+        for name, result in current["results"].items():
+            print(f"{name:<28} {result['value']:>14,.2f} {result['unit']}")
+        return 0
+
+    baseline = json.loads(arguments.compare.read_text())
+    regressions = compare(current, baseline, arguments.tolerance)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,2 @@
+from .aio import AsyncRiposte  # noqa
 from .riposte import Riposte  # noqa
@@ -0,0 +1,282 @@
+import asyncio
+import inspect
+import queue
+import signal
+import threading
+import typing
+
+from .exceptions import RiposteException, StopRiposteException
+from .printer import OverflowPolicy, PrinterSettings
+from .printer.loop import LoopPrinter
+from .printer.mixins import capture_output
+from .riposte import Riposte
+
+if typing.TYPE_CHECKING:
+    from .command import Command
+
+_EXHAUSTED = object()  # input stream has no more input
+
+
+def _next_input(input_stream: typing.Iterator[typing.Callable]) -> typing.Any:
+    try:
+        return next(input_stream)()
+    except StopIteration:  # can't be set as a result of a future
+        return _EXHAUSTED
+
+
+def _resolve(
+    future: asyncio.Future,
+    result: typing.Any,
+    err: typing.Optional[BaseException],
+) -> None:
+    if future.done():  # cancelled with Ctrl-C
+        return
+    if err is None:
+        future.set_result(result)
+    else:
+        future.set_exception(err)
+
+
+class _InputReader(threading.Thread):
+    """Thread reading interactive input on request, one for the session.
+
+    Reading can't be interrupted, so if the future waiting for input is
+    cancelled, the line being read is delivered to the next request instead.
+    Daemon, so the app doesn't wait for input at exit.
+    """
+
+    def __init__(self, read: typing.Callable[[], typing.Any]):
+        super().__init__(name="riposte-input")
+        self.daemon = True
+        self._read = read
+        self._requests: "queue.SimpleQueue[None]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._waiting: typing.Optional[
+            typing.Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = None
+        self._reading = False
+
+    def request(self, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        """Future of the next input."""
+        future = loop.create_future()
+        with self._lock:
+            self._waiting = (loop, future)
+            if not self._reading:
+                self._reading = True
+                self._requests.put(None)
+        return future
+
+    def run(self) -> None:
+        while True:
+            self._requests.get()
+            try:
+                result, err = self._read(), None
+            except BaseException as exc:
+                result, err = None, exc
+
+            with self._lock:
+                self._reading = False
+                (loop, future), self._waiting = self._waiting, None
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, err)
+            except RuntimeError:  # loop has been closed in the meantime
+                pass
+
+
+class AsyncRiposte(Riposte):
+    """`Riposte` driven by its event loop.
+
+    Input is read in a helper thread, so the loop keeps running while the
+    user is typing, and output is written by the loop itself (`LoopPrinter`).
+    Interactive input is processed line by line, same as with `Riposte`,
+    `Ctrl-C` discards the current line, tasks started by the handlers keep
+    running in the background.
+    Commands from `-c` and file input run as concurrent tasks, at most
+    `concurrency` at once. Output of each such command is printed at once,
+    in the order the commands complete.
+
+    Regular (non-coroutine) handlers are called directly on the loop, so
+    they block every other command until they return.
+    """
+
+    def __init__(self, *args, concurrency: int = 64, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.concurrency = concurrency
+        self._tasks: typing.Set[asyncio.Task] = set()
+        self._stopped = False
+        self._input_reader: typing.Optional[_InputReader] = None
+        self._line: typing.Optional[asyncio.Future] = None
+        self._interrupted = False
+
+    @staticmethod
+    def _make_printer(settings: PrinterSettings) -> LoopPrinter:
+        """`LoopPrinter`, its queue is unbounded, so it can't overflow."""
+        overflow = settings.overflow
+        if settings.queue_size or overflow is not OverflowPolicy.BLOCK:
+            raise ValueError(
+                "AsyncRiposte doesn't support queue_size and overflow "
+                "of the printer"
+            )
+        return LoopPrinter(latency=settings.latency)
+
+    async def _read_input(self) -> typing.Any:
+        """Get next input without blocking the loop."""
+        if self.pipelined:  # already in memory, no reason for a thread
+            return _next_input(self.input_stream)
+
+        if self._input_reader is None:
+            self._input_reader = _InputReader(
+                lambda: _next_input(self.input_stream)
+            )
+            self._input_reader.start()
+        return await self._input_reader.request(asyncio.get_running_loop())
+
+    async def _execute_async(
+        self, command: "Command", args: typing.Sequence[str]
+    ) -> None:
+        result = command.execute(*args)
+        if inspect.isgenerator(result):
+            for item in result:
+                self.print(item)
+        elif inspect.isasyncgen(result):
+            async for item in result:
+                self.print(item)
+        elif inspect.isawaitable(result):
+            await result
+
+    async def _run_task(
+        self,
+        command: "Command",
+        args: typing.Sequence[str],
+        slots: asyncio.Semaphore,
+        line_number: typing.Optional[int],
+    ) -> None:
+        try:
+            with capture_output() as resources:
+                try:
+                    await self._execute_async(command, args)
+                except RiposteException as err:
+                    err.line_number = line_number
+                    self._report(err)
+                except StopRiposteException as err:
+                    err.line_number = line_number
+                    self._report(err)
+                    self._stop()
+            for resource in resources:
+                self._printer_thread.put(resource)
+        finally:
+            slots.release()
+
+    def _stop(self) -> None:
+        self._stopped = True
+        for task in self._tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    async def _submit(
+        self,
+        command: "Command",
+        args: typing.Sequence[str],
+        slots: asyncio.Semaphore,
+    ) -> None:
+        await slots.acquire()
+        if self._stopped:
+            slots.release()
+            return
+
+        task = asyncio.create_task(
+            self._run_task(command, args, slots, self._line_number())
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process_async(self, slots: asyncio.Semaphore) -> bool:
+        """Process single line of input, `False` once there is no more."""
+        user_input = await self._read_input()
+        if user_input is _EXHAUSTED:
+            return False
+        if not user_input:
+            return True
+
+        self._record_history(user_input)
+        try:
+            for command, args in self._resolve_input(user_input):
+                if self.pipelined:
+                    await self._submit(command, args, slots)
+                else:
+                    await self._execute_async(command, args)
+        except (RiposteException, StopRiposteException) as err:
+            err.line_number = self._line_number()
+            raise
+        return True
+
+    def _interrupt(self) -> None:
+        """Discard the current line, as `Ctrl-C` does in `Riposte`."""
+        if self._line is not None and not self._line.done():
+            self._interrupted = True
+            self._line.cancel()
+
+    def _handle_interrupts(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """Handle `Ctrl-C` per line of interactive input, if possible."""
+        if self.pipelined:
+            return False
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._interrupt)
+        except (NotImplementedError, RuntimeError, ValueError):
+            return False  # e.g. Windows or not the main thread
+        return True
+
+    async def _run_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._printer_thread.loop = loop
+        slots = asyncio.Semaphore(self.concurrency)
+        self._stopped = False
+        interrupts = self._handle_interrupts(loop)
+
+        try:
+            while not self._stopped:
+                try:
+                    if self.pipelined:
+                        more = await self._process_async(slots)
+                    else:
+                        self._line = asyncio.ensure_future(
+                            self._process_async(slots)
+                        )
+                        more = await self._line
+                    if not more:
+                        break
+                except asyncio.CancelledError:
+                    if not self._interrupted:
+                        raise
+                    self._interrupted = False
+                    self.print()
+                except RiposteException as err:
+                    self._report(err)
+                except StopRiposteException as err:
+                    self._report(err)
+                    self._stop()
+                except EOFError:
+                    self.print()
+                    break
+                finally:
+                    self._line = None
+                    if not self.pipelined:
+                        self._printer_thread.wait()
+
+            results = await asyncio.gather(
+                *self._tasks, return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        finally:
+            if interrupts:
+                loop.remove_signal_handler(signal.SIGINT)
+            self._printer_thread.wait()
+            self._printer_thread.loop = None
+
+    def _run_sequential(self) -> None:
+        try:
+            self.loop.run_until_complete(self._run_async())
+        except KeyboardInterrupt:  # without per line handling of Ctrl-C
+            self.print()
@@ -1,8 +1,75 @@
+import functools
 import inspect
-from typing import Callable, Dict, Iterable, List, Sequence
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from .exceptions import CommandError
-from .guides import extract_guides
+from .guides import compose, compose_batch, extract_guides
+from .hooks import with_hooks
+
+if TYPE_CHECKING:
+    from .metrics import CommandMetrics
+    from .profiling import Profiler
+
+STDIN = "stdin"  # keyword-only parameter receiving piped items
+
+
+async def _as_coroutine(awaitable: Awaitable) -> Any:
+    """Wrap any awaitable returned by handler into coroutine."""
+    return await awaitable
+
+
+async def _emit_async(items: AsyncIterator, emit: Callable) -> None:
+    async for item in items:
+        emit(item)
+
+
+def _consume(result: Any, emit: Callable, run: Callable) -> None:
+    """Finish execution of handling function which returned `result`.
+
+    Items of generators are passed to `emit` one by one, as they are
+    produced. Awaitables and asynchronous generators are wrapped into
+    coroutine and handed over to `run`. Any other result is ignored.
+    """
+    if inspect.isgenerator(result):
+        for item in result:
+            emit(item)
+    elif inspect.isasyncgen(result):
+        run(_emit_async(result, emit))
+    elif inspect.isawaitable(result):
+        run(_as_coroutine(result))
+
+
+class BindingPlan(NamedTuple):
+    """Precompiled recipe for binding raw arguments to handling function.
+
+    Computed once, when `Command` is registered, so that `execute()`
+    doesn't have to introspect handling function's signature on every call.
+    """
+
+    min_arity: int
+    max_arity: Optional[int]  # `None` means unbounded (`*args`)
+    guides: Tuple[Optional[Callable], ...]  # per positional parameter
+    var_positional: Optional[int]  # index where `*args` starts
+    var_guide: Optional[Callable]  # converts all `*args` values at once
+    required: Tuple[str, ...]  # names of required positional parameters
+    required_keyword: Optional[str]  # first keyword-only param w/o default
+    accepts_stdin: bool  # has keyword-only `stdin` parameter
+    requires_stdin: bool  # ... without default value
 
 
 class Command:
@@ -18,10 +85,14 @@ class Command:
 
         self._func = func
         self._completer_function = None
+        self.metrics: Optional["CommandMetrics"] = None
+        self.profiler: Optional["Profiler"] = None
+        self._hooks: Tuple[Tuple[Callable, ...], ...] = ((), (), ())
 
         self._guides = extract_guides(self._func)
         self._guides.update(guides if guides else {})
         self._validate_guides()
+        self._plan = self._compile_binding_plan()
 
     def _validate_guides(self) -> None:
         """Validate guides setup.
@@ -46,67 +117,205 @@ class Command:
                         f"callable not {type(guide)}"
                     )
 
-    def _process_arguments(self, name: str, *args) -> List:
-        """Process each argument according to selected chain of guides
-
-        Process each argument according to selected chain of guides. Each
-        guide from the collection is applied to the every argument.
-        Guide as input uses output from previous guide e.g.
+    def _compile_binding_plan(self) -> BindingPlan:
+        """Compile handling function's signature into `BindingPlan`."""
+        guides = []
+        required = []
+        var_positional = None
+        var_guide = None
+        required_keyword = None
+        accepts_stdin = requires_stdin = False
 
-            guide_3(guide_2(guide_1("scoo")))
-
-        """
-        processed = []
-        for arg in args:
-            for guide in self._guides.get(name, []):
-                arg = guide(arg)
-            processed.append(arg)
+        for parameter in inspect.signature(self._func).parameters.values():
+            chain = tuple(self._guides.get(parameter.name, ()))
+            guide = compose(chain)
+            if parameter.kind in (
+                inspect.Parameter.POSITIONAL_ONLY,
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            ):
+                guides.append(guide)
+                if parameter.default is inspect.Parameter.empty:
+                    required.append(parameter.name)
+            elif parameter.kind is inspect.Parameter.VAR_POSITIONAL:
+                var_positional = len(guides)
+                var_guide = compose_batch(chain)
+            elif (
+                parameter.kind is inspect.Parameter.KEYWORD_ONLY
+                and parameter.name == STDIN
+            ):
+                accepts_stdin = True
+                requires_stdin = parameter.default is inspect.Parameter.empty
+            elif (
+                parameter.kind is inspect.Parameter.KEYWORD_ONLY
+                and parameter.default is inspect.Parameter.empty
+                and required_keyword is None
+            ):
+                required_keyword = parameter.name
 
-        return processed
+        return BindingPlan(
+            min_arity=len(required),
+            max_arity=None if var_positional is not None else len(guides),
+            guides=tuple(guides),
+            var_positional=var_positional,
+            var_guide=var_guide,
+            required=tuple(required),
+            required_keyword=required_keyword,
+            accepts_stdin=accepts_stdin,
+            requires_stdin=requires_stdin,
+        )
 
-    def _apply_guides(self, bound_arguments: inspect.BoundArguments) -> List:
+    def _apply_guides(self, args: Sequence[str]) -> List:
         """Apply guide functions.
 
         Apply guide functions to values of type `str` delivered by user
-        using `input()`.
+        using `input()`. Each guide from the chain is applied to the
+        argument. Guide as input uses output from previous guide e.g.
+
+            guide_3(guide_2(guide_1("scoo")))
+
+        Chains are composed into single function per parameter, values of
+        `*args` are converted by a single batch call (see `compose_batch`).
 
         Assumes that `args` have been already validated `_bind_arguments`,
         hence `args` is matching `_func` signature, (`args <= parameters`)
 
         """
-        processed = []
-        for name, value in bound_arguments.arguments.items():
-            if (
-                bound_arguments.signature.parameters[name].kind
-                is inspect.Parameter.VAR_POSITIONAL
-            ):
-                arguments = self._process_arguments(name, *value)
-            else:
-                arguments = self._process_arguments(name, value)
+        plan = self._plan
+        processed = [
+            arg if guide is None else guide(arg)
+            for guide, arg in zip(plan.guides, args)
+        ]
 
-            processed.extend(arguments)
+        if plan.var_positional is not None:
+            var_args = args[plan.var_positional :]
+            if plan.var_guide is None:
+                processed.extend(var_args)
+            else:
+                processed.extend(plan.var_guide(var_args))
 
         return processed
 
-    def _bind_arguments(self, *args) -> inspect.BoundArguments:
-        """Check whether given `args` match `_func` signature."""
-        try:
-            return inspect.signature(self._func).bind(*args)
-        except TypeError as e:
-            raise CommandError(e)
+    def _bind_arguments(self, *args, piped: bool = False) -> Tuple[str, ...]:
+        """Check whether given `args` match `_func` signature.
 
-    def execute(self, *args: str) -> None:
+        Error messages mirror the ones raised by `inspect.Signature.bind`.
+        """
+        plan = self._plan
+        if plan.max_arity is not None and len(args) > plan.max_arity:
+            raise CommandError("too many positional arguments")
+        if len(args) < plan.min_arity:
+            raise CommandError(
+                f"missing a required argument: {plan.required[len(args)]!r}"
+            )
+        if plan.required_keyword is not None:
+            raise CommandError(
+                f"missing a required argument: {plan.required_keyword!r}"
+            )
+        if plan.requires_stdin and not piped:
+            raise CommandError(f"missing a required argument: {STDIN!r}")
+        return args
+
+    @property
+    def accepts_stdin(self) -> bool:
+        """Whether items can be piped into the command."""
+        return self._plan.accepts_stdin
+
+    def execute(self, *args: str, stdin: Optional[Iterator] = None) -> Any:
         """Execute handling function (`self._func`) bound to command.
 
         In case of argument mismatch during function call we want to give
-        user informative feedback that's why we are wrapping
-        `TypeError` with `CommandError`.
+        user informative feedback that's why we are raising `CommandError`
+        instead of letting `TypeError` through.
+
+        If handling function is a coroutine function, returned awaitable
+        has to be awaited by the caller, see `_consume`.
 
+        Items piped into the command are passed as `stdin` keyword argument.
+
+        """
+        if stdin is None:
+            return self._func(*self._apply_guides(self._bind_arguments(*args)))
+
+        args = self._apply_guides(self._bind_arguments(*args, piped=True))
+        return self._func(*args, **{STDIN: stdin})
+
+    def measure(self, metrics: "CommandMetrics") -> None:
+        """Record calls, errors and durations of executions in `metrics`.
+
+        Swaps `execute` for its measured version, so commands which aren't
+        measured don't pay for it.
+        """
+        self.metrics = metrics
+        self._compose()
+
+    def set_hooks(
+        self,
+        pre_execute: Iterable[Callable] = (),
+        post_execute: Iterable[Callable] = (),
+        on_error: Iterable[Callable] = (),
+    ) -> None:
+        """Call hooks around every execution, see `Hook`.
+
+        Hooks are composed with `execute` right away, instead of being
+        looked up on every call, so commands without hooks don't pay for
+        them at all.
         """
-        return self._func(*self._apply_guides(self._bind_arguments(*args)))
+        self._hooks = (tuple(pre_execute), tuple(post_execute), tuple(on_error))
+        self._compose()
+
+    def profile(self, profiler: Optional["Profiler"]) -> None:
+        """Profile executions with `profiler`, stop profiling if `None`."""
+        self.profiler = profiler
+        self._compose()
+
+    def _compose(self) -> None:
+        """Swap `execute` for its measured and profiled version with hooks."""
+        execute = None
+        if self.metrics is not None:
+            execute = self._execute_measured
+        if self.profiler is not None:
+            execute = self.profiler.wrap(
+                execute or functools.partial(Command.execute, self)
+            )
+        if any(self._hooks):
+            execute = with_hooks(
+                self,
+                execute or functools.partial(Command.execute, self),
+                *self._hooks,
+            )
+
+        if execute is None:
+            self.__dict__.pop("execute", None)
+        else:
+            self.execute = execute
+
+    def _execute_measured(
+        self, *args: str, stdin: Optional[Iterator] = None
+    ) -> Any:
+        metrics = self.metrics
+        metrics.called()
+        start = perf_counter()
+        try:
+            args = self._apply_guides(
+                self._bind_arguments(*args, piped=stdin is not None)
+            )
+            guided = perf_counter()
+            metrics.guides.observe(guided - start)
+            if stdin is None:
+                result = self._func(*args)
+            else:
+                result = self._func(*args, **{STDIN: stdin})
+        except Exception as err:
+            metrics.failed(err)
+            raise
+
+        return metrics.measure_result(result, perf_counter() - guided)
 
     def complete(self, *args, **kwargs) -> Sequence:
-        """Execute completer function bound to this command."""
+        """Execute completer function bound to this command.
+
+        Coroutine completer functions return awaitable, see `Riposte._await`.
+        """
 
         if not self._completer_function:
             return ()
@@ -129,3 +338,55 @@ class Command:
 
     def __eq__(self, other):
         return all((self.name == other.name, self._func is other._func))
+
+
+def _iterate(command: Command, result: Any) -> Iterator:
+    """Turn `result` of the command into items piped into the next one."""
+    if result is None:
+        return iter(())
+    if inspect.isasyncgen(result) or inspect.isawaitable(result):
+        raise CommandError(
+            f"Command '{command.name}': asynchronous output can't be piped"
+        )
+    try:
+        return iter(result)
+    except TypeError:
+        raise CommandError(
+            f"Command '{command.name}': output can't be piped, "
+            f"'{type(result).__name__}' is not iterable"
+        )
+
+
+class Pipeline:
+    """Commands connected with pipes, executed as if it was one command.
+
+    Every command gets items produced by the previous one as `stdin`, items
+    flow lazily, one by one, if the commands are generators. `execute()`
+    takes arguments of every stage and returns result of the last one.
+    """
+
+    def __init__(self, commands: Sequence[Command]):
+        self.commands = tuple(commands)
+        self.name = " | ".join(command.name for command in self.commands)
+
+        for command in self.commands[1:]:
+            if not command.accepts_stdin:
+                raise CommandError(
+                    f"Command '{command.name}' doesn't accept piped input"
+                )
+
+    def execute(self, *stages: Sequence[str]) -> Any:
+        previous, *rest = self.commands
+        result = previous.execute(*stages[0])
+        for command, args in zip(rest, stages[1:]):
+            result = command.execute(*args, stdin=_iterate(previous, result))
+            previous = command
+        return result
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Pipeline) and self.commands == other.commands
+        )
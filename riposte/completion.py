@@ -0,0 +1,476 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent import futures
+from enum import Enum
+import functools
+import heapq
+import sys
+import threading
+import time
+import typing
+
+
+_SEPARATORS = frozenset("._-:/ ")
+_RESCALE = 1e100  # usage is scaled down before it would overflow
+
+
+class CompletionStrategy(Enum):
+    """How `Riposte` matches command names against the typed text."""
+
+    PREFIX = "prefix"  # names starting with the text, alphabetically
+    FUZZY = "fuzzy"  # names containing characters of the text, ranked
+
+
+class CompletionSettings(typing.NamedTuple):
+    """Settings of completion.
+
+    `strategy` decides how command names are matched. Setting `ttl` (in
+    seconds) caches results of completers, up to `cache_size` of them, see
+    `CompletionCache` for `timeout`. With `prefetch`, once a single match
+    is completed, the rest of the line is completed in the background.
+    """
+
+    strategy: CompletionStrategy = CompletionStrategy.PREFIX
+    ttl: float = 0.0
+    cache_size: int = 256
+    timeout: typing.Optional[float] = None
+    prefetch: bool = False
+
+
+def _prefix_range(
+    names: typing.Sequence[str], prefix: str
+) -> typing.Tuple[int, int]:
+    """Bounds of the slice of sorted `names` starting with `prefix`."""
+    start = bisect_left(names, prefix)
+    if not prefix:
+        return start, len(names)
+
+    last = ord(prefix[-1])
+    if last < sys.maxunicode:
+        # the smallest string sorted after every string starting with prefix
+        upper = prefix[:-1] + chr(last + 1)
+        return start, bisect_left(names, upper, start)
+
+    end = start
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return start, end
+
+
+class IndexView(ABC):
+    """Read-only, sorted collection of command names.
+
+    Prefix lookups take `O(log n + k)` time, where `k` is the number of
+    matches, instead of scanning every command name on each TAB press.
+    """
+
+    _fuzzy: typing.Optional[typing.Tuple[int, "FuzzyIndex"]] = None
+
+    @abstractmethod
+    def _sorted(self) -> typing.List[str]:
+        """Names in alphabetical order."""
+
+    def complete(self, prefix: str) -> typing.List[str]:
+        """Names starting with `prefix`, in alphabetical order."""
+        names = self._sorted()
+        start, end = _prefix_range(names, prefix)
+        return names[start:end]
+
+    def view(self, predicate: typing.Callable[[str], bool]) -> "FilteredView":
+        """Live view of names for which `predicate` returns `True`."""
+        return FilteredView(self, predicate)
+
+    def fuzzy(self) -> "FuzzyIndex":
+        """`FuzzyIndex` of the names, rebuilt only when they change."""
+        version = self.version
+        if self._fuzzy is None or self._fuzzy[0] != version:
+            self._fuzzy = (version, FuzzyIndex(self._sorted()))
+        return self._fuzzy[1]
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """Incremented every time the set of names changes."""
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        names = self._sorted()
+        idx = bisect_left(names, name)
+        return idx < len(names) and names[idx] == name
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._sorted())
+
+    def __len__(self) -> int:
+        return len(self._sorted())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._sorted()!r})"
+
+
+class CommandIndex(IndexView):
+    """Sorted array of command names kept up to date by `Riposte.command`."""
+
+    def __init__(self, names: typing.Iterable[str] = ()):
+        self._names = sorted(set(names))
+        self._version = 0
+
+    def _sorted(self) -> typing.List[str]:
+        return self._names
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def add(self, name: str) -> None:
+        idx = bisect_left(self._names, name)
+        if idx == len(self._names) or self._names[idx] != name:
+            self._names.insert(idx, name)
+            self._version += 1
+
+    def discard(self, name: str) -> None:
+        idx = bisect_left(self._names, name)
+        if idx < len(self._names) and self._names[idx] == name:
+            del self._names[idx]
+            self._version += 1
+
+
+class FilteredView(IndexView):
+    """Subset of another index selected with a predicate.
+
+    Filtered names are cached and recomputed only when the underlying index
+    changes, so the predicate should depend on the name alone. For state
+    dependent completion create one view per state up front and pick the
+    right one in `Riposte.contextual_complete`.
+    """
+
+    def __init__(
+        self, index: IndexView, predicate: typing.Callable[[str], bool]
+    ):
+        self.index = index
+        self.predicate = predicate
+        self._names: typing.List[str] = []
+        self._version: typing.Optional[int] = None
+
+    @property
+    def version(self) -> int:
+        return self.index.version
+
+    def _sorted(self) -> typing.List[str]:
+        version = self.index.version
+        if self._version != version:
+            self._names = [name for name in self.index if self.predicate(name)]
+            self._version = version
+        return self._names
+
+
+def _char_mask(text: str) -> int:
+    """Bit set of characters in `text`, folded into 64 bits."""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _score_from(query: str, candidate: str, start: int) -> float:
+    """Score of `query` matched greedily starting at `start` position."""
+    score = 0.0
+    previous = None
+    position = start
+    for char in query:
+        position = candidate.find(char, position)
+        if position == -1:
+            return -1.0
+
+        score += 1
+        if position == 0:
+            score += 3
+        elif candidate[position - 1] in _SEPARATORS:
+            score += 2
+        if previous is not None:
+            if position == previous + 1:
+                score += 3
+            else:
+                score -= 0.1 * (position - previous - 1)
+        previous = position
+        position += 1
+
+    return score
+
+
+def _head_chars(candidate: str) -> typing.FrozenSet[str]:
+    """Characters at the beginning of `candidate` and right after separators."""
+    return frozenset(
+        char
+        for idx, char in enumerate(candidate)
+        if not idx or candidate[idx - 1] in _SEPARATORS
+    )
+
+
+def fuzzy_score(query: str, candidate: str) -> typing.Optional[float]:
+    """Score `candidate` containing every character of `query` in order.
+
+    Matches at the beginning of the candidate, right after separators (e.g.
+    `.` of namespaced commands) and consecutive ones score higher, gaps and
+    long candidates lower. `None` if `query` is not a subsequence.
+    """
+    if not query:
+        return 0.0
+
+    best = None
+    start = candidate.find(query[0])
+    while start != -1:
+        score = _score_from(query, candidate, start)
+        if score < 0:  # won't fit any later start either
+            break
+        if best is None or score > best:
+            best = score
+        start = candidate.find(query[0], start + 1)
+
+    if best is None:
+        return None
+    return best - 0.01 * len(candidate)
+
+
+class HistoryUsage(typing.Mapping[str, float]):
+    """Ranking bonus of commands used in the input history.
+
+    Use of a command counts less with every newer line of input, by half
+    every `half_life` lines, and the bonus never exceeds `weight`. Usage is
+    updated as lines are added, the oldest first, so looking a bonus up
+    doesn't depend on the length of the history.
+    """
+
+    def __init__(
+        self,
+        lines: typing.Iterable[str] = (),
+        weight: float = 3.0,
+        half_life: float = 10.0,
+    ):
+        self.weight = weight
+        self._growth = 2 ** (1 / half_life)
+        self._scale = 1.0  # use in the newest line, older ones are relative
+        self._usage: typing.Dict[str, float] = {}
+        for line in lines:
+            self.add(line)
+
+    def add(self, line: str) -> None:
+        """Count commands used in a new line of input."""
+        if not line:
+            return
+
+        self._scale *= self._growth
+        for command in line.split(";"):
+            name = command.split(maxsplit=1)
+            if name:
+                self._usage[name[0]] = (
+                    self._usage.get(name[0], 0.0) + self._scale
+                )
+
+        if self._scale > _RESCALE:  # forget usage which no longer counts
+            self._usage = {
+                name: usage / self._scale
+                for name, usage in self._usage.items()
+                if usage / self._scale > 1 / _RESCALE
+            }
+            self._scale = 1.0
+
+    def __getitem__(self, name: str) -> float:
+        return min(self._usage[name] / self._scale, self.weight)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._usage)
+
+    def __len__(self) -> int:
+        return len(self._usage)
+
+
+class FuzzyIndex:
+    """Command names prepared for fuzzy matching.
+
+    Lower cased names and bit sets of their characters are computed up
+    front, so most of the candidates are rejected with a single bitwise
+    operation and only the remaining ones are scored.
+    """
+
+    def __init__(self, names: typing.Iterable[str]):
+        self.names = list(names)
+        self._lowered = [name.lower() for name in self.names]
+        self._masks = [_char_mask(name) for name in self._lowered]
+        self._heads: typing.Optional[typing.List[typing.FrozenSet[str]]] = None
+
+    def _score_char(
+        self, char: str, usage: typing.Mapping[str, float]
+    ) -> typing.List[typing.Tuple[float, int, str]]:
+        """Scores of single character query, same as `fuzzy_score` gives.
+
+        Short queries match most of the names, the best placement of single
+        character is known from the characters starting the name and its
+        parts, without scoring every occurrence.
+        """
+        if self._heads is None:
+            self._heads = [_head_chars(name) for name in self._lowered]
+
+        scored = []
+        for name, lowered, heads in zip(self.names, self._lowered, self._heads):
+            if char in heads:
+                score = 4.0 if lowered[0] == char else 3.0
+            elif char in lowered:
+                score = 1.0
+            else:
+                continue
+            score -= 0.01 * len(lowered)
+            scored.append((-score - usage.get(name, 0.0), len(name), name))
+        return scored
+
+    def search(
+        self,
+        query: str,
+        usage: typing.Optional[typing.Mapping[str, float]] = None,
+        limit: typing.Optional[int] = None,
+    ) -> typing.List[str]:
+        """Names matching `query`, the best first.
+
+        Score of the match is increased by the `usage` bonus of the name
+        (see `HistoryUsage`), ties are broken in favour of shorter names.
+        """
+        query = query.lower()
+        usage = usage or {}
+        if len(query) == 1:
+            scored = self._score_char(query, usage)
+        else:
+            scored = self._score(query, usage)
+
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, scored)
+        else:
+            ranked = sorted(scored)
+        return [name for *_, name in ranked]
+
+    def _score(
+        self, query: str, usage: typing.Mapping[str, float]
+    ) -> typing.List[typing.Tuple[float, int, str]]:
+        query_mask = _char_mask(query)
+        scored = []
+        for name, lowered, mask in zip(self.names, self._lowered, self._masks):
+            if mask & query_mask != query_mask:
+                continue
+            score = fuzzy_score(query, lowered)
+            if score is not None:
+                scored.append((-score - usage.get(name, 0.0), len(name), name))
+        return scored
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class CompletionCache:
+    """LRU cache of completer results expiring after `ttl` seconds.
+
+    Completers are called on helper threads, so the same completion is never
+    computed twice at once. If `timeout` is set, the caller waits at most
+    that long and gets the stale result (or no completions at all) while the
+    fresh one is still being computed, it's cached once ready.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        maxsize: int = 256,
+        timeout: typing.Optional[float] = None,
+        workers: int = 2,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.workers = workers
+
+        self._entries: typing.Dict[
+            typing.Hashable, typing.Tuple[float, typing.Sequence[str]]
+        ] = OrderedDict()
+        self._pending: typing.Dict[typing.Hashable, futures.Future] = {}
+        self._lock = threading.Lock()
+        self._executor: typing.Optional[futures.ThreadPoolExecutor] = None
+
+    def _lookup(
+        self, key: typing.Hashable
+    ) -> typing.Tuple[typing.Optional[typing.Sequence[str]], bool]:
+        """Cached result (if any) and whether it's still fresh."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+
+        created, result = entry
+        return result, time.monotonic() - created < self.ttl
+
+    def _store(self, key: typing.Hashable, future: futures.Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            self._entries[key] = (time.monotonic(), future.result())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def fetch(
+        self,
+        key: typing.Hashable,
+        compute: typing.Callable[[], typing.Sequence[str]],
+    ) -> futures.Future:
+        """Compute fresh result in the background unless it's in progress."""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="riposte-complete"
+                )
+            future = self._pending[key] = self._executor.submit(compute)
+
+        # outside of the lock, callback runs right away if already done
+        future.add_done_callback(functools.partial(self._store, key))
+        return future
+
+    def get(
+        self,
+        key: typing.Hashable,
+        compute: typing.Callable[[], typing.Sequence[str]],
+    ) -> typing.Sequence[str]:
+        """Cached result if fresh, otherwise computed one (see `timeout`)."""
+        result, fresh = self._lookup(key)
+        if fresh:
+            return result
+
+        future = self.fetch(key, compute)
+        try:
+            return future.result(self.timeout)
+        except futures.TimeoutError:
+            return result if result is not None else []
+
+    def prefetch(
+        self,
+        key: typing.Hashable,
+        compute: typing.Callable[[], typing.Sequence[str]],
+    ) -> None:
+        """Warm up the cache without waiting for the result."""
+        if not self._lookup(key)[1]:
+            self.fetch(key, compute)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self) -> None:
+        """Stop helper threads, completions in progress are abandoned."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
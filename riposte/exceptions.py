@@ -15,6 +15,10 @@ class CommandError(RiposteException):
     pass
 
 
+class JobCancelled(RiposteException):
+    pass
+
+
 class GuideError(RiposteException):
     def __init__(self, value: str, guide: Callable):
         self.value = value
@@ -1,8 +1,38 @@
 import ast
-from typing import Any, AnyStr, Callable, Dict, Text, Tuple
+from enum import Enum
+import functools
+from pathlib import Path
+import sys
+from typing import (
+    Any,
+    AnyStr,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
 from riposte.exceptions import GuideError
 
+BOOLEAN_TRUE = frozenset(("1", "true", "yes", "y", "on"))
+BOOLEAN_FALSE = frozenset(("0", "false", "no", "n", "off"))
+
+if sys.version_info >= (3, 10):
+    from types import UnionType
+
+    UNION_TYPES = (Union, UnionType)
+else:
+    UNION_TYPES = (Union,)
+
+CONTAINER_TYPES = (list, tuple, set, frozenset, dict)
+
 
 def literal(value: str) -> Any:
     try:
@@ -18,15 +48,357 @@ def encode(value: str) -> Any:
         raise GuideError(value, encode)
 
 
-def get_guides(annotation) -> Tuple[Callable]:
-    """Based on given annotation get chain of guides."""
+def integer(value: str) -> int:
+    try:
+        return int(value)
+    except Exception:
+        raise GuideError(value, integer)
+
+
+def floating(value: str) -> float:
+    try:
+        return float(value)
+    except Exception:
+        raise GuideError(value, floating)
+
+
+def complex_number(value: str) -> complex:
+    try:
+        return complex(value)
+    except Exception:
+        raise GuideError(value, complex_number)
+
+
+def boolean(value: str) -> bool:
+    normalized = value.lower()
+    if normalized in BOOLEAN_TRUE:
+        return True
+    elif normalized in BOOLEAN_FALSE:
+        return False
+
+    raise GuideError(value, boolean)
+
+
+def path(value: str) -> Path:
+    return Path(value)
+
+
+# guides doing nothing more than the builtin, see `compose_batch`
+_BUILTIN_GUIDES: Dict[Callable, Callable] = {
+    encode: str.encode,
+    integer: int,
+    floating: float,
+    complex_number: complex,
+    path: Path,
+}
+
+
+def enumeration(enum: Type[Enum]) -> Callable:
+    """Build guide resolving member of `enum` by its name or value."""
+
+    def guide(value: str) -> Enum:
+        try:
+            return enum[value]
+        except KeyError:
+            pass
+
+        for member in enum:
+            if str(member.value) == value:
+                return member
+
+        raise GuideError(value, guide)
+
+    guide.__name__ = enum.__name__
+    return guide
+
+
+def _type_name(annotation) -> str:
+    if isinstance(annotation, type) and not get_args(annotation):
+        return annotation.__name__
+    return repr(annotation).replace("typing.", "")
+
+
+def _scalar_converter(type_: type, *accepted: type) -> Callable:
+    def convert(value: Any) -> Any:
+        if isinstance(value, bool) and bool not in accepted:
+            raise TypeError(value)
+        if not isinstance(value, accepted):
+            raise TypeError(value)
+        return type_(value)
+
+    return convert
+
+
+def _enum_converter(enum: Type[Enum]) -> Callable:
+    guide = enumeration(enum)
+
+    def convert(value: Any) -> Enum:
+        try:
+            return enum(value)
+        except ValueError:
+            return guide(str(value))
+
+    return convert
+
+
+def _instance_converter(type_: type) -> Callable:
+    def convert(value: Any) -> Any:
+        if not isinstance(value, type_):
+            raise TypeError(value)
+        return value
+
+    return convert
+
+
+def _union_converter(converters: Tuple[Callable, ...]) -> Callable:
+    def convert(value: Any) -> Any:
+        for converter in converters:
+            try:
+                return converter(value)
+            except Exception:
+                continue
+        raise TypeError(value)
+
+    return convert
+
+
+def _sequence_converter(
+    container: type, item: Callable, accepted: Tuple[type, ...]
+) -> Callable:
+    def convert(value: Any) -> Any:
+        if not isinstance(value, accepted):
+            raise TypeError(value)
+        return container(map(item, value))
+
+    return convert
+
+
+def _tuple_converter(items: Tuple[Callable, ...]) -> Callable:
+    def convert(value: Any) -> tuple:
+        if not isinstance(value, tuple) or len(value) != len(items):
+            raise TypeError(value)
+        return tuple(item(element) for item, element in zip(items, value))
+
+    return convert
+
+
+def _dict_converter(key: Callable, item: Callable) -> Callable:
+    def convert(value: Any) -> dict:
+        if not isinstance(value, dict):
+            raise TypeError(value)
+        return {key(k): item(v) for k, v in value.items()}
+
+    return convert
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+SCALAR_CONVERTERS: Dict[type, Callable] = {
+    bool: _scalar_converter(bool, bool),
+    int: _scalar_converter(int, int),
+    float: _scalar_converter(float, int, float),
+    complex: _scalar_converter(complex, int, float, complex),
+    str: _scalar_converter(str, str),
+    bytes: _scalar_converter(bytes, bytes),
+    type(None): _instance_converter(type(None)),
+    Path: _scalar_converter(Path, str, Path),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _converter(annotation) -> Callable:
+    """Build function converting value parsed by `literal` to `annotation`.
+
+    Used for elements of typed containers, hence it operates on Python
+    objects, not on raw strings delivered by the user.
+    """
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+
+    if annotation is Any:
+        return _identity
+    elif origin in UNION_TYPES:
+        return _union_converter(tuple(map(_converter, args)))
+    elif origin is tuple and args and args[-1] is not Ellipsis:
+        return _tuple_converter(tuple(map(_converter, args)))
+    elif origin is tuple and args:
+        return _sequence_converter(tuple, _converter(args[0]), (tuple,))
+    elif origin is frozenset and args:
+        return _sequence_converter(
+            frozenset, _converter(args[0]), (set, frozenset)
+        )
+    elif origin in (list, set) and args:
+        return _sequence_converter(origin, _converter(args[0]), (origin,))
+    elif origin is dict and args:
+        key, item = args
+        return _dict_converter(_converter(key), _converter(item))
+    elif origin in CONTAINER_TYPES:
+        return _instance_converter(origin)
+    elif annotation in SCALAR_CONVERTERS:
+        return SCALAR_CONVERTERS[annotation]
+    elif isinstance(annotation, type) and issubclass(annotation, Enum):
+        return _enum_converter(annotation)
+    elif isinstance(annotation, type) and annotation is not object:
+        return _instance_converter(annotation)
+
+    return _identity  # `Any`, type variables and other typing constructs
+
+
+def typed_literal(annotation) -> Callable:
+    """Build guide interpreting value as a literal of generic `annotation`.
+
+    e.g. `List[int]` guide accepts "[1, 2, 3]" and checks type of every
+    element in the list.
+    """
+    convert = _converter(annotation)
+
+    def guide(value: str) -> Any:
+        try:
+            return convert(ast.literal_eval(value))
+        except Exception:
+            raise GuideError(value, guide)
+
+    guide.__name__ = _type_name(annotation)
+    return guide
+
+
+def union(annotation) -> Callable:
+    """Build guide trying chains of guides of every `Union` member.
+
+    The first chain that succeeds wins, `None` is picked for "None" value
+    if it is one of the members.
+    """
+    members = get_args(annotation)
+    optional = type(None) in members
+    chains = [
+        get_guides(member) for member in members if member is not type(None)
+    ]
+
+    def guide(value: str) -> Any:
+        if optional and value == "None":
+            return None
+
+        for chain in chains:
+            try:
+                processed = value
+                for member_guide in chain:
+                    processed = member_guide(processed)
+                return processed
+            except Exception:
+                continue
+
+        raise GuideError(value, guide)
+
+    guide.__name__ = _type_name(annotation)
+    return guide
+
+
+GUIDES: Dict[type, Tuple[Callable, ...]] = {
+    bytes: (encode,),
+    int: (integer,),
+    float: (floating,),
+    complex: (complex_number,),
+    bool: (boolean,),
+    Path: (path,),
+}
+
+
+def register_guide(type_: type, *guides: Callable) -> None:
+    """Use given chain of guides for parameters annotated with `type_`."""
+    GUIDES[type_] = guides
+    _resolve_guides.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_guides(annotation) -> Tuple[Callable]:
+    origin = get_origin(annotation)
 
     if annotation in (str, AnyStr, Text):
         return ()
-    elif annotation is bytes:
-        return (encode,)
-    else:
-        return (literal,)
+    elif origin in UNION_TYPES:
+        return (union(annotation),)
+    elif origin in CONTAINER_TYPES and get_args(annotation):
+        return (typed_literal(annotation),)
+    elif isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            return (enumeration(annotation),)
+
+        for type_ in annotation.__mro__:
+            if type_ in GUIDES:
+                return GUIDES[type_]
+
+    return (literal,)
+
+
+def get_guides(annotation) -> Tuple[Callable]:
+    """Based on given annotation get chain of guides.
+
+    Scalar types are dispatched to dedicated converters (also for their
+    subclasses), parametrized containers e.g. `List[int]` and unions get
+    guide composed out of their members, everything else falls back to
+    `literal`. Resolved chains are cached per annotation.
+    """
+    try:
+        return _resolve_guides(annotation)
+    except TypeError:  # unhashable annotation
+        return _resolve_guides.__wrapped__(annotation)
+
+
+def compose(guides: Sequence[Callable]) -> Optional[Callable]:
+    """Compose chain of guides into a single function.
+
+    Returns `None` for an empty chain, so the caller can skip calling it.
+    """
+    if not guides:
+        return None
+    elif len(guides) == 1:
+        return guides[0]
+
+    def composed(value: str) -> Any:
+        for guide in guides:
+            value = guide(value)
+        return value
+
+    return composed
+
+
+def compose_batch(
+    guides: Sequence[Callable],
+) -> Optional[Callable[[Sequence[Any]], List[Any]]]:
+    """Compose chain of guides into a function converting many values at once.
+
+    Leading guides which only wrap a builtin (`integer`, `floating`, ...)
+    are applied to all the values by a single `map()` of the builtin, the
+    rest of the chain value by value. If a builtin fails, values are
+    converted one by one again, so the failing guide reports the value.
+    Returns `None` for an empty chain, same as `compose`.
+    """
+    if not guides:
+        return None
+
+    count = 0
+    while count < len(guides) and guides[count] in _BUILTIN_GUIDES:
+        count += 1
+    builtins = tuple(_BUILTIN_GUIDES[guide] for guide in guides[:count])
+    composed = compose(guides)
+    rest = compose(guides[count:])
+
+    if not builtins:
+        return lambda values: list(map(composed, values))
+
+    def convert(values: Sequence[Any]) -> List[Any]:
+        converted = values
+        try:
+            for builtin in builtins:
+                converted = list(map(builtin, converted))
+        except Exception:
+            # start over from the original values, not the converted ones
+            return list(map(composed, values))
+        return converted if rest is None else list(map(rest, converted))
+
+    return convert
 
 
 def extract_guides(func: Callable) -> Dict[str, Tuple[Callable]]:
@@ -0,0 +1,322 @@
+from array import array
+from collections import OrderedDict
+import contextlib
+import heapq
+import itertools
+import os
+from pathlib import Path
+import threading
+import typing
+
+try:
+    import fcntl
+except ImportError:  # e.g. Windows, sessions aren't synchronized there
+    fcntl = None
+
+from .completion import CommandIndex
+
+_LIBEDIT_HEADER = "_HiStOrY_V2_"
+_BLOCK_SIZE = 64 * 1024
+_GRAM = 3  # length of substrings indexed by `History`
+_BULK = 64  # pending entries making rebuild of the prefix index cheaper
+_SCAN_RATIO = 8  # scanning an entry costs about as much as 8 index postings
+
+
+@contextlib.contextmanager
+def _locked(file: typing.IO, exclusive: bool) -> typing.Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class HistoryFile:
+    """Append-only history file shared by concurrent sessions.
+
+    Every entry is appended under an exclusive lock as soon as it's entered,
+    instead of rewriting the whole file at exit, so sessions don't overwrite
+    each other's history. Only the tail of the file holding the last
+    `length` distinct entries is read at start-up. Once the rest of the file
+    gets `compact_factor` times bigger than that, it's rewritten in a
+    background thread with duplicates and the oldest entries removed.
+    """
+
+    def __init__(
+        self, path: Path, length: int = 100, compact_factor: float = 2.0
+    ):
+        self.path = Path(path)
+        self.length = length
+        self.compact_factor = compact_factor
+
+        self._last: typing.Optional[str] = None
+        self._compactor: typing.Optional[threading.Thread] = None
+
+    def _replaced(self, file: typing.IO) -> bool:
+        """Whether `file` has been replaced by compaction since opened."""
+        try:
+            return os.fstat(file.fileno()).st_ino != os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _read_tail(
+        self, file: typing.IO
+    ) -> typing.Tuple[typing.List[str], int]:
+        """Read the last `length` distinct entries from the end of the file.
+
+        Returns them (the oldest first) with the number of bytes read.
+        """
+        end = position = file.seek(0, os.SEEK_END)
+        entries: typing.List[str] = []
+        seen: typing.Set[str] = set()
+        remainder = b""
+
+        while position > 0 and len(entries) < self.length:
+            size = min(_BLOCK_SIZE, position)
+            position -= size
+            file.seek(position)
+            lines = (file.read(size) + remainder).split(b"\n")
+            # the first line might continue in the preceding block
+            remainder = lines.pop(0) if position > 0 else b""
+
+            for raw in reversed(lines):
+                entry = raw.decode("utf-8", "replace")
+                if entry and entry != _LIBEDIT_HEADER and entry not in seen:
+                    seen.add(entry)
+                    entries.append(entry)
+                    if len(entries) == self.length:
+                        break
+
+        entries.reverse()
+        return entries, end - position
+
+    def load(self) -> typing.List[str]:
+        """Last `length` distinct entries, the oldest first."""
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+
+        with file, _locked(file, exclusive=False):
+            entries, tail_size = self._read_tail(file)
+            size = file.seek(0, os.SEEK_END)
+
+        if size > self.compact_factor * max(tail_size, _BLOCK_SIZE):
+            self.compact_in_background()
+        return entries
+
+    def append(self, entry: str) -> None:
+        """Write entry at the end of the file, right away."""
+        if not entry or entry == self._last:
+            return
+
+        self._last = entry
+        data = f"{entry}\n".encode("utf-8")
+        while True:
+            with open(self.path, "ab", buffering=0) as file, _locked(
+                file, exclusive=True
+            ):
+                if not self._replaced(file):
+                    file.write(data)
+                    return
+
+    def compact(self) -> None:
+        """Rewrite the file with the last `length` distinct entries only."""
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        with file, _locked(file, exclusive=True):
+            if self._replaced(file):  # already compacted by another session
+                return
+
+            entries, _ = self._read_tail(file)
+            temporary = self.path.with_name(
+                f".{self.path.name}.{os.getpid()}.tmp"
+            )
+            with open(temporary, "w", encoding="utf-8") as compacted:
+                compacted.writelines(f"{entry}\n" for entry in entries)
+            os.replace(temporary, self.path)
+
+    def _compact_quietly(self) -> None:
+        try:
+            self.compact()
+        except OSError:  # history is still usable, just bigger than needed
+            pass
+
+    def compact_in_background(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+
+        self._compactor = threading.Thread(
+            target=self._compact_quietly, name="riposte-history"
+        )
+        self._compactor.daemon = True  # interrupted compaction changes nothing
+        self._compactor.start()
+
+
+def _grams(text: str) -> typing.Set[str]:
+    return {text[idx : idx + _GRAM] for idx in range(len(text) - _GRAM + 1)}
+
+
+class History:
+    """Input history indexed for substring and prefix searches.
+
+    Every distinct entry is indexed once, by its trigrams and in a sorted
+    array for prefix lookups, entering it again only makes it the most
+    recent one. Indexing is incremental: entries given at start-up are
+    indexed on the first search, new ones as they come.
+    """
+
+    def __init__(self, entries: typing.Iterable[str] = ()):
+        self._source = iter(entries)
+        self._pending: typing.List[str] = []
+
+        self._entries: typing.List[str] = []  # distinct, by the first use
+        self._ids: typing.Dict[str, int] = {}
+        self._used: typing.List[int] = []  # sequence number of the last use
+        self._recent: typing.Dict[str, None] = OrderedDict()  # the newest last
+        self._trigrams: typing.Dict[str, array] = {}
+        self._prefixes = CommandIndex()
+        self._sequence = itertools.count()
+
+    def append(self, entry: str) -> None:
+        if entry:
+            self._pending.append(entry)
+
+    def _add(self, entry: str) -> bool:
+        """Index the entry, return `True` if it's a new one."""
+        used = next(self._sequence)
+        entry_id = self._ids.get(entry)
+        if entry_id is not None:
+            self._used[entry_id] = used
+            self._recent.move_to_end(entry)
+            return False
+
+        entry_id = self._ids[entry] = len(self._entries)
+        self._entries.append(entry)
+        self._used.append(used)
+        self._recent[entry] = None
+        for gram in _grams(entry):
+            postings = self._trigrams.get(gram)
+            if postings is None:
+                postings = self._trigrams[gram] = array("L")
+            postings.append(entry_id)
+        return True
+
+    def _index_pending(self) -> None:
+        pending = [*self._source, *self._pending]
+        self._pending.clear()
+        if not pending:
+            return
+
+        new = [entry for entry in pending if self._add(entry)]
+        if len(new) > _BULK:
+            self._prefixes = CommandIndex(self._entries)
+        else:
+            for entry in new:
+                self._prefixes.add(entry)
+
+    def _ranked(
+        self, entry_ids: typing.Iterable[int], limit: typing.Optional[int]
+    ) -> typing.List[str]:
+        if limit is None:
+            ranked = sorted(entry_ids, key=self._used.__getitem__, reverse=True)
+        else:
+            ranked = heapq.nlargest(
+                limit, entry_ids, key=self._used.__getitem__
+            )
+        return [self._entries[entry_id] for entry_id in ranked]
+
+    def _scan(
+        self,
+        text: str,
+        limit: typing.Optional[int],
+        budget: typing.Optional[int] = None,
+    ) -> typing.List[str]:
+        """Look for `text` starting from the newest of `budget` entries."""
+        recent = itertools.islice(reversed(self._recent), budget)
+        matches = (entry for entry in recent if text in entry)
+        return list(itertools.islice(matches, limit))
+
+    def recent(self, limit: typing.Optional[int] = None) -> typing.List[str]:
+        """Distinct entries, the most recently used first."""
+        self._index_pending()
+        return list(itertools.islice(reversed(self._recent), limit))
+
+    def search(
+        self, text: str, limit: typing.Optional[int] = None
+    ) -> typing.List[str]:
+        """Distinct entries containing `text`, the most recently used first.
+
+        Only entries holding every trigram of `text` are checked. Texts too
+        short to have any are looked up starting from the newest entry, so
+        are common ones until `limit` matches are found or scanning gets
+        about as expensive as the index lookup.
+        """
+        self._index_pending()
+        if len(text) < _GRAM:
+            return self._scan(text, limit)
+
+        postings = sorted(
+            (self._trigrams.get(gram, ()) for gram in _grams(text)), key=len
+        )
+        if limit is not None:
+            # common text is found among the recent entries sooner, scan at
+            # most as many entries as the index would start with
+            matches = self._scan(text, limit, len(postings[0]))
+            if len(matches) == limit:
+                return matches
+
+        candidates = set(postings[0])
+        for entry_ids in postings[1:]:
+            # checking the candidates is cheaper than narrowing them down
+            if len(candidates) * _SCAN_RATIO < len(entry_ids):
+                break
+            candidates.intersection_update(entry_ids)
+
+        return self._ranked(
+            (
+                entry_id
+                for entry_id in candidates
+                if text in self._entries[entry_id]
+            ),
+            limit,
+        )
+
+    def prefix_search(
+        self, prefix: str, limit: typing.Optional[int] = None
+    ) -> typing.List[str]:
+        """Distinct entries starting with `prefix`, the most recent first."""
+        self._index_pending()
+        if not prefix:
+            return self.recent(limit)
+
+        return self._ranked(
+            (self._ids[entry] for entry in self._prefixes.complete(prefix)),
+            limit,
+        )
+
+    def complete(
+        self, text: str, line: str, start_index: int, end_index: int
+    ) -> typing.List[str]:
+        """Completer suggesting words entered previously in the same place.
+
+        Suitable for `Riposte.complete`, e.g. `ssh us<TAB>` suggests hosts
+        of the recent `ssh user@host` entries.
+        """
+        words = {}
+        for entry in self.prefix_search(line[:end_index]):
+            word = entry[start_index:].split(maxsplit=1)
+            if word:
+                words.setdefault(word[0], None)
+        return list(words)
+
+    def __len__(self) -> int:
+        self._index_pending()
+        return len(self._entries)
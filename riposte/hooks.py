@@ -0,0 +1,148 @@
+from enum import Enum
+import functools
+import inspect
+import typing
+
+if typing.TYPE_CHECKING:
+    from .command import Command
+
+
+class Hook(Enum):
+    """Points of the execution where `Riposte.hook` functions are called.
+
+    * `PRE_PARSE` - `hook(line)` gets every line of input before it's parsed
+      and may return the line to parse instead (lines of compiled scripts
+      are tokenized already, so they're skipped),
+    * `PRE_EXECUTE` - `hook(command, args)` before the command is executed,
+      raising an exception prevents the execution,
+    * `POST_EXECUTE` - `hook(command, args)` once the command is done,
+      including consumption of the generator or coroutine it returns,
+    * `ON_ERROR` - `hook(command, args, err)` when the command fails, the
+      error is raised again afterwards.
+    """
+
+    PRE_PARSE = "pre_parse"
+    PRE_EXECUTE = "pre_execute"
+    POST_EXECUTE = "post_execute"
+    ON_ERROR = "on_error"
+
+
+def _finish(
+    result: typing.Any,
+    done: typing.Callable[[], None],
+    failed: typing.Callable[[Exception], None],
+) -> typing.Any:
+    """Call `done` or `failed` once handler's `result` is consumed."""
+    if inspect.isgenerator(result):
+        return _finish_generator(result, done, failed)
+    if inspect.isasyncgen(result):
+        return _finish_async_generator(result, done, failed)
+    if inspect.isawaitable(result):
+        return _finish_awaitable(result, done, failed)
+
+    done()
+    return result
+
+
+def _finish_generator(
+    items: typing.Generator, done: typing.Callable, failed: typing.Callable
+) -> typing.Generator:
+    try:
+        yield from items
+    except Exception as err:
+        failed(err)
+        raise
+    done()
+
+
+async def _finish_async_generator(
+    items: typing.AsyncGenerator,
+    done: typing.Callable,
+    failed: typing.Callable,
+) -> typing.AsyncGenerator:
+    try:
+        async for item in items:
+            yield item
+    except Exception as err:
+        failed(err)
+        raise
+    finally:
+        await items.aclose()
+    done()
+
+
+async def _finish_awaitable(
+    awaitable: typing.Awaitable, done: typing.Callable, failed: typing.Callable
+) -> typing.Any:
+    try:
+        result = await awaitable
+    except Exception as err:
+        failed(err)
+        raise
+    done()
+    return result
+
+
+def with_hooks(
+    command: "Command",
+    execute: typing.Callable,
+    pre_execute: typing.Tuple[typing.Callable, ...],
+    post_execute: typing.Tuple[typing.Callable, ...],
+    on_error: typing.Tuple[typing.Callable, ...],
+) -> typing.Callable:
+    """Compose execution hooks and `execute` into a single function."""
+
+    def done(args: typing.Tuple[str, ...]) -> None:
+        for hook in post_execute:
+            hook(command, args)
+
+    def failed(args: typing.Tuple[str, ...], err: Exception) -> None:
+        for hook in on_error:
+            hook(command, args, err)
+
+    def execute_with_hooks(*args: str, stdin: typing.Any = None) -> typing.Any:
+        for hook in pre_execute:
+            hook(command, args)
+        try:
+            if stdin is None:
+                result = execute(*args)
+            else:
+                result = execute(*args, stdin=stdin)
+        except Exception as err:
+            failed(args, err)
+            raise
+
+        if result is None:  # most handlers just print
+            done(args)
+            return None
+        return _finish(
+            result,
+            functools.partial(done, args),
+            functools.partial(failed, args),
+        )
+
+    if post_execute or on_error:
+        return execute_with_hooks
+
+    def execute_with_pre_hooks(*args: str, **kwargs: typing.Any) -> typing.Any:
+        for hook in pre_execute:
+            hook(command, args)
+        return execute(*args, **kwargs)
+
+    return execute_with_pre_hooks
+
+
+def with_pre_parse(
+    resolve: typing.Callable, hooks: typing.Tuple[typing.Callable, ...]
+) -> typing.Callable:
+    """Compose pre-parse hooks and `resolve` into a single function."""
+
+    def resolve_with_hooks(user_input: typing.Any) -> typing.Any:
+        if isinstance(user_input, str):
+            for hook in hooks:
+                line = hook(user_input)
+                if line is not None:
+                    user_input = line
+        return resolve(user_input)
+
+    return resolve_with_hooks
@@ -1,8 +1,32 @@
+import hashlib
 import itertools
+import locale
+import marshal
+import mmap
+import os
 from pathlib import Path
-from typing import Callable, Generator
+import stat
+import struct
+import sys
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Collection,
+    Generator,
+    Iterable,
+    Optional,
+    Union,
+)
 
-from riposte.exceptions import StopRiposteException
+from riposte import lexer
+from riposte.exceptions import RiposteException, StopRiposteException
+
+SCRIPT_CACHE_VERSION = 2
+SCRIPT_CACHE_SUFFIX = ".rpstc"
+SKIP_CHUNK_SIZE = 1024 * 1024
+
+_RECORD = struct.Struct("<I")  # size of the marshalled record which follows
 
 
 def prompt_input(prompt: Callable) -> Generator[Callable, None, None]:
@@ -15,11 +39,376 @@ def cli_input(inline_commands: str) -> Generator[Callable, None, None]:
     yield lambda: inline_commands
 
 
-def file_input(path: Path) -> Generator[Callable, None, None]:
-    """Read file and translate it into input stream"""
+class FileInput:
+    """Input stream reading memory-mapped file line by line.
+
+    Instead of yielding new function per line the stream yields itself,
+    calling it returns the current line. Position of the current line is
+    tracked (`line_number`, `line_offset`), so in case of failure reading
+    can be resumed from any byte offset with a new stream.
+
+    Anything but a regular file (named pipe, `/dev/stdin`, process
+    substitution) can't be memory-mapped, it's read through a buffer
+    instead, skipping bytes up to `offset`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        offset: int = 0,
+        line_number: int = 0,
+        encoding: Optional[str] = None,
+        end: Optional[int] = None,
+    ):
+        self.path = path
+        self.end = end  # byte offset where the stream stops
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.offset = offset  # byte offset of the next line
+        self.line_offset = offset  # byte offset of the current line
+        self.line_number = line_number  # number of the current line
+
+        self._buffer = None
+        self._size = 0
+        self._line = ""
+        self._stream: Optional[BinaryIO] = None  # not a regular file
+        self._pending = b""  # rest of the stream's line after lone "\r"
+
+    def _open(self) -> None:
+        try:
+            file_handler = open(self.path, "rb")
+            if not stat.S_ISREG(os.fstat(file_handler.fileno()).st_mode):
+                self._open_stream(file_handler)  # pipes can't be reopened
+                return
+            with file_handler:
+                file_handler.seek(0, 2)
+                self._size = file_handler.tell()
+                if self.end is not None:
+                    self._size = min(self._size, self.end)
+                self._buffer = (
+                    mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+                    if self._size
+                    else b""
+                )
+        except Exception:
+            self.close()
+            raise StopRiposteException(
+                f"Problem with reading the file: {self.path}"
+            )
+
+    def _open_stream(self, file_handler: BinaryIO) -> None:
+        self._stream = file_handler
+        self._buffer = b""
+        remaining = self.offset
+        while remaining > 0:
+            chunk = self._stream.read(min(remaining, SKIP_CHUNK_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        self.offset -= remaining  # stream ended before `offset`
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._buffer = b""
+        self._size = 0
+        self._pending = b""
+
+    def _read_mapped(self, start: int) -> bytes:
+        if start >= self._size:
+            return b""
+
+        newline = self._buffer.find(b"\n", start, self._size)
+        end = self._size if newline == -1 else newline + 1
+        carriage = self._buffer.find(b"\r", start, end)
+        if carriage != -1 and carriage != newline - 1:
+            end = carriage + 1
+        return self._buffer[start:end]
+
+    def _read_stream(self, start: int) -> bytes:
+        if self._stream is None:
+            return b""
+
+        data, self._pending = self._pending, b""
+        if not data:
+            limit = -1 if self.end is None else self.end - start
+            data = self._stream.readline(limit) if limit else b""
+        carriage = data.find(b"\r")
+        if carriage != -1 and data[carriage:] != b"\r\n":
+            data, self._pending = data[: carriage + 1], data[carriage + 1 :]
+        return data
+
+    def __iter__(self) -> "FileInput":
+        return self
+
+    def __next__(self) -> "FileInput":
+        if self._buffer is None:
+            self._open()
+
+        start = self.offset
+        # universal newlines, "\r\n" and lone "\r" end the line as "\n" does
+        try:
+            data = (
+                self._read_stream(start)
+                if self._stream is not None
+                else self._read_mapped(start)
+            )
+        except OSError:
+            self.close()
+            raise StopRiposteException(
+                f"Problem with reading the file: {self.path}"
+            )
+        if not data:
+            self.close()
+            raise StopIteration
+
+        try:
+            line = data.decode(self.encoding)
+        except UnicodeDecodeError as err:
+            raise StopRiposteException(
+                f"Problem with reading the file: {self.path}, "
+                f"line {self.line_number + 1}: {err}"
+            )
+
+        if line.endswith("\r\n"):
+            line = line[:-2] + "\n"
+        elif line.endswith("\r"):
+            line = line[:-1] + "\n"
+
+        self._line = line
+        self.line_offset, self.offset = start, start + len(data)
+        self.line_number += 1
+        return self
+
+    def __call__(self) -> str:
+        return self._line
+
+
+def file_input(
+    path: Path, offset: int = 0, line_number: int = 0
+) -> FileInput:
+    """Read file and translate it into input stream.
+
+    When resuming from `offset`, pass `line_number` of the line preceding
+    it, to keep the reported line numbers right.
+    """
+    return FileInput(path, offset=offset, line_number=line_number)
+
+
+def _write_record(file: BinaryIO, value: Any) -> None:
+    data = marshal.dumps(value)
+    file.write(_RECORD.pack(len(data)))
+    file.write(data)
+
+
+def _read_record(file: BinaryIO) -> Any:
+    """Next record of the compiled script, `EOFError` after the last one."""
+    header = file.read(_RECORD.size)
+    if not header:
+        raise EOFError
+    (size,) = _RECORD.unpack(header)
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated record")
+    return marshal.loads(data)
+
+
+def _compiled_entries(file: BinaryIO) -> Generator[Any, None, None]:
+    """Entries of the compiled script, loaded one by one."""
+    with file:
+        while True:
+            try:
+                entry = _read_record(file)
+            except EOFError:
+                return
+            except (ValueError, TypeError, struct.error) as err:
+                raise StopRiposteException(
+                    f"Problem with reading the compiled script: "
+                    f"{file.name}: {err}"
+                )
+            yield entry
+
+
+class CompiledScript:
+    """Input stream replaying script compiled by `CompilingFileInput`.
+
+    Calling the stream returns already tokenized line: tuple of
+    `(command_name, arguments)` pairs, or raw line if it couldn't be
+    tokenized, so it fails the same way as it would without compilation.
+    """
+
+    def __init__(self, entries: Iterable):
+        self.line_number = 0
+        self._entries = iter(entries)
+        self._entry = ()
+
+    def __iter__(self) -> "CompiledScript":
+        return self
+
+    def __next__(self) -> "CompiledScript":
+        self._entry = next(self._entries)
+        self.line_number += 1
+        return self
+
+    def __call__(self) -> Union[tuple, str]:
+        return self._entry
+
+
+class CompilingFileInput(FileInput):
+    """File input stream tokenizing lines and storing them as compiled script.
+
+    Compiled lines are written one by one to a temporary file, which
+    replaces `cache_path` once the whole file has been read, so interrupted
+    executions don't leave incomplete cache behind. Closing the stream
+    before the end of the file discards the temporary file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        cache_path: Path,
+        key: str,
+        commands: Collection,
+        operators: str = "",
+    ):
+        super().__init__(path)
+        self.cache_path = cache_path
+        self.key = key
+        self.operators = operators
+        self._commands = commands
+        self._entry = ()
+        self._tmp_path = cache_path.with_name(
+            f"{cache_path.name}.{os.getpid()}.tmp"
+        )
+        self._cache_file: Optional[BinaryIO] = None
+        self._caching = True
+
+    def _compile(self, line: str) -> Union[tuple, str]:
+        try:
+            commands = lexer.tokenize(line, self.operators)
+        except RiposteException:
+            return line
+
+        if any(
+            command_name not in self._commands
+            for name, args in commands
+            for command_name in lexer.command_names(name, args)
+        ):
+            return line
+
+        return tuple((name, tuple(args)) for name, args in commands)
+
+    def _write(self, entry: Union[tuple, str]) -> None:
+        try:
+            if self._cache_file is None:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                self._cache_file = open(self._tmp_path, "wb")
+                _write_record(self._cache_file, self.key)
+            _write_record(self._cache_file, entry)
+        except OSError:
+            self._discard()  # caching is an optimization, carry on without
+
+    def _store(self) -> None:
+        try:
+            self._cache_file.close()
+            os.replace(self._tmp_path, self.cache_path)
+        except OSError:
+            self._discard()
+        self._cache_file = None
+        self._caching = False
+
+    def _discard(self) -> None:
+        self._caching = False
+        if self._cache_file is not None:
+            self._cache_file.close()
+            self._cache_file = None
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        if self._cache_file is not None:
+            if self._buffer is not None and self.offset >= self._size:
+                self._store()
+            else:
+                self._discard()
+        super().close()
+
+    def __next__(self) -> "CompilingFileInput":
+        super().__next__()
+        self._entry = self._compile(self._line)
+        if self._caching:
+            self._write(self._entry)
+        return self
+
+    def __call__(self) -> Union[tuple, str]:
+        return self._entry
+
+
+def script_cache_key(
+    path: Path, commands: Collection, operators: str = ""
+) -> str:
+    """Key identifying given version of the script and set of commands."""
+    stat = path.stat()
+    digest = hashlib.sha256()
+    for part in (
+        SCRIPT_CACHE_VERSION,
+        sys.implementation.cache_tag,
+        path.resolve(),
+        stat.st_mtime_ns,
+        stat.st_size,
+        operators,
+        *sorted(commands),
+    ):
+        digest.update(f"{part}\0".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def script_cache_path(path: Path, cache_dir: Optional[Path] = None) -> Path:
+    """Location of compiled script, next to the script or in `cache_dir`."""
+    if cache_dir is None:
+        return path.with_name(f".{path.name}{SCRIPT_CACHE_SUFFIX}")
+
+    name = hashlib.sha256(str(path.resolve()).encode()).hexdigest()
+    return cache_dir / f"{name}{SCRIPT_CACHE_SUFFIX}"
+
+
+def compiled_file_input(
+    path: Path,
+    commands: Collection,
+    cache_dir: Optional[Path] = None,
+    operators: str = "",
+) -> Union[CompiledScript, FileInput]:
+    """Read script from compiled script cache, compile it on a cache miss.
+
+    `commands` are names of the registered commands, script is compiled
+    again whenever they change, same as when the script itself changes.
+    `operators` are the ones enabled in the script, see `lexer` module.
+    """
+    if not os.path.isfile(path):
+        # pipes can be read only once and missing files fail in the stream
+        return file_input(path)
+
     try:
-        with open(path, "r") as file_handler:
-            for line in file_handler:
-                yield lambda: line
-    except Exception:
-        raise StopRiposteException(f"Problem with reading the file: {path}")
+        key = script_cache_key(path, commands, operators)
+    except OSError:
+        return file_input(path)  # let the stream report the problem
+
+    cache_path = script_cache_path(path, cache_dir)
+    try:
+        cache_file = open(cache_path, "rb")
+    except OSError:
+        pass
+    else:
+        try:
+            cached_key = _read_record(cache_file)
+        except Exception:
+            cached_key = None
+        if cached_key == key:
+            return CompiledScript(_compiled_entries(cache_file))
+        cache_file.close()
+
+    return CompilingFileInput(path, cache_path, key, commands, operators)
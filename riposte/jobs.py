@@ -0,0 +1,224 @@
+import asyncio
+from concurrent import futures
+import contextvars
+from enum import Enum
+import itertools
+import threading
+import typing
+
+from .command import Command, Pipeline, _consume
+from .exceptions import (
+    CommandError,
+    JobCancelled,
+    RiposteException,
+    StopRiposteException,
+)
+from . import lexer
+from .printer.mixins import tag_output
+
+if typing.TYPE_CHECKING:
+    from .riposte import Riposte
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+def current_job() -> typing.Optional["Job"]:
+    """Background job executing the current command, if any."""
+    return _current_job.get()
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job:
+    """Command executed in the background."""
+
+    def __init__(
+        self,
+        job_id: int,
+        command: typing.Union[Command, Pipeline],
+        args: typing.Tuple,
+        line: str,
+    ):
+        self.id = job_id
+        self.command = command
+        self.args = args
+        self.line = line
+        self.status = JobStatus.PENDING
+        self.future: typing.Optional[futures.Future] = None
+
+        self._cancelled = threading.Event()
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (
+            JobStatus.DONE,
+            JobStatus.FAILED,
+            JobStatus.CANCELLED,
+        )
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether job has been asked to stop."""
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """Raise `JobCancelled` if job has been asked to stop."""
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def cancel(self) -> bool:
+        """Ask job to stop, return `True` if it hasn't even started.
+
+        Job that hasn't started yet is never executed, coroutine handler is
+        cancelled at its next `await`, any other handler has to check
+        `cancelled` (or call `check()`) on its own.
+        """
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.status = JobStatus.CANCELLED
+            return True
+
+        task = self._task
+        if task is not None:
+            try:
+                self._loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:  # loop has been closed, task is finished
+                pass
+        return False
+
+    async def _await(self, awaitable: typing.Awaitable) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self.check()  # `cancel()` might have missed the task
+        await awaitable
+
+    def __str__(self):
+        return f"[{self.id}] {self.status.value:<9} {self.line}"
+
+
+class JobManager:
+    """Execute commands sent to the background on a thread pool.
+
+    Commands terminated with `&` are resolved into `command` which submits
+    them as `Job` and returns to the prompt right away. Output printed by the
+    job is tagged with its id. Coroutine handlers run in the job's thread on
+    their own event loop.
+    """
+
+    def __init__(self, repl: "Riposte", workers: typing.Optional[int] = None):
+        self.repl = repl
+        self.workers = workers
+        self.command = Command(
+            lexer.BACKGROUND, self.submit, "run command in the background"
+        )
+
+        self._executor: typing.Optional[futures.ThreadPoolExecutor] = None
+        self._jobs: typing.Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, name: str, *args) -> Job:
+        """Execute tokenized command in the background."""
+        command, command_args = self.repl._resolve_command(name, args)
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(
+                self.workers, thread_name_prefix="riposte-job"
+            )
+
+        job = Job(
+            next(self._ids), command, command_args, lexer.render(name, args)
+        )
+        self._jobs[job.id] = job
+        self.repl.status(f"[{job.id}] {job.line}")
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _execute(self, job: Job) -> None:
+        def emit(item):
+            job.check()  # generators are cancelled between the items
+            self.repl.print(item)
+
+        job.check()
+        _consume(
+            job.command.execute(*job.args),
+            emit,
+            lambda coroutine: asyncio.run(job._await(coroutine)),
+        )
+
+    def _run(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        token = _current_job.set(job)
+        try:
+            with tag_output(f"[{job.id}]"):
+                try:
+                    self._execute(job)
+                except (
+                    JobCancelled,
+                    asyncio.CancelledError,
+                    futures.CancelledError,
+                ):
+                    job.status = JobStatus.CANCELLED
+                except (RiposteException, StopRiposteException) as err:
+                    job.status = JobStatus.FAILED
+                    self.repl.error(err)
+                except Exception as err:
+                    job.status = JobStatus.FAILED
+                    self.repl.error(f"{type(err).__name__}: {err}")
+                else:
+                    job.status = JobStatus.DONE
+        finally:
+            _current_job.reset(token)
+
+        self.repl.status(str(job))
+
+    def _get_job(self, job_id: int) -> Job:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise CommandError(f"No such job: {job_id}")
+
+    @property
+    def jobs(self) -> typing.List[Job]:
+        return list(self._jobs.values())
+
+    def list_jobs(self) -> None:
+        """Print the job table, finished jobs are removed once listed."""
+        for job in self.jobs:
+            self.repl.print(str(job))  # rendered later, status may change
+            if job.finished:
+                del self._jobs[job.id]
+
+    def wait(self, *job_ids: int) -> None:
+        """Wait for given jobs (all of them by default) to finish."""
+        jobs = [self._get_job(job_id) for job_id in job_ids] or self.jobs
+        futures.wait([job.future for job in jobs])
+        for job in jobs:
+            self._jobs.pop(job.id, None)
+
+    def kill(self, job_id: int, *job_ids: int) -> None:
+        """Ask given jobs to stop."""
+        for job in [self._get_job(job_id) for job_id in (job_id, *job_ids)]:
+            if job.cancel():  # never started, so it won't report itself
+                self.repl.status(str(job))
+
+    def shutdown(self) -> None:
+        """Wait for the remaining jobs, cancel them on `KeyboardInterrupt`."""
+        if self._executor is None:
+            return
+
+        try:
+            futures.wait([job.future for job in self.jobs])
+        except KeyboardInterrupt:
+            for job in self.jobs:
+                job.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
@@ -0,0 +1,198 @@
+"""Single-pass lexer for lines delivered by input streams.
+
+Splits the line into inline commands delimited with semicolon and tokenizes
+each of them at once. Produces exactly the same tokens as splitting the line
+with `shlex.split(line, posix=False)`, joining elements of every command back
+into a string and splitting it again with `shlex.split(command)`.
+
+Optional operators extend the syntax:
+
+* `&` - ends the command as well and sends it to the background,
+  `foo bar &` becomes `(BACKGROUND, ["foo", "bar"])`,
+* `|` - pipes items produced by the command into the next one,
+  `foo | bar baz` becomes `(PIPE, [["foo"], ["bar", "baz"]])`.
+"""
+import re
+import shlex
+from typing import Iterator, List, Sequence, Tuple
+
+from riposte.exceptions import CommandError, RiposteException
+
+# `shlex` in non-POSIX mode: quoted element ends right at the closing quote,
+# any other element runs until the whitespace.
+_ELEMENT = re.compile(r"""'[^']*(?:'|\Z)|"[^"]*(?:"|\Z)|[^ \t\r\n]+""")
+_SPECIAL = re.compile(r"""[\\'"]""")
+_WHITESPACE = " \t\r\n"
+
+BACKGROUND = "&"
+PIPE = "|"
+OPERATORS = BACKGROUND + PIPE
+
+
+def _split_elements(
+    line: str, operators: str = ""
+) -> List[Tuple[bool, List[List[str]]]]:
+    """Split line into elements grouped by inline command.
+
+    Every inline command is a pair of flag telling whether it has been
+    sent to the background and its stages (split by the `PIPE`).
+    """
+    parsed = _ELEMENT.findall(line)
+    if parsed and parsed[-1][0] in "'\"":
+        last = parsed[-1]  # only the last element can lack closing quote
+        if len(last) < 2 or last[-1] != last[0]:
+            raise RiposteException("No closing quotation")
+
+    terminators = ";" + operators
+    commands = []
+    stages = []
+    elements = []
+    for element in parsed:
+        tail = element[-2:]
+        if tail[0] == "\\" and tail[-1] in terminators:
+            elements.append(element)
+        elif tail in (";;", "&&", "||") and tail[0] in terminators:
+            raise CommandError(f"unexpected token: {tail}")
+        elif (
+            len(tail) == 2
+            and tail[0] in operators
+            and tail[1] in terminators
+            and element[-3:-2] != "\\"
+        ):
+            raise CommandError(f"unexpected token: {tail[1]}")
+        elif element[-1] in terminators:
+            operator = element[-1]
+            if element[:-1]:
+                elements.append(element[:-1])
+
+            if elements:
+                stages.append(elements)
+                elements = []
+            elif stages or operator != ";":
+                raise CommandError(f"unexpected token: {operator}")
+
+            if operator != PIPE and stages:
+                commands.append((operator == BACKGROUND, stages))
+                stages = []
+        else:
+            elements.append(element)
+
+    if elements:
+        stages.append(elements)
+    elif stages:
+        raise CommandError(f"unexpected token: {PIPE}")
+    if stages:
+        commands.append((False, stages))
+
+    return commands
+
+
+def _tokenize(elements: List[str]) -> List[str]:
+    """Tokenize elements of a single command using POSIX rules.
+
+    Elements are treated as if they were joined with a single space, hence
+    quotes and escapes are allowed to span across them.
+    """
+    tokens = []
+    token = []
+    in_token = False
+    quote = None
+    escape = False
+
+    for idx, element in enumerate(elements):
+        clean = quote is None and not escape
+        if clean and in_token:
+            tokens.append("".join(token))
+            token = []
+            in_token = False
+
+        if clean and not _SPECIAL.search(element):
+            tokens.append(element)
+            continue
+
+        for char in element if clean or not idx else " " + element:
+            if escape:
+                if quote == '"' and char not in '"\\':
+                    token.append("\\")
+                token.append(char)
+                escape = False
+            elif quote == "'":
+                if char == "'":
+                    quote = None
+                else:
+                    token.append(char)
+            elif quote == '"':
+                if char == '"':
+                    quote = None
+                elif char == "\\":
+                    escape = True
+                else:
+                    token.append(char)
+            elif char in _WHITESPACE:
+                if in_token:
+                    tokens.append("".join(token))
+                    token = []
+                    in_token = False
+            elif char == "\\":
+                escape = in_token = True
+            elif char in "'\"":
+                quote = char
+                in_token = True
+            else:
+                token.append(char)
+                in_token = True
+
+    if escape:
+        raise RiposteException("No escaped character")
+    if quote is not None:
+        raise RiposteException("No closing quotation")
+    if in_token:
+        tokens.append("".join(token))
+
+    return tokens
+
+
+def tokenize(line: str, operators: str = "") -> List[Tuple[str, List]]:
+    """Translate line of input into `(command_name, arguments)` pairs.
+
+    The whole line is validated before returning, so syntax error in any of
+    the inline commands prevents execution of all of them. `operators` are
+    the enabled ones out of `OPERATORS`, see module's docstring.
+    """
+    commands = _split_elements(line, operators)
+    tokenized = _SPECIAL.search(line) is not None
+
+    entries = []
+    for background, stages in commands:
+        if tokenized:
+            stages = [_tokenize(stage) for stage in stages]
+        for name, *_ in stages:
+            if len(name) == 1 and name in operators:  # escaped or quoted
+                raise CommandError(f"unexpected token: {name}")
+
+        name, *args = stages[0] if len(stages) == 1 else (PIPE, *stages)
+        if background:
+            name, args = BACKGROUND, [name, *args]
+        entries.append((name, args))
+
+    return entries
+
+
+def command_names(name: str, args: Sequence) -> Iterator[str]:
+    """Names of all the commands taking part in tokenized command."""
+    if name == BACKGROUND:
+        yield from command_names(args[0], args[1:])
+    elif name == PIPE:
+        for stage in args:
+            yield stage[0]
+    else:
+        yield name
+
+
+def render(name: str, args: Sequence) -> str:
+    """Translate tokenized command back into line of input."""
+    if name == BACKGROUND:
+        return f"{render(args[0], args[1:])} {BACKGROUND}"
+    if name == PIPE:
+        return f" {PIPE} ".join(render(stage[0], stage[1:]) for stage in args)
+    return " ".join(map(shlex.quote, (name, *args)))
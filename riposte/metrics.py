@@ -0,0 +1,352 @@
+from bisect import bisect_left
+import inspect
+import json
+import os
+from pathlib import Path
+import threading
+from time import perf_counter
+import typing
+
+# upper bounds (in seconds) of histogram buckets, the last one is `+Inf`
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _label(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return escaped.replace("\n", "\\n")
+
+
+class Histogram:
+    """Distribution of durations (in seconds) over fixed `BUCKETS`."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(BUCKETS, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding `q` quantile."""
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> typing.List[typing.Tuple[str, int]]:
+        """`(upper bound, count of values up to it)` pairs."""
+        bounds = [repr(bound) for bound in BUCKETS] + ["+Inf"]
+        total = 0
+        pairs = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class CommandMetrics:
+    """Call and error counts and durations of a single command.
+
+    * `parse` - resolving the line of input the command was part of,
+    * `guides` - binding and converting the arguments,
+    * `handler` - handling function, including consumption of generators
+      and awaiting coroutines it returns.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors: typing.Dict[str, int] = {}
+            self.parse = Histogram()
+            self.guides = Histogram()
+            self.handler = Histogram()
+
+    def called(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def failed(self, err: BaseException) -> None:
+        error = type(err).__name__
+        with self._lock:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def measure_result(
+        self, result: typing.Any, elapsed: float
+    ) -> typing.Any:
+        """Keep measuring handler while its `result` is being consumed."""
+        if inspect.isgenerator(result):
+            return self._timed_generator(result, elapsed)
+        if inspect.isasyncgen(result):
+            return self._timed_async_generator(result, elapsed)
+        if inspect.isawaitable(result):
+            return self._timed_awaitable(result, elapsed)
+
+        self.handler.observe(elapsed)
+        return result
+
+    def _timed_generator(
+        self, items: typing.Generator, elapsed: float
+    ) -> typing.Generator:
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += perf_counter() - start
+                yield item
+        except Exception as err:
+            self.failed(err)
+            raise
+        finally:
+            items.close()
+            self.handler.observe(elapsed)
+
+    async def _timed_async_generator(
+        self, items: typing.AsyncGenerator, elapsed: float
+    ) -> typing.AsyncGenerator:
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    elapsed += perf_counter() - start
+                yield item
+        except Exception as err:
+            self.failed(err)
+            raise
+        finally:
+            await items.aclose()
+            self.handler.observe(elapsed)
+
+    async def _timed_awaitable(
+        self, awaitable: typing.Awaitable, elapsed: float
+    ) -> typing.Any:
+        start = perf_counter()
+        try:
+            return await awaitable
+        except Exception as err:
+            self.failed(err)
+            raise
+        finally:
+            self.handler.observe(elapsed + perf_counter() - start)
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "parse": self.parse.snapshot(),
+            "guides": self.guides.snapshot(),
+            "handler": self.handler.snapshot(),
+        }
+
+
+class Metrics:
+    """Metrics of every command executed by `Riposte`.
+
+    Enabled with `Riposte(metrics=MetricsSettings())`, measured commands get
+    `execute` swapped for its measured version at registration, so commands
+    of apps running without metrics don't pay for them at all.
+    """
+
+    def __init__(self):
+        self.parse_errors: typing.Dict[str, int] = {}
+        self._commands: typing.Dict[str, CommandMetrics] = {}
+        self._lock = threading.Lock()
+
+    def command(self, name: str) -> CommandMetrics:
+        """Metrics of the command, created on first use."""
+        try:
+            return self._commands[name]
+        except KeyError:
+            with self._lock:
+                return self._commands.setdefault(name, CommandMetrics(name))
+
+    @property
+    def commands(self) -> typing.List[CommandMetrics]:
+        return [self._commands[name] for name in sorted(self._commands)]
+
+    def measure_parsing(
+        self,
+        resolve: typing.Callable[[typing.Any], typing.Tuple],
+        user_input: typing.Any,
+    ) -> typing.Tuple:
+        """Resolve input recording the time in `parse` of its commands.
+
+        Line is parsed once for all of its commands, the time is split
+        evenly between them, so it isn't counted more than once.
+        """
+        start = perf_counter()
+        try:
+            resolved = resolve(user_input)
+        except Exception as err:
+            error = type(err).__name__
+            with self._lock:
+                self.parse_errors[error] = self.parse_errors.get(error, 0) + 1
+            raise
+
+        elapsed = perf_counter() - start
+        stages = [
+            stage
+            for command, _ in resolved
+            for stage in getattr(command, "commands", (command,))  # pipes
+        ]
+        for stage in stages:
+            self.command(stage.name).parse.observe(elapsed / len(stages))
+        return resolved
+
+    def reset(self) -> None:
+        """Start from scratch, measured commands keep their metrics."""
+        with self._lock:
+            for metrics in self._commands.values():
+                metrics.reset()
+            self.parse_errors.clear()
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        """JSON serializable copy of the metrics."""
+        return {
+            "commands": {
+                metrics.name: metrics.snapshot() for metrics in self.commands
+            },
+            "parse_errors": dict(self.parse_errors),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_openmetrics(self) -> str:
+        """Metrics in OpenMetrics text exposition format."""
+        commands = self.commands
+        lines = ["# TYPE riposte_command_calls counter"]
+        for metrics in commands:
+            label = f'command="{_label(metrics.name)}"'
+            lines.append(
+                f"riposte_command_calls_total{{{label}}} {metrics.calls}"
+            )
+
+        lines.append("# TYPE riposte_command_errors counter")
+        for metrics in commands:
+            for error, count in sorted(metrics.errors.items()):
+                lines.append(
+                    "riposte_command_errors_total"
+                    f'{{command="{_label(metrics.name)}",type="{error}"}}'
+                    f" {count}"
+                )
+
+        for stage in ("parse", "guides", "handler"):
+            name = f"riposte_command_{stage}_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for metrics in commands:
+                histogram = getattr(metrics, stage)
+                label = f'command="{_label(metrics.name)}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(
+                        f'{name}_bucket{{{label},le="{bound}"}} {count}'
+                    )
+                lines.append(f"{name}_sum{{{label}}} {histogram.sum!r}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+        lines.append("# TYPE riposte_parse_errors counter")
+        for error, count in sorted(self.parse_errors.items()):
+            lines.append(
+                f'riposte_parse_errors_total{{type="{error}"}} {count}'
+            )
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        """Replace the file with the current metrics.
+
+        JSON if the file has `.json` suffix, OpenMetrics otherwise. Readers
+        never see the file half written.
+        """
+        path = Path(path)
+        content = (
+            self.to_json() if path.suffix == ".json" else self.to_openmetrics()
+        )
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(content, encoding="utf-8")
+        os.replace(temporary, path)
+
+
+class MetricsSettings(typing.NamedTuple):
+    """Settings of metrics, dumped to `file` every `interval` if it's set."""
+
+    file: typing.Optional[Path] = None
+    interval: float = 10.0
+
+
+class MetricsDumper(threading.Thread):
+    """Thread dumping metrics to the file every `interval` seconds."""
+
+    def __init__(self, metrics: Metrics, path: Path, interval: float = 10.0):
+        super().__init__(name="riposte-metrics")
+        self.daemon = True
+        self.metrics = metrics
+        self.path = Path(path)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def _dump(self) -> None:
+        try:
+            self.metrics.dump(self.path)
+        except OSError:  # scraper gets the next dump
+            pass
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._dump()
+
+    def stop(self) -> None:
+        """Stop dumping, with the final dump of the metrics."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self._dump()
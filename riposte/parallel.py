@@ -0,0 +1,146 @@
+import asyncio
+from collections import deque
+from concurrent import futures
+import typing
+
+from .command import _consume
+from .exceptions import RiposteException, StopRiposteException
+from .printer.mixins import capture_output
+
+if typing.TYPE_CHECKING:
+    from .command import Command
+    from .riposte import Riposte
+
+
+class Parallel(typing.NamedTuple):
+    """Settings of parallel execution of non-interactive input.
+
+    `workers` is the size of the thread pool (`None` picks the default of
+    `concurrent.futures.ThreadPoolExecutor`). With `ordered` output of the
+    commands is printed in the order they were submitted, otherwise in the
+    order they complete. `fail_fast` stops the execution after the first
+    failed command, otherwise remaining commands keep running.
+    """
+
+    workers: typing.Optional[int] = None
+    ordered: bool = True
+    fail_fast: bool = False
+
+
+class ParallelRunner:
+    """Execute commands delivered by the input stream on a thread pool.
+
+    Every command is a separate task, output printed by the command is
+    captured and printed at once when the command finishes, so it doesn't
+    interleave with output of other commands.
+    """
+
+    def __init__(self, repl: "Riposte", settings: Parallel):
+        self.repl = repl
+        self.settings = settings
+        self.max_pending = 4 * (settings.workers or 8)
+
+        self._pending: typing.Deque[futures.Future] = deque()
+        self._stopped = False
+
+    def _execute(
+        self,
+        command: "Command",
+        args: typing.Tuple,
+        line_number: typing.Optional[int],
+    ) -> tuple:
+        with capture_output() as resources:
+            try:
+                # app's loop can't be shared between the worker threads
+                _consume(command.execute(*args), self.repl.print, asyncio.run)
+            except (RiposteException, StopRiposteException) as err:
+                err.line_number = line_number
+                self.repl._report(err)
+                return resources, err
+
+        return resources, None
+
+    def _failure(
+        self, err: Exception, line_number: typing.Optional[int]
+    ) -> futures.Future:
+        """Turn error raised before submitting a command into a task."""
+        err.line_number = line_number
+        with capture_output() as resources:
+            self.repl._report(err)
+
+        future = futures.Future()
+        future.set_result((resources, err))
+        return future
+
+    def _emit(self, future: futures.Future) -> None:
+        if future.cancelled():
+            return
+
+        resources, err = future.result()
+        for resource in resources:
+            self.repl._printer_thread.put(resource)
+
+        if isinstance(err, StopRiposteException) or (
+            err is not None and self.settings.fail_fast
+        ):
+            self._stop()
+
+    def _stop(self) -> None:
+        self._stopped = True
+        for future in self._pending:
+            future.cancel()
+
+    def _flush(self, block: bool = False) -> None:
+        """Print output of the finished tasks.
+
+        With `block` wait for at least one of the tasks to finish.
+        """
+        if self.settings.ordered:
+            while self._pending and (block or self._pending[0].done()):
+                self._emit(self._pending.popleft())
+                block = False
+            return
+
+        if block:
+            futures.wait(self._pending, return_when=futures.FIRST_COMPLETED)
+
+        done = [future for future in self._pending if future.done()]
+        for future in done:
+            self._pending.remove(future)
+            self._emit(future)
+
+    def run(self) -> None:
+        with futures.ThreadPoolExecutor(self.settings.workers) as executor:
+            try:
+                while not self._stopped:
+                    try:
+                        user_input = next(self.repl.input_stream)()
+                    except StopIteration:
+                        break
+
+                    if not user_input:
+                        continue
+
+                    line_number = self.repl._line_number()
+                    try:
+                        commands = self.repl._resolve_input(user_input)
+                    except RiposteException as err:
+                        self._pending.append(self._failure(err, line_number))
+                        commands = ()
+
+                    for command, args in commands:
+                        self._pending.append(
+                            executor.submit(
+                                self._execute, command, args, line_number
+                            )
+                        )
+
+                    self._flush()
+                    while len(self._pending) >= self.max_pending:
+                        self._flush(block=True)
+
+                while self._pending:
+                    self._flush(block=True)
+            except BaseException:
+                self._stop()
+                raise
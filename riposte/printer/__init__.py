@@ -1 +1,2 @@
 from .palette import Palette  # noqa
+from .thread import OverflowPolicy, PrinterSettings  # noqa
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import typing
+
+from riposte.printer.thread import PrinterThread, PrintResource
+
+
+class LoopPrinter:
+    def __init__(self, latency: float = 0.0):
+        """Printer writing resources from the event loop instead of a thread.
+
+        Resources put during a single iteration of the `loop` are written
+        as one batch (see `PrinterThread._write`) by a callback scheduled on
+        the loop, `latency` seconds later if set, trading responsiveness for
+        larger batches. Without the `loop`, resources are written right away.
+
+        Queue is unbounded, so there is nothing to drop or spill, counters
+        are kept for compatibility with `PrinterThread`.
+        """
+        self.latency = latency
+        self.loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.dropped = 0
+        self.spilled = 0
+
+        self._lock = threading.Lock()
+        self._pending: typing.List[PrintResource] = []
+        self._scheduled = False
+
+    def start(self) -> None:
+        """Nothing to start, printing is driven by the loop."""
+
+    def put(self, resource: PrintResource) -> None:
+        with self._lock:
+            self._pending.append(resource)
+            if self._scheduled:
+                return
+            loop = self.loop
+            self._scheduled = loop is not None
+
+        if loop is None:
+            self.wait()
+            return
+
+        try:
+            if self.latency > 0:
+                loop.call_soon_threadsafe(
+                    loop.call_later, self.latency, self.wait
+                )
+            else:
+                loop.call_soon_threadsafe(self.wait)
+        except RuntimeError:  # loop has been closed
+            self.wait()
+
+    def close(self) -> None:
+        """Write out all pending resources, nothing else to stop."""
+        self.wait()
+
+    def wait(self) -> None:
+        """Write out all pending resources."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+            PrinterThread._write(batch)
@@ -1,8 +1,44 @@
+import contextlib
+import contextvars
 import sys
 import typing
 
 from riposte.printer.thread import PrintResource
 
+_captured: contextvars.ContextVar = contextvars.ContextVar(
+    "captured", default=None
+)
+_tag: contextvars.ContextVar = contextvars.ContextVar("tag", default=None)
+
+
+@contextlib.contextmanager
+def capture_output() -> typing.Iterator[typing.List[PrintResource]]:
+    """Collect resources printed in the current context instead of printing.
+
+    Used to keep output of a command grouped when commands run
+    concurrently (in threads or `asyncio` tasks), collected resources are
+    printed afterwards at once.
+    """
+    resources = []
+    token = _captured.set(resources)
+    try:
+        yield resources
+    finally:
+        _captured.reset(token)
+
+
+@contextlib.contextmanager
+def tag_output(tag: str) -> typing.Iterator[None]:
+    """Prefix everything printed in the current context with `tag`.
+
+    Used to tell apart output of background jobs.
+    """
+    token = _tag.set(tag)
+    try:
+        yield
+    finally:
+        _tag.reset(token)
+
 
 class PrinterBaseMixin:
     def _print(
@@ -12,9 +48,25 @@ class PrinterBaseMixin:
         end: typing.Optional[str] = "\n",
         file: typing.Optional[typing.IO] = sys.stdout,
     ):
-        self._printer_thread.put(
-            PrintResource(content=args, sep=sep, end=end, file=file)
-        )
+        tag = _tag.get()
+        if tag is not None:
+            args = (tag, *args)
+        resource = PrintResource(content=args, sep=sep, end=end, file=file)
+        captured = _captured.get()
+        if captured is not None:
+            captured.append(resource)
+        else:
+            self._printer_thread.put(resource)
+
+    @property
+    def printer_dropped(self) -> int:
+        """Number of resources dropped due to printer's queue overflow."""
+        return self._printer_thread.dropped
+
+    @property
+    def printer_spilled(self) -> int:
+        """Number of resources spilled to disk due to queue overflow."""
+        return self._printer_thread.spilled
 
 
 class PrinterMixin(PrinterBaseMixin):
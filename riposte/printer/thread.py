@@ -1,8 +1,29 @@
+from enum import Enum
 import queue
+import sys
+import tempfile
 import threading
+import time
 import typing
 
-printer_queue = queue.Queue()
+
+SPILL_CHUNK_SIZE = 1024 * 1024
+
+
+class OverflowPolicy(Enum):
+    """What to do with new resources when printer's queue is full."""
+
+    BLOCK = "block"  # block the producer until there is room in the queue
+    DROP_OLDEST = "drop_oldest"  # discard the oldest queued resource
+    SPILL = "spill"  # write rendered resources to a temporary file
+
+
+class PrinterSettings(typing.NamedTuple):
+    """Settings of the printer, see `PrinterThread`."""
+
+    latency: float = 0.0
+    queue_size: int = 0
+    overflow: OverflowPolicy = OverflowPolicy.BLOCK
 
 
 class PrintResource(typing.NamedTuple):
@@ -12,25 +33,214 @@ class PrintResource(typing.NamedTuple):
     file: typing.IO
 
 
+def render(resource: PrintResource) -> str:
+    """Format resource the same way builtin `print()` does."""
+    sep = " " if resource.sep is None else resource.sep
+    end = "\n" if resource.end is None else resource.end
+    return sep.join(map(str, resource.content)) + end
+
+
+class _Marker(threading.Event):
+    """Queued by `PrinterThread.wait()`, set once preceding output is out."""
+
+
 class PrinterThread(threading.Thread):
-    def __init__(self):
+    def __init__(
+        self,
+        latency: float = 0.0,
+        maxsize: int = 0,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    ):
+        """Thread printing resources put into its own queue.
+
+        Every `Riposte` instance owns its printer thread, so instances
+        living in the same process don't share or wait for each other's
+        output.
+
+        Resources are printed in batches: every pending resource is drained
+        from the queue at once and content addressed to the same file is
+        written with a single `write()` followed by `flush()`. `latency`
+        is the time (in seconds) to wait for more resources after the
+        first one arrives, trading responsiveness for larger batches.
+
+        Queue holds at most `maxsize` resources (`0` means unbounded), once
+        it is full, `overflow` policy decides what happens with new ones.
+        Numbers of dropped and spilled resources are kept in `dropped` and
+        `spilled` counters.
+        """
         super(PrinterThread, self).__init__()
         self.daemon = True
+        self.latency = latency
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+        self.spilled = 0
 
-    def run(self):
-        while True:
-            resource = PrintResource(*printer_queue.get())
-            print(
-                *resource.content,
-                sep=resource.sep,
-                end=resource.end,
-                file=resource.file,
-            )
-            printer_queue.task_done()
+        self._closing = False
+        self._lock = threading.Lock()
+        self._spill_file: typing.Optional[typing.IO] = None
+        self._spill_runs: typing.List[typing.List] = []  # [file, length]
+        # `wait()` calls waiting for the spill file to be written out
+        self._waiting: typing.List[threading.Event] = []
+
+    def _collect(self) -> typing.List[PrintResource]:
+        batch = [self.queue.get()]
+
+        if self.latency > 0:
+            deadline = time.monotonic() + self.latency
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+        # only what's queued by now, busy producers can't grow it forever
+        for _ in range(self.queue.qsize()):
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
 
     @staticmethod
-    def wait():
-        printer_queue.join()
+    def _write(batch: typing.List[PrintResource]) -> None:
+        """Write batch keeping the order, one write per run of same file."""
+        chunks = []
+        current_file = None
+        for resource in batch:
+            file = sys.stdout if resource.file is None else resource.file
+            if file is not current_file and chunks:
+                current_file.write("".join(chunks))
+                current_file.flush()
+                chunks = []
+            current_file = file
+            chunks.append(render(resource))
+
+        if chunks:
+            current_file.write("".join(chunks))
+            current_file.flush()
+
+    def _spill(self, resource: PrintResource) -> None:
+        """Append rendered resource to the spill file. Requires `_lock`."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(
+                "w+", encoding="utf-8", errors="surrogatepass"
+            )
+
+        file = sys.stdout if resource.file is None else resource.file
+        text = render(resource)
+        self._spill_file.write(text)
+        if self._spill_runs and self._spill_runs[-1][0] is file:
+            self._spill_runs[-1][1] += len(text)
+        else:
+            self._spill_runs.append([file, len(text)])
+        self.spilled += 1
+
+    def _write_spilled(self, markers: typing.List[threading.Event]) -> None:
+        """Write out content of the spill file, preserving the order.
+
+        Once spilling starts, every resource goes to the spill file until
+        it's written out, so resources still in the queue precede the
+        spilled ones and the spill file waits until they're written.
+        `markers` of `wait()` calls are set once nothing is spilled.
+        """
+        with self._lock:
+            if self._spill_file is not None and not self.queue.empty():
+                self._waiting.extend(markers)
+                return
+            spill_file, self._spill_file = self._spill_file, None
+            runs, self._spill_runs = self._spill_runs, []
+            markers = self._waiting + markers
+            self._waiting = []
+
+        try:
+            if spill_file is None:
+                return
+
+            with spill_file:
+                spill_file.seek(0)
+                for file, length in runs:
+                    while length > 0:
+                        chunk = spill_file.read(min(length, SPILL_CHUNK_SIZE))
+                        file.write(chunk)
+                        length -= len(chunk)
+                    file.flush()
+        finally:
+            for marker in markers:
+                marker.set()
+
+    def run(self):
+        while not (self._closing and self.queue.empty()):
+            items = self._collect()
+            markers = [item for item in items if isinstance(item, _Marker)]
+            try:
+                self._write(
+                    [
+                        PrintResource(*item)
+                        for item in items
+                        if not isinstance(item, _Marker)
+                    ]
+                )
+                # Spill file is written out right after the last batch of
+                # resources queued before it, `wait()` covers it as well.
+                self._write_spilled(markers)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def wait(self):
+        """Block until everything put so far is written out.
+
+        Resources put in the meantime, e.g. by background jobs still
+        printing, aren't waited for.
+        """
+        if not self.is_alive():
+            return  # closed, nothing is going to write it out
+        if not self.queue.unfinished_tasks and not self._spill_runs:
+            return
+
+        marker = _Marker()
+        self.queue.put(marker)  # never dropped or spilled, see `put`
+        marker.wait()
+
+    def close(self) -> None:
+        """Write out everything put so far and stop the thread."""
+        if not self.is_alive():
+            return
+
+        self._closing = True
+        self.queue.put(_Marker())  # wakes the thread up, even if it's idle
+        self.join()
 
     def put(self, resource: PrintResource):
-        printer_queue.put(resource)
+        if self.overflow is OverflowPolicy.BLOCK:
+            self.queue.put(resource)
+            return
+
+        with self._lock:
+            if self.overflow is OverflowPolicy.SPILL:
+                if self._spill_runs or self.queue.full():
+                    self._spill(resource)
+                else:
+                    self.queue.put_nowait(resource)
+                return
+
+            while True:
+                try:
+                    self.queue.put_nowait(resource)
+                    return
+                except queue.Full:
+                    pass
+
+                try:
+                    dropped = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.queue.task_done()
+                if isinstance(dropped, _Marker):
+                    dropped.set()  # whatever preceded it is gone already
+                else:
+                    self.dropped += 1
@@ -0,0 +1,311 @@
+from abc import ABC, abstractmethod
+import cProfile
+from enum import Enum
+import inspect
+import marshal
+import os
+from pathlib import Path
+import pstats
+import sys
+import threading
+import time
+from types import FrameType
+import typing
+
+_DISABLE = "<method 'disable' of '_lsprof.Profiler' objects>"
+# frames of `Profiler` calling the profiled code
+_WRAPPERS = frozenset(
+    (
+        "execute_profiled",
+        "_profiled_generator",
+        "_profiled_async_generator",
+        "_profiled_awaitable",
+    )
+)
+
+
+class ProfilerType(Enum):
+    """Profilers available to the built-in `profile` command."""
+
+    CPROFILE = "cprofile"  # every function call, dumped as pstats file
+    SAMPLING = "sampling"  # stacks sampled periodically, as collapsed stacks
+
+
+class ProfilingSettings(typing.NamedTuple):
+    """Settings of the `profile` command, reports show `limit` functions."""
+
+    profiler: ProfilerType = ProfilerType.CPROFILE
+    limit: int = 20
+
+
+class Profiler(ABC):
+    """Profile of command executions, accumulated until `reset`.
+
+    Profiling is scoped to `Command.execute`, see `wrap`. Items of
+    generators returned by the handler are profiled one by one as they are
+    produced, coroutines (and everything running on the event loop at the
+    same time) until they are done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth: typing.Dict[int, int] = {}  # active executions by thread
+        self.reset()
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Discard the profile collected so far."""
+
+    @abstractmethod
+    def _enter(self, thread: int) -> None:
+        """Start profiling `thread`."""
+
+    @abstractmethod
+    def _exit(self, thread: int) -> None:
+        """Stop profiling `thread`."""
+
+    def start(self) -> None:
+        thread = threading.get_ident()
+        with self._lock:
+            depth = self._depth.get(thread, 0)
+            self._depth[thread] = depth + 1
+            if not depth:  # pipes nest executions of profiled commands
+                self._enter(thread)
+
+    def stop(self) -> None:
+        thread = threading.get_ident()
+        with self._lock:
+            depth = self._depth.pop(thread) - 1
+            if depth:
+                self._depth[thread] = depth
+            else:
+                self._exit(thread)
+
+    def wrap(self, execute: typing.Callable) -> typing.Callable:
+        """Profile every call of `execute` and consumption of its result."""
+
+        def execute_profiled(*args: str, **kwargs: typing.Any) -> typing.Any:
+            self.start()
+            try:
+                result = execute(*args, **kwargs)
+            finally:
+                self.stop()
+
+            if inspect.isgenerator(result):
+                return self._profiled_generator(result)
+            if inspect.isasyncgen(result):
+                return self._profiled_async_generator(result)
+            if inspect.isawaitable(result):
+                return self._profiled_awaitable(result)
+            return result
+
+        return execute_profiled
+
+    def _profiled_generator(self, items: typing.Generator) -> typing.Generator:
+        try:
+            while True:
+                self.start()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    self.stop()
+                yield item
+        finally:
+            items.close()
+
+    async def _profiled_async_generator(
+        self, items: typing.AsyncGenerator
+    ) -> typing.AsyncGenerator:
+        try:
+            while True:
+                self.start()
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    self.stop()
+                yield item
+        finally:
+            await items.aclose()
+
+    async def _profiled_awaitable(
+        self, awaitable: typing.Awaitable
+    ) -> typing.Any:
+        self.start()
+        try:
+            return await awaitable
+        finally:
+            self.stop()
+
+    @abstractmethod
+    def report(self, limit: int = 20) -> typing.List[str]:
+        """Table of the `limit` most expensive functions, header first."""
+
+    @abstractmethod
+    def dump(self, path: Path) -> None:
+        """Write the profile to `path`."""
+
+
+class CProfiler(Profiler):
+    """Deterministic profiler (`cProfile`) of the command executions.
+
+    Only a single thread is profiled at once, executions running
+    concurrently on the other threads are not profiled.
+    """
+
+    def __init__(self):
+        self._owner: typing.Optional[int] = None  # thread being profiled
+        super().__init__()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._profile = cProfile.Profile()
+
+    def _enter(self, thread: int) -> None:
+        if self._owner is None:
+            self._owner = thread
+            self._profile.enable()
+
+    def _exit(self, thread: int) -> None:
+        if self._owner == thread:
+            self._profile.disable()
+            self._owner = None
+
+    def stats(self) -> typing.Dict[typing.Tuple, typing.Tuple]:
+        """`pstats` compatible statistics, without the profiler's own calls."""
+        with self._lock:
+            self._profile.snapshot_stats()
+            stats = self._profile.stats
+        return {
+            function: stat
+            for function, stat in stats.items()
+            if function[0] != __file__ and function[2] != _DISABLE
+        }
+
+    def report(self, limit: int = 20) -> typing.List[str]:
+        """Functions taking the most time, including the functions they call.
+
+        Times in milliseconds.
+        """
+        stats = sorted(
+            self.stats().items(), key=lambda item: item[1][3], reverse=True
+        )
+        lines = [f"{'calls':>9} {'own':>9} {'total':>9}  function"]
+        for function, (_, calls, own, total, _) in stats[:limit]:
+            lines.append(
+                f"{calls:>9} {own * 1000:>9.3f} {total * 1000:>9.3f}  "
+                f"{pstats.func_std_string(function)}"
+            )
+        return lines
+
+    def dump(self, path: Path) -> None:
+        """Write stats readable by `pstats`, `snakeviz` etc."""
+        with open(path, "wb") as file:
+            marshal.dump(self.stats(), file)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} "
+        f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class SamplingProfiler(Profiler):
+    """Profiler sampling stacks of the command executions.
+
+    Stacks of threads executing profiled commands are taken every
+    `interval` seconds by a helper thread, so the overhead doesn't depend on
+    the number of function calls. Stacks are dumped in collapsed format of
+    flame graph tools (`flamegraph.pl`, speedscope, ...).
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self._sampler: typing.Optional[threading.Thread] = None
+        super().__init__()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples: typing.Dict[typing.Tuple[str, ...], int] = {}
+
+    def _enter(self, thread: int) -> None:
+        if self._sampler is None:
+            self._sampler = threading.Thread(
+                target=self._sample, name="riposte-profile"
+            )
+            self._sampler.daemon = True
+            self._sampler.start()
+
+    def _exit(self, thread: int) -> None:
+        pass  # sampler stops once no thread is profiled
+
+    @staticmethod
+    def _stack(frame: typing.Optional[FrameType]) -> typing.Tuple[str, ...]:
+        """Frames of the command, the outermost first.
+
+        Empty if the thread isn't running the command at the moment, e.g.
+        it's the profiler's own code or other task on the event loop.
+        """
+        stack = []
+        while frame is not None and frame.f_code.co_filename != __file__:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if frame is None or frame.f_code.co_name not in _WRAPPERS:
+            return ()
+        return tuple(reversed(stack))
+
+    def _sample(self) -> None:
+        while True:
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._depth:
+                    self._sampler = None
+                    return
+
+                for thread in self._depth:
+                    frame = frames.get(thread)
+                    stack = self._stack(frame)
+                    if stack:
+                        self.samples[stack] = self.samples.get(stack, 0) + 1
+            del frames
+            time.sleep(self.interval)
+
+    def report(self, limit: int = 20) -> typing.List[str]:
+        """Functions found in the most samples, including the ones they call.
+
+        Shares of the samples in percents.
+        """
+        with self._lock:
+            samples = dict(self.samples)
+
+        total = sum(samples.values()) or 1
+        own: typing.Dict[str, int] = {}
+        inclusive: typing.Dict[str, int] = {}
+        for stack, count in samples.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + count
+            for function in set(stack):
+                inclusive[function] = inclusive.get(function, 0) + count
+
+        ranked = sorted(inclusive.items(), key=lambda item: -item[1])
+        lines = [f"{'samples':>9} {'own %':>9} {'total %':>9}  function"]
+        for function, count in ranked[:limit]:
+            lines.append(
+                f"{count:>9} {own.get(function, 0) / total * 100:>9.1f} "
+                f"{count / total * 100:>9.1f}  {function}"
+            )
+        return lines
+
+    def dump(self, path: Path) -> None:
+        """Write collapsed stacks, one `outer;inner count` line per stack."""
+        with self._lock:
+            samples = dict(self.samples)
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(
+                f"{';'.join(stack)} {count}\n"
+                for stack, count in sorted(samples.items())
+            )
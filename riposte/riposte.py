@@ -1,15 +1,64 @@
 import argparse
+import asyncio
 import atexit
+import functools
+import inspect
+import os
 from pathlib import Path
 import readline
 import shlex
-from typing import Callable, Dict, Iterable, List, Optional, Sequence
-
-from . import input_streams
-from .command import Command
+import sys
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from . import input_streams, lexer
+from .command import Command, Pipeline, _as_coroutine, _consume
+from .completion import (
+    CommandIndex,
+    CompletionCache,
+    CompletionSettings,
+    CompletionStrategy,
+    FuzzyIndex,
+    HistoryUsage,
+    IndexView,
+)
 from .exceptions import CommandError, RiposteException, StopRiposteException
+from .history import History, HistoryFile
+from .hooks import Hook, with_pre_parse
+from .jobs import JobManager
+from .metrics import Metrics, MetricsDumper, MetricsSettings
+from .parallel import Parallel, ParallelRunner
+from .printer import PrinterSettings
 from .printer.mixins import PrinterMixin
 from .printer.thread import PrinterThread
+from .profiling import (
+    CProfiler,
+    Profiler,
+    ProfilerType,
+    ProfilingSettings,
+    SamplingProfiler,
+)
+from .sharding import ShardedRunner, _require_fork
+
+_HISTORY_RESULTS = 20  # entries printed by the `history` command
+_HISTORY_SUBCOMMANDS = ("list", "prefix", "search")
+_SCRIPT_INPUTS = (input_streams.FileInput, input_streams.CompiledScript)
+_FUZZY_RESULTS = 50  # fuzzy matches offered at once, the best ones
+_NO_COMMON_PREFIX = " "  # match keeping the text of fuzzy completion as is
+_USAGE_LINES = 1000  # latest entries of loaded history ranking completions
+_PROFILE_SUBCOMMANDS = ("dump", "off", "on", "reset", "show")
 
 
 def is_libedit():
@@ -23,22 +72,212 @@ class Riposte(PrinterMixin):
         banner: Optional[str] = None,
         history_file: Path = Path.home() / ".riposte",
         history_length: int = 100,
+        shared_history: bool = False,
+        history_search: bool = False,
+        parse_cache_size: int = 256,
+        script_cache: Union[bool, Path] = False,
+        parallel: Optional[Parallel] = None,
+        shards: int = 0,
+        background_jobs: bool = False,
+        pipes: bool = False,
+        printer: PrinterSettings = PrinterSettings(),
+        completion: CompletionSettings = CompletionSettings(),
+        metrics: Optional[MetricsSettings] = None,
+        profiling: Optional[ProfilingSettings] = None,
     ):
         self.banner = banner
         self.print_banner = True
+        self.pipelined = False
+        self.script_cache = script_cache
+        self.parallel = parallel
+        self.shards = shards
+        if shards > 1:
+            _require_fork()
+        self.exit_code = 0
+        self.jobs = JobManager(self) if background_jobs else None
+        self.pipes = pipes
+        self.completion = completion
+        self.completion_cache = (
+            CompletionCache(
+                completion.ttl, completion.cache_size, completion.timeout
+            )
+            if completion.ttl > 0
+            else None
+        )
+        self.history_search = history_search
+        self.metrics = Metrics() if metrics is not None else None
+        self.profiling = profiling
+        self.profiler: Optional[Profiler] = None  # the latest profile
         self.parser = None
         self.arguments = None
         self.input_stream = input_streams.prompt_input(lambda: self.prompt)
 
         self._prompt = prompt
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._usage: Optional[HistoryUsage] = None  # counted on first use
         self._commands: Dict[str, Command] = {}
+        self._hooks: Dict[Hook, List[Callable]] = {hook: [] for hook in Hook}
+        self.command_index = CommandIndex()
+        self._resolve = functools.lru_cache(maxsize=parse_cache_size)(
+            self._resolve_line
+        )
+        self._compose_parsing()
 
         self.setup_cli()
-
-        self._printer_thread = PrinterThread()
-        self._setup_history(history_file, history_length)
+        self._metrics_dumper: Optional[MetricsDumper] = None
+        if metrics is not None:
+            self._setup_metrics(metrics)
+        if self.profiling is not None:
+            self._setup_profiling()
+        if self.jobs is not None:
+            self._setup_jobs()
+
+        self._printer_thread = self._make_printer(printer)
+        self._history_file = (
+            HistoryFile(history_file, history_length)
+            if shared_history
+            else None
+        )
+        if self._history_file is None:
+            self._setup_history(history_file, history_length)
+        else:
+            self._setup_shared_history(history_length)
+        self.history: Optional[History] = None
+        if self.history_search:
+            self._setup_history_search()
         self._setup_completer()
 
+    @staticmethod
+    def _make_printer(settings: PrinterSettings) -> PrinterThread:
+        return PrinterThread(
+            latency=settings.latency,
+            maxsize=settings.queue_size,
+            overflow=settings.overflow,
+        )
+
+    def _setup_metrics(self, settings: MetricsSettings) -> None:
+        self.command("stats", "show command statistics")(self._stats_command)
+        if settings.file is not None:
+            self._metrics_dumper = MetricsDumper(
+                self.metrics, settings.file, settings.interval
+            )
+
+    def _stats_command(self, subcommand: str = "show") -> None:
+        """Print metrics of the commands, times in milliseconds."""
+        if subcommand == "reset":
+            self.metrics.reset()
+            return
+        if subcommand != "show":
+            raise CommandError(f"Unknown subcommand: {subcommand}")
+
+        self.print(
+            f"{'command':<20} {'calls':>7} {'errors':>7} {'parse':>9} "
+            f"{'guides':>9} {'handler':>9} {'p95':>9}"
+        )
+        for metrics in self.metrics.commands:
+            if not metrics.calls:
+                continue
+            self.print(
+                f"{metrics.name:<20} {metrics.calls:>7} "
+                f"{sum(metrics.errors.values()):>7} "
+                f"{metrics.parse.mean * 1000:>9.3f} "
+                f"{metrics.guides.mean * 1000:>9.3f} "
+                f"{metrics.handler.mean * 1000:>9.3f} "
+                f"{metrics.handler.quantile(0.95) * 1000:>9.3f}"
+            )
+
+    def _setup_profiling(self) -> None:
+        self.command("profile", "profile commands")(self._profile_command)
+        self.complete("profile")(self._complete_profile_command)
+
+    def _profile_command(self, subcommand: str = "show", *args: str) -> Any:
+        """Profile commands and print functions taking the most time."""
+        if subcommand == "on":
+            self._stop_profiling()
+            names = args or [
+                name for name in self._commands if name != "profile"
+            ]
+            commands = [self._get_command(name) for name in names]
+            self.profiler = self._new_profiler()
+            for command in commands:
+                command.profile(self.profiler)
+        elif subcommand == "off":
+            self._stop_profiling()
+        elif subcommand == "show":
+            for line in self._profile_report():
+                self.print(line)
+        elif subcommand == "reset":
+            self._latest_profiler().reset()
+        elif subcommand == "dump":
+            if len(args) != 1:
+                raise CommandError("Usage: profile dump <path>")
+            self._latest_profiler().dump(Path(args[0]))
+            self.success(f"Profile written to {args[0]}")
+        else:
+            command = self._get_command(subcommand)
+            if command.profiler is not None:
+                raise CommandError(
+                    f"Command '{subcommand}' is profiled already, "
+                    "see 'profile show'"
+                )
+            self.profiler = self._new_profiler()
+            result = self.profiler.wrap(command.execute)(*args)
+            if inspect.isasyncgen(result) or inspect.isawaitable(result):
+                return self._profiled_async(result)
+            return self._profiled(result)
+
+    def _stop_profiling(self) -> None:
+        for command in self._commands.values():
+            if command.profiler is not None:
+                command.profile(None)
+
+    def _new_profiler(self) -> Profiler:
+        if self.profiling.profiler is ProfilerType.SAMPLING:
+            return SamplingProfiler()
+        return CProfiler()
+
+    def _latest_profiler(self) -> Profiler:
+        if self.profiler is None:
+            raise CommandError("Nothing has been profiled yet")
+        return self.profiler
+
+    def _profile_report(self) -> List[str]:
+        return self._latest_profiler().report(self.profiling.limit)
+
+    def _profiled(self, result: Any) -> Iterator:
+        """Items of the profiled command followed by the report."""
+        if inspect.isgenerator(result):
+            yield from result
+        yield from self._profile_report()
+
+    async def _profiled_async(self, result: Any) -> AsyncIterator:
+        if inspect.isasyncgen(result):
+            async for item in result:
+                yield item
+        else:
+            await result
+        for line in self._profile_report():
+            yield line
+
+    def _complete_profile_command(self, text, line, start_index, end_index):
+        words = line[:start_index].split()
+        if len(words) == 1:
+            names = (*_PROFILE_SUBCOMMANDS, *self.command_index)
+        elif words[1] == "on":
+            names = tuple(self.command_index)
+        else:
+            return []
+        return [
+            name
+            for name in names
+            if name.startswith(text) and name != "profile"
+        ]
+
+    def _setup_jobs(self) -> None:
+        self.command("jobs", "list background jobs")(self.jobs.list_jobs)
+        self.command("wait", "wait for background jobs")(self.jobs.wait)
+        self.command("kill", "cancel background jobs")(self.jobs.kill)
+
     @staticmethod
     def _setup_history(history_file: Path, history_length: int) -> None:
         if not history_file.exists():
@@ -50,12 +289,98 @@ class Riposte(PrinterMixin):
         readline.set_history_length(history_length)
         atexit.register(readline.write_history_file, str(history_file))
 
+    def _setup_shared_history(self, history_length: int) -> None:
+        readline.clear_history()
+        for entry in self._history_file.load():
+            readline.add_history(entry)
+        readline.set_history_length(history_length)
+
+    @staticmethod
+    def _loaded_history() -> List[str]:
+        """Entries loaded into readline's history at start-up."""
+        entries = (
+            readline.get_history_item(idx)
+            for idx in range(1, readline.get_current_history_length() + 1)
+        )
+        return [entry for entry in entries if entry]
+
+    def _setup_history_search(self) -> None:
+        # snapshot, readline's entries shift once `history_length` is reached
+        self.history = History(self._loaded_history())
+        self.command("history", "search input history")(self._history_command)
+        self.complete("history")(self._complete_history_command)
+
+    def _history_command(self, subcommand: str = "list", *text: str) -> None:
+        """Print recent input (matching the text), the newest last."""
+        query = " ".join(text)
+        if subcommand == "list":
+            entries = self.history.recent(_HISTORY_RESULTS)
+        elif subcommand == "prefix":
+            entries = self.history.prefix_search(query, _HISTORY_RESULTS)
+        elif subcommand == "search":
+            entries = self.history.search(query, _HISTORY_RESULTS)
+        else:
+            raise CommandError(f"Unknown subcommand: {subcommand}")
+
+        for entry in reversed(entries):
+            self.print(entry)
+
+    @staticmethod
+    def _complete_history_command(text, line, start_index, end_index):
+        if len(line[:start_index].split()) > 1:
+            return []
+        return [
+            subcommand
+            for subcommand in _HISTORY_SUBCOMMANDS
+            if subcommand.startswith(text)
+        ]
+
+    def _record_history(self, user_input: str) -> None:
+        """Keep track of interactive input.
+
+        Input is indexed for searches (with `history_search` enabled) and,
+        if history is shared, saved to the history file right away.
+        """
+        if self.pipelined:
+            return
+
+        if self.history is not None:
+            self.history.append(user_input)
+        if self._usage is not None:
+            self._usage.add(user_input)
+        if self._history_file is None:
+            return
+
+        self._history_file.append(user_input)
+        length = readline.get_current_history_length()
+        # `input()` adds every line to readline's history, drop duplicates
+        if length > 1 and readline.get_history_item(length - 1) == user_input:
+            readline.remove_history_item(length - 1)
+
     def _setup_completer(self) -> None:
         readline.set_completer(self._complete)
         readline.set_completer_delims(" \t\n;")
         readline.parse_and_bind(
             "bind ^I rl_complete" if is_libedit() else "tab: complete"
         )
+        if self.completion.strategy is CompletionStrategy.FUZZY:
+            readline.set_completion_display_matches_hook(self._display_matches)
+
+    def _display_matches(
+        self, substitution: str, matches: Sequence[str], longest: int
+    ) -> None:
+        """List fuzzy matches ranked, instead of readline's sorted columns."""
+        print()
+        print(
+            *(
+                match
+                for match in self.completion_matches
+                if match != _NO_COMMON_PREFIX
+            ),
+            sep="  ",
+        )
+        print(self.prompt, readline.get_line_buffer(), sep="", end="")
+        sys.stdout.flush()
 
     def _complete(self, text: str, state: int) -> Optional[Sequence[str]]:
         """Return the next possible completion for `text`.
@@ -74,68 +399,212 @@ class Riposte(PrinterMixin):
             if start_index > 0 and line:
                 cmd, *_ = self._parse_line(line)
                 try:
-                    complete_function = self._get_command(cmd).complete
+                    command = self._get_command(cmd)
                 except CommandError:
                     return
+                matches = self._complete_arguments(
+                    command, text, line, start_index, end_index
+                )
             else:
-                complete_function = self._raw_command_completer
+                matches = self._call_completer(
+                    self._raw_command_completer,
+                    text,
+                    line,
+                    start_index,
+                    end_index,
+                )
+
+            if self.completion.prefetch and len(matches) == 1:
+                # line as it's going to be once readline inserts the match
+                self.prefetch_completions(
+                    f"{(line[:start_index] + matches[0]).rstrip()} "
+                )
+            self.completion_matches = matches
 
-            self.completion_matches = complete_function(
+        try:
+            return self.completion_matches[state]
+        except IndexError:
+            return
+
+    def _call_completer(
+        self,
+        complete_function: Callable,
+        *args,
+        run: Optional[Callable[[Awaitable], Any]] = None,
+    ) -> Sequence[str]:
+        matches = complete_function(*args)
+        if inspect.isawaitable(matches):
+            matches = (run or self._await)(matches)
+        return matches
+
+    def _await_in_helper_thread(self, awaitable: Awaitable) -> Any:
+        """`_await` for helper threads computing cached completions.
+
+        Idle loop can't be borrowed, as the main thread might need it before
+        the completion is done, hence coroutine runs on a loop of its own.
+        """
+        if self._loop is not None and self._loop.is_running():
+            return self._await(awaitable)
+        return asyncio.run(_as_coroutine(awaitable))
+
+    def _complete_arguments(
+        self,
+        command: Command,
+        text: str,
+        line: str,
+        start_index: int,
+        end_index: int,
+    ) -> Sequence[str]:
+        """Call completer of the command, cached if the cache is enabled.
+
+        With `history_search` enabled, words entered previously in the same
+        place are suggested if the completer has nothing to offer.
+        """
+        matches = self._call_completer_of(
+            command, text, line, start_index, end_index
+        )
+        if not matches and self.history_search:
+            matches = self.history.complete(
                 text, line, start_index, end_index
             )
+        return matches
+
+    def _call_completer_of(
+        self,
+        command: Command,
+        text: str,
+        line: str,
+        start_index: int,
+        end_index: int,
+    ) -> Sequence[str]:
+        if self.completion_cache is None:
+            return self._call_completer(
+                command.complete, text, line, start_index, end_index
+            )
+
+        compute = functools.partial(
+            self._call_completer,
+            command.complete,
+            text,
+            line,
+            start_index,
+            end_index,
+            run=self._await_in_helper_thread,
+        )
+        return self.completion_cache.get(
+            (command.name, line[:end_index]), compute
+        )
+
+    def prefetch_completions(self, line: str) -> None:
+        """Warm up `completion_cache` with the completions for `line`.
+
+        Completer of the command is called in the background as if TAB was
+        pressed at the end of the line. No-op if the cache is disabled or the
+        command is still being typed.
+        """
+        line = line.lstrip()
+        start_index = max(line.rfind(delimiter) for delimiter in " \t\n;") + 1
+        if self.completion_cache is None or start_index == 0:
+            return
 
         try:
-            return self.completion_matches[state]
-        except IndexError:
+            cmd, *_ = self._parse_line(line)
+        except RiposteException:
+            return
+        command = self._commands.get(cmd)
+        if command is None:
             return
 
-    def contextual_complete(self) -> List[str]:
+        end_index = len(line)
+        compute = functools.partial(
+            self._call_completer,
+            command.complete,
+            line[start_index:],
+            line,
+            start_index,
+            end_index,
+            run=self._await_in_helper_thread,
+        )
+        self.completion_cache.prefetch((command.name, line), compute)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop running coroutine handlers and completers.
+
+        Created on first use and kept for the whole lifetime of the app, so
+        resources bound to the loop (connections, sessions) can be reused
+        between commands.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    def _await(self, awaitable: Awaitable) -> Any:
+        """Run `awaitable` on the app's loop and return its result.
+
+        Works both when the loop is idle and when it's already running in
+        another thread (e.g. completers called by `readline` in the input
+        thread of `AsyncRiposte`).
+        """
+        if self.loop.is_running():
+            return asyncio.run_coroutine_threadsafe(
+                _as_coroutine(awaitable), self.loop
+            ).result()
+        return self.loop.run_until_complete(awaitable)
+
+    def _execute(self, command: Command, args: Sequence[str]) -> None:
+        """Execute command, stream generators and await coroutines."""
+        _consume(command.execute(*args), self.print, self._await)
+
+    def contextual_complete(self) -> Iterable[str]:
         """Entry point for contextual tab completion.
 
         Entry point for contextual tab completion depending on `Riposte` app
-        state. Overwrite this method to suggest suitable commands.
+        state. Overwrite this method to suggest suitable commands. Returning
+        `command_index` or its `view()` keeps the lookup proportional to the
+        number of matches, any other iterable is scanned as a whole.
         """
-        return list(self._commands.keys())
+        return self.command_index
 
     def _raw_command_completer(
         self, text, line, start_index, end_index
     ) -> List[str]:
         """Complete command w/o any argument"""
-        results = [
-            command
-            for command in self.contextual_complete()
-            if command.startswith(text)
-        ]
+        commands = self.contextual_complete()
+        if self.completion.strategy is CompletionStrategy.FUZZY:
+            index = (
+                commands.fuzzy()
+                if isinstance(commands, IndexView)
+                else FuzzyIndex(commands)
+            )
+            results = index.search(
+                text, self._history_usage(), limit=_FUZZY_RESULTS
+            )
+            if len(results) > 1 and not all(
+                result.startswith(text) for result in results
+            ):
+                # readline replaces the text with the longest common prefix
+                # of the matches, without any the text is kept as typed
+                results.append(_NO_COMMON_PREFIX)
+        elif isinstance(commands, IndexView):
+            results = commands.complete(text)
+        else:
+            results = [
+                command for command in commands if command.startswith(text)
+            ]
         if len(results) == 1:
             results[0] = f"{results[0]} "
         return results
 
-    @staticmethod
-    def _split_inline_commands(line: str) -> List[str]:
-        """Split multiple inline commands."""
-        parsed = shlex.split(line, posix=False)
-
-        commands = []
-        command = []
-        for element in parsed:
-            if element[-2:] == "\\;":
-                command.append(element)
-            elif element[-2:] == ";;":
-                raise CommandError("unexpected token: ;;")
-            elif element[-1] == ";" and element[:-1] != "":
-                command.append(element[:-1])
-                commands.append(command)
-                command = []
-            elif element[-1] == ";" and element[:-1] == "":
-                commands.append(command)
-                command = []
-            else:
-                command.append(element)
-
-        if command:
-            commands.append(command)
-
-        return [" ".join(command) for command in commands if command]
+    def _history_usage(self) -> HistoryUsage:
+        """Usage of the commands, counted from the loaded history once."""
+        if self._usage is None:
+            length = readline.get_current_history_length()
+            self._usage = HistoryUsage(
+                readline.get_history_item(idx)
+                for idx in range(max(length - _USAGE_LINES, 0) + 1, length + 1)
+            )
+        return self._usage
 
     @staticmethod
     def _parse_line(line: str) -> List[str]:
@@ -150,8 +619,83 @@ class Riposte(PrinterMixin):
         try:
             return self._commands[command_name]
         except KeyError:
+            if command_name == lexer.BACKGROUND and self.jobs is not None:
+                return self.jobs.command
             raise CommandError(f"Unknown command: {command_name}")
 
+    def _resolve_line(
+        self, line: str, operators: str
+    ) -> Tuple[Tuple[Command, Tuple], ...]:
+        """Resolve line of input into commands and their raw arguments.
+
+        Results are memoized by `_resolve` LRU cache which is invalidated
+        every time new command is registered. Enabled `operators` are part
+        of the key, the same line means something else without them.
+        """
+        return self._resolve_tokens(lexer.tokenize(line, operators))
+
+    @property
+    def operators(self) -> str:
+        """Operators enabled in the input, see `lexer` module."""
+        return (lexer.BACKGROUND if self.jobs is not None else "") + (
+            lexer.PIPE if self.pipes else ""
+        )
+
+    def _resolve_command(
+        self, command_name: str, args: Sequence
+    ) -> Tuple[Union[Command, Pipeline], Tuple]:
+        """Resolve single tokenized command."""
+        if command_name == lexer.PIPE and self.pipes:
+            return (
+                Pipeline([self._get_command(name) for name, *_ in args]),
+                tuple(tuple(stage_args) for _, *stage_args in args),
+            )
+        return self._get_command(command_name), tuple(args)
+
+    def _resolve_tokens(
+        self, tokens: Iterable[Tuple[str, Sequence]]
+    ) -> Tuple[Tuple[Union[Command, Pipeline], Tuple], ...]:
+        """Resolve already tokenized line into commands and raw arguments."""
+        return tuple(
+            self._resolve_command(command_name, args)
+            for command_name, args in tokens
+        )
+
+    def _resolve_input(
+        self, user_input: Union[str, tuple]
+    ) -> Tuple[Tuple[Command, Tuple], ...]:
+        """Resolve whatever input stream delivered into commands.
+
+        Replaced by its composition with pre-parse hooks and measurement of
+        parsing, if any, see `_compose_parsing`.
+        """
+        if isinstance(user_input, str):
+            return self._resolve(user_input, self.operators)
+        else:  # line of compiled script, tokenized already
+            return self._resolve_tokens(user_input)
+
+    def _compose_parsing(self) -> None:
+        resolve = None
+        if self.metrics is not None:
+            resolve = functools.partial(
+                self.metrics.measure_parsing,
+                functools.partial(type(self)._resolve_input, self),
+            )
+        if self._hooks[Hook.PRE_PARSE]:
+            resolve = with_pre_parse(
+                resolve or functools.partial(type(self)._resolve_input, self),
+                tuple(self._hooks[Hook.PRE_PARSE]),
+            )
+
+        if resolve is None:
+            self.__dict__.pop("_resolve_input", None)
+        else:
+            self._resolve_input = resolve
+
+    def parse_cache_info(self):
+        """Hit/miss statistics of the parsed input lines cache."""
+        return self._resolve.cache_info()
+
     def setup_cli(self):
         """Initialize CLI
 
@@ -173,12 +717,24 @@ class Riposte(PrinterMixin):
         self.arguments = self.parser.parse_args()
         if self.arguments.c:
             self.print_banner = False
+            self.pipelined = True
             self.input_stream = input_streams.cli_input(self.arguments.c)
         elif self.arguments.file:
             self.print_banner = False
-            self.input_stream = input_streams.file_input(
-                Path(self.arguments.file)
-            )
+            self.pipelined = True
+            self.input_stream = self._file_input(Path(self.arguments.file))
+
+    def _file_input(self, path: Path) -> Iterator[Callable]:
+        """Pick file input stream according to `script_cache` setting."""
+        if not self.script_cache:
+            return input_streams.file_input(path)
+
+        return input_streams.compiled_file_input(
+            path,
+            commands=frozenset(self._commands),
+            cache_dir=None if self.script_cache is True else self.script_cache,
+            operators=self.operators,
+        )
 
     @property
     def prompt(self):
@@ -199,13 +755,47 @@ class Riposte(PrinterMixin):
 
         def wrapper(func: Callable):
             if name not in self._commands:
-                self._commands[name] = Command(name, func, description, guides)
+                command = Command(name, func, description, guides)
+                if self.metrics is not None:
+                    command.measure(self.metrics.command(name))
+                if any(self._hooks.values()):
+                    self._apply_hooks(command)
+                self._commands[name] = command
+                self.command_index.add(name)
+                self._resolve.cache_clear()
             else:
                 raise RiposteException(f"'{name}' command already exists.")
             return func
 
         return wrapper
 
+    def hook(self, hook: Union[Hook, str]) -> Callable:
+        """Decorator for registering hook function, see `Hook`.
+
+        Hooks are called in order of registration. Every command is composed
+        with its hooks right away, so executing it doesn't involve looking
+        them up.
+        """
+        hook = Hook(hook)
+
+        def wrapper(func: Callable):
+            self._hooks[hook].append(func)
+            if hook is Hook.PRE_PARSE:
+                self._compose_parsing()
+            else:
+                for command in self._commands.values():
+                    self._apply_hooks(command)
+            return func
+
+        return wrapper
+
+    def _apply_hooks(self, command: Command) -> None:
+        command.set_hooks(
+            self._hooks[Hook.PRE_EXECUTE],
+            self._hooks[Hook.POST_EXECUTE],
+            self._hooks[Hook.ON_ERROR],
+        )
+
     def complete(self, command: str) -> Callable:
         """Decorator for bounding complete function with `Command`."""
 
@@ -226,12 +816,44 @@ class Riposte(PrinterMixin):
         if not user_input:
             return
 
-        for line in self._split_inline_commands(user_input):
-            command_name, *args = self._parse_line(line)
-            self._get_command(command_name).execute(*args)
+        self._record_history(user_input)
+        try:
+            for command, args in self._resolve_input(user_input):
+                self._execute(command, args)
+        except (RiposteException, StopRiposteException) as err:
+            err.line_number = self._line_number()
+            raise
+
+    def _line_number(self) -> Optional[int]:
+        """Number of the current line of the script, `None` for other input."""
+        if isinstance(self.input_stream, _SCRIPT_INPUTS):
+            return self.input_stream.line_number
+        return None
+
+    def _report(self, err: Exception) -> None:
+        """Print error, prefixed with the line of the script it comes from.
+
+        Failure of non-interactive input makes the whole run fail, see
+        `exit_code`.
+        """
+        if self.pipelined:
+            self.exit_code = 1
 
-    def run(self) -> None:
+        line_number = getattr(err, "line_number", None)
+        if line_number is None:
+            self.error(err)
+        else:
+            self.error(f"line {line_number}:", err)
+
+    def run(self) -> int:
+        """Run the input stream to the end and return `exit_code`.
+
+        Exit code is non-zero if any line of non-interactive input (`-c`
+        switch or a file) failed, interactive input always succeeds.
+        """
         self._printer_thread.start()
+        if self._metrics_dumper is not None:
+            self._metrics_dumper.start()
 
         self.parse_cli_arguments()
 
@@ -239,13 +861,55 @@ class Riposte(PrinterMixin):
             # builtin print() to avoid race condition with input()
             print(self.banner)
 
+        if (
+            self.shards > 1
+            and isinstance(self.input_stream, input_streams.FileInput)
+            # pipes can be read only once, from the beginning to the end
+            and os.path.isfile(self.input_stream.path)
+        ):
+            self._run_sharded()
+        elif self.parallel is not None and self.pipelined:
+            self._run_parallel()
+        else:
+            self._run_sequential()
+        if isinstance(self.input_stream, input_streams.FileInput):
+            self.input_stream.close()  # stopped before the end of the file
+
+        if self.jobs is not None:
+            self.jobs.shutdown()
+        if self.completion_cache is not None:
+            self.completion_cache.shutdown()
+        if self._metrics_dumper is not None:
+            self._metrics_dumper.stop()
+        self._close_loop()
+        self._printer_thread.close()
+        return self.exit_code
+
+    def _close_loop(self) -> None:
+        if self._loop is None:
+            return
+        try:
+            # same clean up as `asyncio.run()` does
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    def _run_sequential(self) -> None:
         while True:
             try:
                 self._process()
             except RiposteException as err:
-                self.error(err)
+                self._report(err)
             except StopRiposteException as err:
-                self.error(err)
+                self._report(err)
                 break
             except EOFError:
                 self.print()
@@ -255,4 +919,32 @@ class Riposte(PrinterMixin):
             except KeyboardInterrupt:
                 self.print()
             finally:
-                self._printer_thread.wait()
+                if not self.pipelined:
+                    self._printer_thread.wait()
+
+    def _run_parallel(self) -> None:
+        try:
+            ParallelRunner(self, self.parallel).run()
+        except StopRiposteException as err:
+            self._report(err)
+        except KeyboardInterrupt:
+            self.print()
+
+    def _run_sharded(self) -> None:
+        try:
+            self.exit_code = ShardedRunner(
+                self, self.input_stream.path, self.shards
+            ).run()
+        except StopRiposteException as err:
+            self._report(err)
+        except KeyboardInterrupt:
+            self.print()
+            self.exit_code = 130
+
+    def sync(self) -> None:
+        """Block until everything printed so far is written out.
+
+        Useful in `pipelined` mode, where commands don't wait for the output
+        of previous ones, e.g. before handing the terminal over to `input()`.
+        """
+        self._printer_thread.wait()
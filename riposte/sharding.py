@@ -0,0 +1,275 @@
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+import os
+from pathlib import Path
+import sys
+import time
+import traceback
+import typing
+
+from .exceptions import RiposteException, StopRiposteException
+from .input_streams import FileInput
+from .printer.mixins import capture_output
+from .printer.thread import PrintResource, render
+
+if typing.TYPE_CHECKING:
+    from .riposte import Riposte
+
+OUTPUT, PROGRESS, DONE = "output", "progress", "done"
+
+
+class Shard(typing.NamedTuple):
+    index: int
+    start: int  # byte offset of the first line
+    end: int  # byte offset right after the last line
+
+
+class ShardStatus:
+    """Progress and result of a single shard."""
+
+    def __init__(self, shard: Shard):
+        self.shard = shard
+        self.position = shard.start
+        self.lines = 0
+        self.executed = 0
+        self.failed = 0
+        self.exit_code: typing.Optional[int] = None
+
+    @property
+    def progress(self) -> float:
+        size = self.shard.end - self.shard.start
+        return 1.0 if not size else (self.position - self.shard.start) / size
+
+    def __str__(self):
+        return (
+            f"shard {self.shard.index}: {self.progress:.0%}, "
+            f"{self.lines} lines, {self.executed} commands, "
+            f"{self.failed} failed"
+        )
+
+
+def split_script(path: Path, shards: int) -> typing.List[Shard]:
+    """Split script into `shards` byte ranges aligned to line boundaries."""
+    with open(path, "rb") as file_handler:
+        size = os.fstat(file_handler.fileno()).st_size
+        boundaries = [0]
+        for index in range(1, shards):
+            file_handler.seek(max(size * index // shards, boundaries[-1]))
+            if file_handler.tell():
+                file_handler.seek(file_handler.tell() - 1)
+                file_handler.readline()  # move to the start of the next line
+            boundaries.append(file_handler.tell())
+        boundaries.append(size)
+
+    return [
+        Shard(index, start, end)
+        for index, (start, end) in enumerate(zip(boundaries, boundaries[1:]))
+    ]
+
+
+def _lines_before(path: Path, offset: int) -> int:
+    """Number of lines of the script preceding given byte offset."""
+    # lines are split on bytes, latin-1 just never fails to decode them
+    input_stream = FileInput(path, end=offset, encoding="latin-1")
+    for _ in input_stream:
+        pass
+    return input_stream.line_number
+
+
+def _send_output(
+    connection: Connection, resources: typing.List[PrintResource]
+) -> None:
+    """Send output addressed to standard streams to the parent.
+
+    Output addressed to any other file is written by the worker itself.
+    """
+    output = []
+    for resource in resources:
+        file = sys.stdout if resource.file is None else resource.file
+        if file in (sys.stdout, sys.__stdout__):
+            output.append((False, render(resource)))
+        elif file in (sys.stderr, sys.__stderr__):
+            output.append((True, render(resource)))
+        else:
+            file.write(render(resource))
+            file.flush()
+
+    if output:
+        connection.send((OUTPUT, output))
+
+
+def _worker(
+    repl: "Riposte",
+    path: Path,
+    shard: Shard,
+    connection: Connection,
+    progress_interval: float,
+) -> None:
+    """Execute commands from the single shard in a forked process."""
+    input_stream = FileInput(path, offset=shard.start, end=shard.end)
+    repl._loop = None  # never reuse event loop (and its selector) of parent
+    executed = failed = 0
+    reported = time.monotonic()
+    exit_code = 0
+    preceding = None  # lines of the previous shards, counted on first error
+
+    def fail(err: Exception) -> None:
+        nonlocal preceding, failed, exit_code
+        if preceding is None:
+            preceding = _lines_before(path, shard.start)
+        err.line_number = preceding + input_stream.line_number
+        repl._report(err)
+        failed += 1
+        exit_code = 1
+
+    def progress() -> tuple:
+        return (
+            PROGRESS,
+            input_stream.line_number,
+            input_stream.offset,
+            executed,
+            failed,
+        )
+
+    for line in input_stream:
+        with capture_output() as resources:
+            try:
+                user_input = line()
+                commands = repl._resolve_input(user_input) if user_input else ()
+                for command, args in commands:
+                    repl._execute(command, args)
+                    executed += 1
+            except RiposteException as err:
+                fail(err)
+            except StopRiposteException as err:
+                fail(err)
+                break
+            finally:
+                _send_output(connection, resources)
+
+        if time.monotonic() - reported >= progress_interval:
+            connection.send(progress())
+            reported = time.monotonic()
+
+    connection.send(progress())
+    connection.send((DONE, executed, failed))
+    connection.close()
+    sys.exit(exit_code)
+
+
+def _run_worker(*args) -> None:
+    try:
+        _worker(*args)
+    except SystemExit:
+        raise
+    except BaseException:
+        traceback.print_exc()
+        sys.exit(1)
+
+
+def _require_fork() -> None:
+    if not hasattr(os, "fork"):
+        raise ValueError(
+            "Sharded execution forks worker processes, "
+            "os.fork() isn't available on this platform"
+        )
+
+
+class ShardedRunner:
+    """Execute script split into shards, each in a separate worker process.
+
+    Worker processes are forked, so every one of them inherits registered
+    commands of `repl`. Output printed to standard streams is sent to the
+    parent and printed there, grouped per line of the script. Progress of
+    every shard is reported every `progress_interval` seconds (`None`
+    disables it), summary is printed at the end. Progress and summary go to
+    standard error, to keep standard output for the commands.
+    """
+
+    def __init__(
+        self,
+        repl: "Riposte",
+        path: Path,
+        shards: int,
+        progress_interval: typing.Optional[float] = 1.0,
+    ):
+        _require_fork()
+        self.repl = repl
+        self.path = path
+        self.shards = shards
+        self.progress_interval = progress_interval
+        self.statuses: typing.List[ShardStatus] = []
+
+    def _report(self, message: str) -> None:
+        self.repl.status(message, file=sys.stderr)
+
+    def _handle(self, status: ShardStatus, message: tuple) -> None:
+        kind, *payload = message
+        if kind == OUTPUT:
+            (output,) = payload
+            for to_stderr, text in output:
+                self.repl.print(
+                    text, end="", file=sys.stderr if to_stderr else sys.stdout
+                )
+        elif kind == PROGRESS:
+            (
+                status.lines,
+                status.position,
+                status.executed,
+                status.failed,
+            ) = payload
+            if self.progress_interval is not None:
+                self._report(str(status))
+        elif kind == DONE:
+            status.executed, status.failed = payload
+
+    def run(self) -> int:
+        """Run the shards and return the merged exit code."""
+        try:
+            shards = split_script(self.path, self.shards)
+        except OSError:
+            raise StopRiposteException(
+                f"Problem with reading the file: {self.path}"
+            )
+
+        context = multiprocessing.get_context("fork")
+        self.repl.sync()  # don't let workers inherit pending output
+
+        workers = {}
+        for shard in shards:
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_run_worker,
+                args=(
+                    self.repl,
+                    self.path,
+                    shard,
+                    writer,
+                    self.progress_interval or float("inf"),
+                ),
+                daemon=True,
+            )
+            process.start()
+            writer.close()
+            status = ShardStatus(shard)
+            self.statuses.append(status)
+            workers[reader] = (process, status)
+
+        while workers:
+            for reader in wait(list(workers)):
+                process, status = workers[reader]
+                try:
+                    self._handle(status, reader.recv())
+                except EOFError:
+                    del workers[reader]
+                    process.join()
+                    status.exit_code = (
+                        128 - process.exitcode
+                        if process.exitcode < 0
+                        else process.exitcode
+                    )
+
+        for status in self.statuses:
+            self._report(f"{status}, exit code {status.exit_code}")
+
+        return max(status.exit_code for status in self.statuses)
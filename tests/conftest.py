@@ -1,4 +1,5 @@
-from unittest.mock import Mock
+from typing import Any, List
+from unittest.mock import ANY, Mock
 
 import pytest
 
@@ -11,6 +12,26 @@ def repl(history_file):
     return Riposte(history_file=history_file)
 
 
+@pytest.fixture
+def repl_options():
+    """Options of `mocked_repl`, override or parametrize it to change them."""
+    return {}
+
+
+@pytest.fixture
+def mocked_repl(history_file, repl_options):
+    """`Riposte` built with `repl_options`, printing into a mocked printer.
+
+    `repl_class` option picks its subclass, e.g. `AsyncRiposte`.
+    """
+    options = dict(repl_options)
+    repl_class = options.pop("repl_class", Riposte)
+    repl = repl_class(history_file=history_file, **options)
+    repl._printer_thread = Mock()
+    repl.parse_cli_arguments = Mock()
+    return repl
+
+
 @pytest.fixture
 def foo_command(repl: Riposte):
     repl.command(name="foo")(
@@ -31,3 +52,31 @@ def command():
         func=Mock(name="mocked_handling_function", __annotations__={}),
         description="foo description",
     )
+
+
+@pytest.fixture
+def process():
+    """Process a single line of input, as if it was typed in."""
+
+    def process(repl: Riposte, line: str) -> None:
+        repl.input_stream = iter([lambda: line])
+        repl._process()
+
+    return process
+
+
+@pytest.fixture
+def printed():
+    """Contents of everything `repl` printed through its mocked printer.
+
+    Given `file`, only contents of resources addressed to it.
+    """
+
+    def printed(repl: Riposte, file: Any = ANY) -> List[tuple]:
+        return [
+            resource.content
+            for (resource,), _ in repl._printer_thread.put.call_args_list
+            if file == resource.file
+        ]
+
+    return printed
@@ -0,0 +1,290 @@
+import asyncio
+import signal
+import threading
+from unittest import mock
+
+import pytest
+
+from riposte import AsyncRiposte, input_streams
+from riposte.aio import _InputReader
+from riposte.exceptions import RiposteException, StopRiposteException
+from riposte.printer import OverflowPolicy, PrinterSettings
+from riposte.printer.loop import LoopPrinter
+
+
+@pytest.fixture
+def repl_options():
+    return {"repl_class": AsyncRiposte}
+
+
+def pipeline(repl: AsyncRiposte, *lines: str) -> None:
+    repl.pipelined = True
+    repl.input_stream = iter([lambda line=line: line for line in lines])
+
+
+def test_printer(history_file):
+    repl = AsyncRiposte(
+        history_file=history_file, printer=PrinterSettings(latency=0.01)
+    )
+    assert isinstance(repl._printer_thread, LoopPrinter)
+    assert repl._printer_thread.latency == 0.01
+
+
+@pytest.mark.parametrize(
+    "options",
+    (
+        {"queue_size": 10},
+        {"overflow": OverflowPolicy.DROP_OLDEST},
+    ),
+)
+def test_printer_unsupported_options(history_file, options):
+    with pytest.raises(ValueError):
+        AsyncRiposte(
+            history_file=history_file, printer=PrinterSettings(**options)
+        )
+
+
+def test_pipelined_commands_run_concurrently(
+    mocked_repl: AsyncRiposte, printed
+):
+    event = asyncio.Event()
+
+    @mocked_repl.command("wait")
+    async def wait():
+        mocked_repl.print("waiting")
+        await event.wait()
+        mocked_repl.print("released")
+
+    @mocked_repl.command("release")
+    async def release():
+        event.set()
+        mocked_repl.print("releasing")
+
+    pipeline(mocked_repl, "wait; release")
+
+    mocked_repl.run()
+
+    # output of every command is kept together
+    assert printed(mocked_repl) == [
+        ("releasing",),
+        ("waiting",),
+        ("released",),
+    ]
+
+
+def test_pipelined_script_errors(mocked_repl: AsyncRiposte, printed, tmp_path):
+    @mocked_repl.command("fail")
+    async def fail():
+        raise RiposteException("failed")
+
+    script = tmp_path / "script.rpst"
+    script.write_text("fail\nfoo\n")
+    mocked_repl.pipelined = True
+    mocked_repl.input_stream = input_streams.file_input(script)
+
+    assert mocked_repl.run() == 1
+    assert sorted(line[1] for line in printed(mocked_repl)) == [
+        "line 1:",
+        "line 2:",
+    ]
+
+
+def test_concurrency_limit(mocked_repl: AsyncRiposte, printed):
+    mocked_repl.concurrency = 1
+    running = []
+
+    @mocked_repl.command("sleep")
+    async def sleep(name: str):
+        running.append(name)
+        assert len(running) == 1
+        await asyncio.sleep(0)
+        running.remove(name)
+        mocked_repl.print(name)
+
+    pipeline(mocked_repl, "sleep a; sleep b", "sleep c")
+
+    mocked_repl.run()
+
+    assert printed(mocked_repl) == [("a",), ("b",), ("c",)]
+
+
+def test_regular_handler(mocked_repl: AsyncRiposte, printed):
+    @mocked_repl.command("hello")
+    def hello(name: str):
+        mocked_repl.print("hello", name)
+
+    pipeline(mocked_repl, "hello foo")
+
+    mocked_repl.run()
+
+    assert printed(mocked_repl) == [("hello", "foo")]
+
+
+def test_errors(mocked_repl: AsyncRiposte, printed):
+    @mocked_repl.command("fail")
+    async def fail():
+        raise RiposteException("failed")
+
+    pipeline(mocked_repl, "fail", "unknown", "fail")
+
+    mocked_repl.run()
+
+    # errors don't stop the execution, they are printed once they happen
+    assert sorted(str(content[1]) for content in printed(mocked_repl)) == [
+        "Unknown command: unknown",
+        "failed",
+        "failed",
+    ]
+
+
+def test_stop(mocked_repl: AsyncRiposte, printed):
+    executed = []
+
+    @mocked_repl.command("stop")
+    async def stop():
+        raise StopRiposteException("stopped")
+
+    @mocked_repl.command("noop")
+    async def noop():
+        executed.append(True)
+
+    pipeline(mocked_repl, "stop", "noop", "noop")
+
+    mocked_repl.run()
+
+    assert executed == []
+    assert str(printed(mocked_repl)[0][1]) == "stopped"
+
+
+def test_unexpected_error(mocked_repl: AsyncRiposte):
+    @mocked_repl.command("crash")
+    async def crash():
+        raise ValueError("crashed")
+
+    pipeline(mocked_repl, "crash")
+
+    with pytest.raises(ValueError):
+        mocked_repl.run()
+
+
+@mock.patch("builtins.input", side_effect=["foo bar", "foo baz", EOFError])
+def test_interactive(mocked_input, mocked_repl: AsyncRiposte, printed):
+    loops = []
+
+    @mocked_repl.command("foo")
+    async def foo(arg: str):
+        loops.append(asyncio.get_running_loop())
+        mocked_repl.print(arg)
+
+    mocked_repl.run()
+
+    assert printed(mocked_repl) == [("bar",), ("baz",), ()]
+    assert loops[0] is loops[1]  # loop is kept between commands
+    assert mocked_repl._loop is None  # and closed at the end
+
+
+@mock.patch("builtins.input", side_effect=["foo", "foo", EOFError])
+def test_interactive_background_task(mocked_input, mocked_repl: AsyncRiposte):
+    tasks = []
+
+    @mocked_repl.command("foo")
+    async def foo():
+        tasks.append(asyncio.create_task(asyncio.sleep(0)))
+
+    mocked_repl.run()
+
+    assert len(tasks) == 2
+    assert all(task.done() for task in tasks)
+
+
+@mock.patch("builtins.input", side_effect=["foo", "foo", EOFError])
+def test_interactive_single_input_thread(
+    mocked_input, mocked_repl: AsyncRiposte
+):
+    readers = []
+
+    @mocked_repl.command("foo")
+    async def foo():
+        readers.append(mocked_repl._input_reader)
+
+    mocked_repl.run()
+
+    assert readers[0] is readers[1]
+    assert readers[0].is_alive()
+
+
+@mock.patch("builtins.input", side_effect=["hang", "foo bar", EOFError])
+def test_interactive_ctrl_c(mocked_input, mocked_repl: AsyncRiposte, printed):
+    @mocked_repl.command("hang")
+    async def hang():
+        signal.raise_signal(signal.SIGINT)
+        await asyncio.Event().wait()
+
+    @mocked_repl.command("foo")
+    async def foo(arg: str):
+        mocked_repl.print(arg)
+
+    mocked_repl.run()
+
+    # line is discarded, session goes on
+    assert printed(mocked_repl) == [(), ("bar",), ()]
+
+
+def test_input_reader_interrupted():
+    released = threading.Event()
+
+    def read():
+        released.wait()
+        return "foo"
+
+    async def main():
+        reader = _InputReader(read)
+        reader.start()
+        loop = asyncio.get_running_loop()
+
+        interrupted = reader.request(loop)
+        interrupted.cancel()
+        pending = reader.request(loop)
+        released.set()
+
+        return await asyncio.wait_for(pending, 1)
+
+    # line read while interrupted is delivered to the next request
+    assert asyncio.run(main()) == "foo"
+
+
+def test_cli_input(mocked_repl: AsyncRiposte):
+    handler = mock.Mock()
+
+    @mocked_repl.command("foo")
+    async def foo(arg: str):
+        handler(arg)
+
+    mocked_repl.pipelined = True
+    mocked_repl.input_stream = input_streams.cli_input("foo bar; foo baz")
+
+    mocked_repl.run()
+
+    assert handler.call_args_list == [mock.call("bar"), mock.call("baz")]
+
+
+def test_generator_handlers(mocked_repl: AsyncRiposte, printed):
+    @mocked_repl.command("numbers")
+    def numbers(limit: int):
+        yield from range(limit)
+
+    @mocked_repl.command("letters")
+    async def letters(word: str):
+        for letter in word:
+            await asyncio.sleep(0)
+            yield letter
+
+    pipeline(mocked_repl, "numbers 2", "letters ab")
+
+    mocked_repl.run()
+
+    # output is grouped per command, in the order of completion
+    assert printed(mocked_repl) in (
+        [(0,), (1,), ("a",), ("b",)],
+        [("a",), ("b",), (0,), (1,)],
+    )
@@ -1,9 +1,11 @@
+import asyncio
 import inspect
+from typing import List
 from unittest import mock
 
 import pytest
 
-from riposte.command import Command
+from riposte.command import BindingPlan, Command, Pipeline, _consume
 from riposte.exceptions import CommandError
 
 
@@ -81,20 +83,13 @@ def test_command_setup_guides_update(mocked_extract_guides):
     assert command._guides == guides
 
 
-def test_apply_guides(command):
+def test_apply_guides():
     def foo(x: int, *args: int):
         pass
 
-    command._func = foo
-    args = ("1", "2", "3")
-    command._process_arguments = mock.Mock(side_effect=([1], [2, 3]))
-    bound_arguments = inspect.signature(foo).bind(*args)
+    command = Command("foo", foo, "description")
 
-    assert command._apply_guides(bound_arguments) == [1, 2, 3]
-    assert command._process_arguments.call_args_list == [
-        mock.call("x", "1"),
-        mock.call("args", "2", "3"),
-    ]
+    assert command._apply_guides(("1", "2", "3")) == [1, 2, 3]
 
 
 @pytest.mark.parametrize("guides", (1, "str", (int), [2.0]))
@@ -104,40 +99,231 @@ def test_validate_guides(command, guides):
         command._validate_guides()
 
 
-@mock.patch("riposte.command.inspect", new_callable=mock.MagicMock)
-def test_bind_arguments(inspect_mock, command):
-    args = (1, 2)
-    command._bind_arguments(*args)
+def test_compile_binding_plan():
+    guide = mock.Mock()
 
-    inspect_mock.signature.assert_called_once_with(command._func)
-    inspect_mock.signature.return_value.bind.assert_called_once_with(*args)
+    def foo(x, y: str, z=1, *args: bytes, w, v=2, **kwargs):
+        pass
 
+    command = Command("foo", foo, "description", guides={"x": [guide]})
+
+    assert command._plan.var_guide(["a", "b"]) == [b"a", b"b"]
+    assert command._plan._replace(var_guide=None) == BindingPlan(
+        min_arity=2,
+        max_arity=None,
+        guides=(guide, None, None),
+        var_positional=3,
+        var_guide=None,
+        required=("x", "y"),
+        required_keyword="w",
+        accepts_stdin=False,
+        requires_stdin=False,
+    )
 
-@mock.patch("riposte.command.inspect", new_callable=mock.MagicMock)
-def test_bind_arguments_exception(inspect_mock, command):
-    args = (1, 2)
-    inspect_mock.signature.return_value.bind.side_effect = TypeError
 
-    with pytest.raises(CommandError):
-        command._bind_arguments(*args)
+def test_compile_binding_plan_composed_guides():
+    def foo(x):
+        pass
+
+    command = Command(
+        "foo",
+        foo,
+        "description",
+        guides={"x": [lambda x: x + "_", lambda x: x + "@"]},
+    )
+
+    assert command._plan.guides[0]("1") == "1_@"
+
+
+def test_apply_guides_var_positional_batch():
+    def foo(*args: List[int]):
+        pass
+
+    command = Command("foo", foo, "description")
+
+    assert command._apply_guides(("[1]", "[2, 3]")) == [[1], [2, 3]]
+
+
+def test_compile_binding_plan_no_var_positional():
+    def foo(x, y=1):
+        pass
+
+    command = Command("foo", foo, "description")
+
+    assert command._plan.min_arity == 1
+    assert command._plan.max_arity == 2
+    assert command._plan.var_positional is None
 
-    inspect_mock.signature.assert_called_once_with(command._func)
-    inspect_mock.signature.return_value.bind.assert_called_once_with(*args)
+
+def bind_with_signature(func, *args):
+    try:
+        inspect.signature(func).bind(*args)
+    except TypeError as e:
+        return str(e)
+
+
+def no_args():
+    pass
+
+
+def positional(x, y, z=1):
+    pass
+
+
+def variadic(x, *args):
+    pass
+
+
+def keyword_only(x, *, y):
+    pass
 
 
 @pytest.mark.parametrize(
-    "args, guides, expected_value",
+    ("func", "args"),
     (
-        (("1",), {}, ["1"]),
-        (("1",), {"foo": (lambda x: x + "_",)}, ["1_"]),
-        (("1", "2"), {"foo": (lambda x: x + "_",)}, ["1_", "2_"]),
-        (
-            ("1", "2"),
-            {"foo": (lambda x: x + "_", lambda x: x + "@")},
-            ["1_@", "2_@"],
-        ),
+        (no_args, ()),
+        (no_args, ("1",)),
+        (positional, ()),
+        (positional, ("1",)),
+        (positional, ("1", "2")),
+        (positional, ("1", "2", "3")),
+        (positional, ("1", "2", "3", "4")),
+        (variadic, ()),
+        (variadic, ("1", "2", "3")),
+        (keyword_only, ()),
+        (keyword_only, ("1",)),
+        (keyword_only, ("1", "2")),
     ),
 )
-def test_process_arguments(args, guides, expected_value, command):
-    command._guides = guides
-    assert command._process_arguments("foo", *args) == expected_value
+def test_bind_arguments(func, args):
+    command = Command("foo", func, "description")
+    expected_error = bind_with_signature(func, *args)
+
+    if expected_error is None:
+        assert command._bind_arguments(*args) == args
+    else:
+        with pytest.raises(CommandError, match=expected_error):
+            command._bind_arguments(*args)
+
+
+def test_execute_stdin():
+    def grep(pattern: str, *, stdin):
+        return [item for item in stdin if pattern in item]
+
+    command = Command("grep", grep, "description")
+
+    assert command.accepts_stdin
+    assert command.execute("a", stdin=iter(["abc", "xyz"])) == ["abc"]
+    with pytest.raises(CommandError, match="missing a required argument"):
+        command.execute("a")
+
+
+def test_execute_optional_stdin():
+    def count(*, stdin=()):
+        return sum(1 for _ in stdin)
+
+    command = Command("count", count, "description")
+
+    assert command.execute() == 0
+    assert command.execute(stdin=iter("abc")) == 3
+
+
+def test_pipeline():
+    consumed = []
+
+    def numbers(limit: int):
+        for number in range(limit):
+            consumed.append(number)
+            yield number
+
+    def double(*, stdin):
+        for number in stdin:
+            yield number * 2
+
+    pipeline = Pipeline(
+        [
+            Command("numbers", numbers, ""),
+            Command("double", double, ""),
+        ]
+    )
+    result = pipeline.execute(("3",), ())
+
+    assert pipeline.name == "numbers | double"
+    assert consumed == []  # items flow lazily
+    assert next(result) == 0
+    assert consumed == [0]
+    assert list(result) == [2, 4]
+
+
+def test_pipeline_stdin_not_accepted():
+    with pytest.raises(CommandError, match="doesn't accept piped input"):
+        Pipeline(
+            [
+                Command("foo", lambda: None, ""),
+                Command("bar", lambda: None, ""),
+            ]
+        )
+
+
+@pytest.mark.parametrize(
+    ("output", "expected"), ((None, []), ([1, 2], [1, 2]), ("ab", ["a", "b"]))
+)
+def test_pipeline_output(output, expected):
+    def consume(*, stdin):
+        return list(stdin)
+
+    pipeline = Pipeline(
+        [Command("foo", lambda: output, ""), Command("bar", consume, "")]
+    )
+
+    assert pipeline.execute((), ()) == expected
+
+
+def test_pipeline_output_not_iterable():
+    pipeline = Pipeline(
+        [
+            Command("foo", lambda: 1, ""),
+            Command("bar", lambda *, stdin: list(stdin), ""),
+        ]
+    )
+
+    with pytest.raises(CommandError, match="'int' is not iterable"):
+        pipeline.execute((), ())
+
+
+def test_consume_generator():
+    emit, run = mock.Mock(), mock.Mock()
+
+    _consume((item for item in "ab"), emit, run)
+
+    assert emit.call_args_list == [mock.call("a"), mock.call("b")]
+    run.assert_not_called()
+
+
+def test_consume_async():
+    emit = mock.Mock()
+
+    async def coroutine():
+        emit("coroutine")
+
+    async def generator():
+        yield "a"
+        yield "b"
+
+    _consume(coroutine(), emit, asyncio.run)
+    _consume(generator(), emit, asyncio.run)
+
+    assert emit.call_args_list == [
+        mock.call("coroutine"),
+        mock.call("a"),
+        mock.call("b"),
+    ]
+
+
+def test_consume_other():
+    emit, run = mock.Mock(), mock.Mock()
+
+    _consume(["a", "b"], emit, run)
+
+    emit.assert_not_called()
+    run.assert_not_called()
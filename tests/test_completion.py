@@ -0,0 +1,259 @@
+import sys
+import threading
+from unittest import mock
+
+import pytest
+
+from riposte.completion import (
+    CommandIndex,
+    CompletionCache,
+    FuzzyIndex,
+    HistoryUsage,
+    IndexView,
+    fuzzy_score,
+)
+
+
+@pytest.fixture
+def index():
+    return CommandIndex(["git.push", "foo", "git.pull", "git", "bar"])
+
+
+def test_index_view_abstract():
+    with pytest.raises(TypeError):
+        IndexView()
+
+
+def test_sorted(index: CommandIndex):
+    assert list(index) == ["bar", "foo", "git", "git.pull", "git.push"]
+    assert len(index) == 5
+
+
+@pytest.mark.parametrize(
+    ("prefix", "expected"),
+    (
+        ("", ["bar", "foo", "git", "git.pull", "git.push"]),
+        ("g", ["git", "git.pull", "git.push"]),
+        ("git.", ["git.pull", "git.push"]),
+        ("git.pus", ["git.push"]),
+        ("git.pushy", []),
+        ("z", []),
+        ("a", []),
+    ),
+)
+def test_complete(index: CommandIndex, prefix, expected):
+    assert index.complete(prefix) == expected
+
+
+def test_complete_max_code_point():
+    last = chr(sys.maxunicode)
+    index = CommandIndex(["a", f"a{last}", f"a{last}b", "b"])
+
+    assert index.complete(f"a{last}") == [f"a{last}", f"a{last}b"]
+
+
+def test_add_discard(index: CommandIndex):
+    version = index.version
+
+    index.add("baz")
+    index.add("baz")
+    index.discard("foo")
+    index.discard("foo")
+
+    assert list(index) == ["bar", "baz", "git", "git.pull", "git.push"]
+    assert index.version == version + 2
+
+
+def test_contains(index: CommandIndex):
+    assert "git" in index
+    assert "gi" not in index
+    assert None not in index
+
+
+def test_view(index: CommandIndex):
+    calls = []
+
+    def predicate(name):
+        calls.append(name)
+        return name.startswith("git")
+
+    view = index.view(predicate)
+
+    assert view.complete("git.") == ["git.pull", "git.push"]
+    assert view.complete("") == ["git", "git.pull", "git.push"]
+    assert len(calls) == 5  # filtered once, not on every lookup
+
+    index.add("git.log")
+
+    assert view.complete("git.") == ["git.log", "git.pull", "git.push"]
+    assert view.view(lambda name: "." not in name).complete("") == ["git"]
+
+
+def test_cache_hit():
+    cache = CompletionCache(ttl=60)
+    compute = mock.Mock(return_value=["bar"])
+
+    assert cache.get("foo", compute) == ["bar"]
+    assert cache.get("foo", compute) == ["bar"]
+    compute.assert_called_once_with()
+
+
+@mock.patch("riposte.completion.time.monotonic")
+def test_cache_ttl(mocked_monotonic):
+    mocked_monotonic.return_value = 0.0
+    cache = CompletionCache(ttl=10)
+    cache.get("foo", lambda: ["old"])
+
+    mocked_monotonic.return_value = 9.0
+    assert cache.get("foo", lambda: ["new"]) == ["old"]
+
+    mocked_monotonic.return_value = 10.0
+    assert cache.get("foo", lambda: ["new"]) == ["new"]
+
+
+def test_cache_eviction():
+    cache = CompletionCache(ttl=60, maxsize=2)
+    cache.get("a", lambda: ["a"])
+    cache.get("b", lambda: ["b"])
+    cache.get("a", lambda: ["x"])  # recently used
+    cache.get("c", lambda: ["c"])
+
+    assert cache.get("a", lambda: ["x"]) == ["a"]
+    assert cache.get("b", lambda: ["x"]) == ["x"]  # evicted
+
+
+def test_cache_timeout():
+    release = threading.Event()
+
+    def slow():
+        release.wait()
+        return ["new"]
+
+    cache = CompletionCache(ttl=60, timeout=0.01)
+    cache._entries["foo"] = (float("-inf"), ["stale"])
+
+    assert cache.get("foo", slow) == ["stale"]
+    assert cache.get("bar", slow) == []
+
+    release.set()
+    cache.fetch("foo", slow).result()
+    assert cache.get("foo", slow) == ["new"]
+    cache.shutdown()
+
+
+def test_cache_computes_once():
+    release = threading.Event()
+    compute = mock.Mock(side_effect=lambda: release.wait() and ["bar"])
+    cache = CompletionCache(ttl=60, timeout=0)
+
+    future = cache.fetch("foo", compute)
+    cache.prefetch("foo", compute)
+    cache.get("foo", compute)
+    release.set()
+
+    assert future.result() == ["bar"]
+    compute.assert_called_once_with()
+
+
+def test_cache_error_not_cached():
+    cache = CompletionCache(ttl=60)
+
+    with pytest.raises(ValueError):
+        cache.get("foo", mock.Mock(side_effect=ValueError))
+
+    assert cache.get("foo", lambda: ["bar"]) == ["bar"]
+
+
+@pytest.mark.parametrize(
+    ("query", "candidate", "matched"),
+    (
+        ("", "foo", True),
+        ("gps", "git.push", True),
+        ("git", "git", True),
+        ("gti", "git", False),
+        ("x", "git", False),
+        ("gitt", "git", False),
+    ),
+)
+def test_fuzzy_score_matches(query, candidate, matched):
+    assert (fuzzy_score(query, candidate) is not None) is matched
+
+
+def test_fuzzy_score_ranking():
+    def score(candidate):
+        return fuzzy_score("push", candidate)
+
+    assert score("push") > score("pushall")  # shorter
+    assert score("push") > score("git.push")  # at the beginning
+    assert score("git.push") > score("gitpush")  # after separator
+    assert score("gitpush") > score("p.u.s.h")  # consecutive
+
+
+def test_fuzzy_score_best_placement():
+    # greedy match from the first "p" would be scattered
+    assert fuzzy_score("push", "pa.push") > fuzzy_score("push", "pa.puxsh")
+
+
+def test_history_usage():
+    usage = HistoryUsage(["baz"] * 50 + ["foo b", "", "foo a; bar"])
+
+    assert usage["foo"] > usage["bar"] > 0
+    assert usage["baz"] == 3.0  # capped
+    assert set(usage) == {"foo", "bar", "baz"}
+
+
+def test_history_usage_incremental():
+    usage = HistoryUsage(half_life=1)
+    usage.add("foo")
+    assert usage["foo"] == 1.0
+
+    usage.add("bar")
+    assert usage["foo"] == 0.5
+    assert usage["bar"] == 1.0
+
+    for _ in range(1000):  # rescaled, long unused commands are forgotten
+        usage.add("bar")
+    assert "foo" not in usage
+    assert usage["bar"] == pytest.approx(2.0)
+
+
+def test_fuzzy_index_search():
+    index = FuzzyIndex(["git.push", "git.pull", "grep", "Get", "kube.get"])
+
+    assert index.search("gpu") == ["git.pull", "git.push"]
+    assert index.search("GET") == ["Get", "kube.get"]
+    assert index.search("zzz") == []
+    assert index.search("g", limit=2) == ["Get", "grep"]
+
+
+def test_fuzzy_index_single_char():
+    names = ["Get", "git.push", "kube.get", "agg", "a-g", "x", "gg.g", ""]
+    index = FuzzyIndex(names)
+    usage = {"agg": 0.5}
+
+    for query in "gaxz.":
+        # same ranking as scoring every occurrence of the character
+        expected = sorted(
+            (-score - usage.get(name, 0.0), len(name), name)
+            for name in names
+            for score in (fuzzy_score(query, name.lower()),)
+            if score is not None
+        )
+        assert index.search(query, usage) == [name for *_, name in expected]
+
+
+def test_fuzzy_index_usage():
+    index = FuzzyIndex(["git.push", "git.pull"])
+
+    assert index.search("gp", {"git.push": 1.0}) == ["git.push", "git.pull"]
+
+
+def test_fuzzy_index_cached(index: CommandIndex):
+    fuzzy = index.fuzzy()
+
+    assert index.fuzzy() is fuzzy
+    assert index.view(lambda name: True).fuzzy() is not fuzzy
+
+    index.add("baz")
+
+    assert "baz" in index.fuzzy().search("bz")
@@ -1,4 +1,17 @@
-from typing import AnyStr, Dict, List, Set, Text
+from enum import Enum, IntEnum
+from pathlib import Path, PosixPath
+from typing import (
+    Any,
+    AnyStr,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Text,
+    Tuple,
+    Union,
+)
 from unittest import mock
 
 import pytest
@@ -49,7 +62,13 @@ def test_encode_exception():
         (AnyStr, tuple()),
         (Text, tuple()),
         (bytes, (guides.encode,)),
-        (int, (guides.literal,)),
+        (int, (guides.integer,)),
+        (float, (guides.floating,)),
+        (complex, (guides.complex_number,)),
+        (bool, (guides.boolean,)),
+        (Path, (guides.path,)),
+        (PosixPath, (guides.path,)),
+        (dict, (guides.literal,)),
         (Dict, (guides.literal,)),
         (List, (guides.literal,)),
         (Set, (guides.literal,)),
@@ -59,6 +78,183 @@ def test_get_guides(type_, return_value):
     assert guides.get_guides(type_) == return_value
 
 
+@pytest.mark.parametrize(
+    ("guide", "value", "expected"),
+    (
+        (guides.integer, "1", 1),
+        (guides.integer, "-10", -10),
+        (guides.floating, "1.5", 1.5),
+        (guides.floating, "1", 1.0),
+        (guides.complex_number, "1+2j", 1 + 2j),
+        (guides.boolean, "True", True),
+        (guides.boolean, "yes", True),
+        (guides.boolean, "0", False),
+        (guides.boolean, "off", False),
+        (guides.path, "/foo/bar", Path("/foo/bar")),
+    ),
+)
+def test_scalar_guides(guide, value, expected):
+    processed_value = guide(value)
+
+    assert processed_value == expected
+    assert type(processed_value) is type(expected)
+
+
+@pytest.mark.parametrize(
+    ("guide", "value"),
+    (
+        (guides.integer, "1.5"),
+        (guides.integer, "True"),
+        (guides.integer, "[1]"),
+        (guides.floating, "foo"),
+        (guides.complex_number, "foo"),
+        (guides.boolean, "2"),
+    ),
+)
+def test_scalar_guides_exception(guide, value):
+    with pytest.raises(GuideError):
+        guide(value)
+
+
+class Color(Enum):
+    RED = "r"
+    GREEN = 2
+
+
+class Level(IntEnum):
+    LOW = 1
+
+
+@pytest.mark.parametrize(
+    ("enum", "value", "expected"),
+    (
+        (Color, "RED", Color.RED),
+        (Color, "r", Color.RED),
+        (Color, "2", Color.GREEN),
+        (Level, "LOW", Level.LOW),
+        (Level, "1", Level.LOW),
+    ),
+)
+def test_enumeration(enum, value, expected):
+    (guide,) = guides.get_guides(enum)
+
+    assert guide(value) is expected
+
+
+def test_enumeration_exception():
+    (guide,) = guides.get_guides(Color)
+
+    with pytest.raises(GuideError):
+        guide("BLUE")
+
+
+def test_get_guides_cached():
+    assert guides.get_guides(Color) is guides.get_guides(Color)
+
+
+def test_register_guide():
+    class Foo:
+        pass
+
+    guide = mock.Mock()
+    assert guides.get_guides(Foo) == (guides.literal,)
+
+    with mock.patch.dict(guides.GUIDES):
+        guides.register_guide(Foo, guide)
+
+        assert guides.get_guides(Foo) == (guide,)
+
+
+@pytest.mark.parametrize(
+    ("annotation", "value", "expected"),
+    (
+        (List[int], "[1, 2, 3]", [1, 2, 3]),
+        (List[float], "[1, 2.5]", [1.0, 2.5]),
+        (List[List[int]], "[[1], []]", [[1], []]),
+        (Set[str], "{'foo'}", {"foo"}),
+        (FrozenSet[int], "{1}", frozenset({1})),
+        (Tuple[int, ...], "(1, 2)", (1, 2)),
+        (Tuple[int, str], "(1, 'foo')", (1, "foo")),
+        (Dict[str, float], "{'foo': 1}", {"foo": 1.0}),
+        (List[Optional[int]], "[1, None]", [1, None]),
+        (List[Union[int, str]], "[1, 'foo']", [1, "foo"]),
+        (List[Any], "[1, 'foo']", [1, "foo"]),
+        (List[Color], "['RED', 2]", [Color.RED, Color.GREEN]),
+        (List[Path], "['/foo']", [Path("/foo")]),
+        (Optional[int], "1", 1),
+        (Optional[int], "None", None),
+        (Optional[str], "None", None),
+        (Optional[List[int]], "[1]", [1]),
+        (Union[int, str], "foo", "foo"),
+    ),
+)
+def test_typed_guides(annotation, value, expected):
+    (guide,) = guides.get_guides(annotation)
+
+    assert guide(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("annotation", "value"),
+    (
+        (List[int], "[1, 'foo']"),
+        (List[int], "[True]"),
+        (List[int], "(1, 2)"),
+        (Tuple[int, str], "(1, 2, 3)"),
+        (Dict[str, float], "{1: 1.0}"),
+        (List[Color], "['BLUE']"),
+        (Optional[int], "foo"),
+    ),
+)
+def test_typed_guides_exception(annotation, value):
+    (guide,) = guides.get_guides(annotation)
+
+    with pytest.raises(GuideError):
+        guide(value)
+
+
+def test_typed_guides_cached():
+    assert guides.get_guides(List[int]) is guides.get_guides(List[int])
+
+
+def test_compose():
+    assert guides.compose(()) is None
+    assert guides.compose((guides.integer,)) is guides.integer
+    assert guides.compose((str.strip, guides.integer))(" 1 ") == 1
+
+
+def test_compose_batch():
+    assert guides.compose_batch(()) is None
+
+    convert = guides.compose_batch((guides.integer, guides.floating))
+    assert convert(("1", "2")) == [1.0, 2.0]
+
+    convert = guides.compose_batch((guides.integer, lambda x: x * 2))
+    assert convert(("1", "2")) == [2, 4]
+
+    convert = guides.compose_batch((str.strip, guides.integer))
+    assert convert((" 1", "2 ")) == [1, 2]
+
+
+def test_compose_batch_error():
+    convert = guides.compose_batch((guides.integer,))
+
+    with pytest.raises(GuideError) as exc_info:
+        convert(("1", "x", "3"))
+    assert exc_info.value.value == "x"
+    assert exc_info.value.guide is guides.integer
+
+
+def test_compose_batch_error_original_values():
+    convert = guides.compose_batch((guides.encode, guides.integer))
+
+    # `encode` succeeded, it's `integer` that fails on the encoded value
+    with pytest.raises(GuideError) as exc_info:
+        convert(["a"])
+    assert exc_info.value.value == b"a"
+    assert exc_info.value.guide is guides.integer
+
+
 @mock.patch("riposte.guides.get_guides")
 def test_extract_guides(mocked_get_guides):
     type_hint = int
@@ -0,0 +1,383 @@
+import multiprocessing
+import readline
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte, history
+from riposte.exceptions import CommandError
+from riposte.history import History, HistoryFile
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    return tmp_path / "history"
+
+
+def write(path, *entries):
+    path.write_text("".join(f"{entry}\n" for entry in entries))
+
+
+def test_append(history_path):
+    history_file = HistoryFile(history_path)
+
+    history_file.append("foo")
+    history_file.append("foo")  # consecutive duplicate
+    history_file.append("")
+    history_file.append("bar")
+
+    assert history_path.read_text() == "foo\nbar\n"
+
+
+def test_load(history_path):
+    write(history_path, "_HiStOrY_V2_", "foo", "bar", "foo", "baz", "", "qux")
+
+    assert HistoryFile(history_path).load() == ["bar", "foo", "baz", "qux"]
+    assert HistoryFile(history_path, length=2).load() == ["baz", "qux"]
+
+
+def test_load_missing_file(history_path):
+    assert HistoryFile(history_path).load() == []
+
+
+def test_load_tail_only(history_path):
+    write(history_path, *(f"entry {idx}" for idx in range(50_000)))
+    history_file = HistoryFile(history_path, length=3)
+
+    with open(history_path, "rb") as file:
+        entries, read = history_file._read_tail(file)
+
+    assert entries == ["entry 49997", "entry 49998", "entry 49999"]
+    assert read == history._BLOCK_SIZE
+
+
+def test_load_lines_across_blocks(history_path):
+    write(history_path, *(f"entry {idx}" for idx in range(100)))
+
+    with mock.patch.object(history, "_BLOCK_SIZE", 7):
+        entries = HistoryFile(history_path, length=30).load()
+
+    assert entries == [f"entry {idx}" for idx in range(70, 100)]
+
+
+def test_load_compacts_big_file(history_path):
+    write(history_path, *(f"entry {idx % 10}" for idx in range(100_000)))
+    history_file = HistoryFile(history_path, length=5)
+
+    entries = history_file.load()
+    history_file._compactor.join()
+
+    assert entries == [f"entry {idx}" for idx in range(5, 10)]
+    assert HistoryFile(history_path).load() == entries
+    assert history_path.stat().st_size == 40
+
+
+def test_compaction_replaces_file(history_path):
+    write(history_path, "foo", "bar", "foo")
+    history_file = HistoryFile(history_path)
+
+    with open(history_path, "rb") as file:
+        history_file.compact()
+        assert history_file._replaced(file)
+
+    assert history_path.read_text() == "bar\nfoo\n"
+
+
+def test_append_to_replaced_file(history_path):
+    history_file = HistoryFile(history_path)
+
+    with mock.patch.object(
+        HistoryFile, "_replaced", side_effect=[True, False]
+    ):
+        history_file.append("foo")  # retried with the new file
+
+    assert history_path.read_text() == "foo\n"
+
+
+def _append_entries(path, prefix):
+    history_file = HistoryFile(path)
+    for idx in range(200):
+        history_file.append(f"{prefix} {idx}")
+
+
+def test_concurrent_sessions(history_path, process):
+    processes = [
+        multiprocessing.Process(
+            target=_append_entries, args=(history_path, prefix)
+        )
+        for prefix in ("foo", "bar", "baz")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    entries = history_path.read_text().splitlines()
+    assert len(entries) == 600
+    assert set(entries) == {
+        f"{prefix} {idx}"
+        for prefix in ("foo", "bar", "baz")
+        for idx in range(200)
+    }
+
+
+@mock.patch("riposte.riposte.readline")
+def test_shared_history(mocked_readline, history_path):
+    write(history_path, "foo", "bar", "foo")
+
+    repl = Riposte(history_file=history_path, shared_history=True)
+
+    mocked_readline.clear_history.assert_called_once_with()
+    assert mocked_readline.add_history.call_args_list == [
+        mock.call("bar"),
+        mock.call("foo"),
+    ]
+    assert history_path.read_text() == "foo\nbar\nfoo\n"  # no atexit rewrite
+    mocked_readline.write_history_file.assert_not_called()
+
+    handler = mock.Mock(__annotations__={})
+    repl.command("baz")(handler)
+    repl.input_stream = iter([lambda: "baz"])
+    mocked_readline.get_current_history_length.return_value = 3
+    mocked_readline.get_history_item.return_value = "foo"
+    repl._process()
+
+    handler.assert_called_once_with()
+    assert history_path.read_text() == "foo\nbar\nfoo\nbaz\n"
+    mocked_readline.remove_history_item.assert_not_called()
+
+
+@mock.patch("riposte.riposte.readline")
+def test_shared_history_drops_duplicate(mocked_readline, history_path):
+    repl = Riposte(history_file=history_path, shared_history=True)
+    repl.command("foo")(mock.Mock(__annotations__={}))
+    mocked_readline.get_current_history_length.return_value = 2
+    mocked_readline.get_history_item.return_value = "foo"
+
+    repl.input_stream = iter([lambda: "foo"])
+    repl._process()
+
+    mocked_readline.remove_history_item.assert_called_once_with(1)
+
+
+@mock.patch("riposte.riposte.readline")
+def test_shared_history_pipelined(mocked_readline, history_path):
+    repl = Riposte(history_file=history_path, shared_history=True)
+    repl.command("foo")(mock.Mock(__annotations__={}))
+    repl.pipelined = True
+
+    repl.input_stream = iter([lambda: "foo"])
+    repl._process()
+
+    assert not history_path.exists()
+
+
+ALL = [  # distinct entries, the most recently used first
+    "ssh admin@other",
+    "git push origin",
+    "ls",
+    "git pull",
+    "ssh user@host",
+]
+
+
+@pytest.fixture
+def entries():
+    return History(
+        [
+            "git push origin",
+            "ssh user@host",
+            "git pull",
+            "ls",
+            "git push origin",
+            "ssh admin@other",
+        ]
+    )
+
+
+def test_history_recent(entries: History):
+    assert entries.recent() == ALL
+    assert entries.recent(2) == ["ssh admin@other", "git push origin"]
+    assert len(entries) == 5
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    (
+        ("git", ["git push origin", "git pull"]),
+        ("push", ["git push origin"]),
+        ("@", ["ssh admin@other", "ssh user@host"]),
+        ("s", [entry for entry in ALL if "s" in entry]),
+        ("", ALL),
+        ("user@host", ["ssh user@host"]),
+        ("ush origin", ["git push origin"]),
+        ("pushy", []),
+        ("xyz", []),
+    ),
+)
+def test_history_search(entries: History, text, expected):
+    assert entries.search(text) == expected
+
+
+def test_history_search_limit(entries: History):
+    assert entries.search("git", limit=1) == ["git push origin"]
+    assert entries.search("s", limit=1) == ["ssh admin@other"]
+
+
+def test_history_search_verifies_matches():
+    entries = History(["abcxbcd"])  # has every trigram of "abcd"
+
+    assert entries.search("abcd") == []
+
+
+@pytest.mark.parametrize(
+    ("prefix", "expected"),
+    (
+        ("git", ["git push origin", "git pull"]),
+        ("ssh u", ["ssh user@host"]),
+        ("push", []),
+        ("", ALL),
+    ),
+)
+def test_history_prefix_search(entries: History, prefix, expected):
+    assert entries.prefix_search(prefix) == expected
+
+
+def test_history_append(entries: History):
+    assert entries.search("git") == ["git push origin", "git pull"]
+
+    entries.append("git pull")
+    entries.append("git status")
+    entries.append("")
+
+    assert entries.search("git") == [
+        "git status",
+        "git pull",
+        "git push origin",
+    ]
+    assert entries.prefix_search("git s") == ["git status"]
+    assert len(entries) == 6
+
+
+def test_history_bulk_append():
+    entries = History()
+    entries.search("")
+    for idx in range(100):
+        entries.append(f"entry {idx:03}")
+
+    assert entries.prefix_search("entry 09") == [
+        f"entry {idx:03}" for idx in range(99, 89, -1)
+    ]
+
+
+def test_history_lazy_source():
+    consumed = []
+
+    def source():
+        consumed.append(True)
+        yield "foo"
+
+    entries = History(source())
+    entries.append("bar")
+
+    assert consumed == []
+    assert entries.recent() == ["bar", "foo"]
+
+
+def test_history_complete(entries: History):
+    entries.append("ssh user@another")
+
+    assert entries.complete("", "ssh ", 4, 4) == [
+        "user@another",
+        "admin@other",
+        "user@host",
+    ]
+    assert entries.complete("us", "ssh us", 4, 6) == [
+        "user@another",
+        "user@host",
+    ]
+    assert entries.complete("", "git push origin ", 16, 16) == []
+
+
+@pytest.fixture
+def history_file(history_path):
+    """History file of the repls, loaded with a couple of entries."""
+    readline.clear_history()  # shared by the whole process
+    write(history_path, "git push", "git pull")
+    return history_path
+
+
+@pytest.fixture
+def repl_options():
+    return {"history_search": True}
+
+
+def test_history_loaded(mocked_repl: Riposte):
+    assert mocked_repl.history.recent() == ["git pull", "git push"]
+
+
+def test_history_loaded_snapshot(mocked_repl: Riposte):
+    readline.clear_history()  # e.g. trimmed to `history_length`
+
+    assert mocked_repl.history.recent() == ["git pull", "git push"]
+
+
+def test_history_command(mocked_repl: Riposte, process, printed):
+    process(mocked_repl, "history search push")
+    process(mocked_repl, "history prefix git p")
+    process(mocked_repl, "history")
+
+    assert printed(mocked_repl) == [
+        ("git push",),
+        ("history search push",),  # recorded before executed
+        ("git push",),
+        ("git pull",),
+        ("git push",),
+        ("git pull",),
+        ("history search push",),
+        ("history prefix git p",),
+        ("history",),
+    ]
+
+
+def test_history_command_unknown_subcommand(mocked_repl: Riposte, process):
+    with pytest.raises(CommandError, match="Unknown subcommand: foo"):
+        process(mocked_repl, "history foo")
+
+
+@pytest.mark.parametrize("repl_options", ({},))
+def test_history_search_disabled(mocked_repl: Riposte, process):
+    mocked_repl.command("foo")(mock.Mock(__annotations__={}))
+
+    process(mocked_repl, "foo")
+
+    assert "history" not in mocked_repl._commands
+    assert mocked_repl.history is None  # nothing indexed in vain
+
+
+def test_history_not_recorded_when_pipelined(mocked_repl: Riposte, process):
+    mocked_repl.pipelined = True
+    mocked_repl.command("foo")(mock.Mock(__annotations__={}))
+
+    process(mocked_repl, "foo")
+
+    assert mocked_repl.history.recent() == ["git pull", "git push"]
+
+
+def test_complete_history_command(mocked_repl: Riposte):
+    complete = mocked_repl._complete_history_command
+
+    assert complete("s", "history s", 8, 9) == ["search"]
+    assert complete("", "history search ", 15, 15) == []
+
+
+@mock.patch("riposte.riposte.readline")
+def test_history_completion_fallback(mocked_readline, history_path):
+    repl = Riposte(history_file=history_path, history_search=True)
+    repl.command("git")(mock.Mock(__annotations__={}))
+    repl.history.append("git push")
+    mocked_readline.get_line_buffer.return_value = "git p"
+    mocked_readline.get_begidx.return_value = 4
+    mocked_readline.get_endidx.return_value = 5
+
+    assert repl._complete("p", 0) == "push"
@@ -0,0 +1,261 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte
+from riposte.command import Command
+from riposte.exceptions import CommandError, RiposteException
+from riposte.hooks import Hook
+from riposte.metrics import MetricsSettings
+
+
+def trace(repl: Riposte) -> list:
+    """Register hook of every kind recording its calls."""
+    calls = []
+    repl.hook(Hook.PRE_EXECUTE)(
+        lambda command, args: calls.append(("pre", command.name, args))
+    )
+    repl.hook(Hook.POST_EXECUTE)(
+        lambda command, args: calls.append(("post", command.name, args))
+    )
+    repl.hook(Hook.ON_ERROR)(
+        lambda command, args, err: calls.append(
+            ("error", command.name, type(err).__name__)
+        )
+    )
+    return calls
+
+
+def test_no_hooks(command: Command):
+    assert "execute" not in vars(command)
+
+
+def test_set_hooks(command: Command):
+    calls = []
+    command.set_hooks(pre_execute=[lambda *args: calls.append(args)])
+
+    command.execute("bar")
+    command.set_hooks()
+
+    assert calls == [(command, ("bar",))]
+    assert "execute" not in vars(command)
+
+
+def test_hooks(mocked_repl: Riposte, process, printed):
+    @mocked_repl.command("foo")
+    def foo(x: int):
+        mocked_repl.print(x)
+
+    calls = trace(mocked_repl)
+    process(mocked_repl, "foo 1")
+
+    assert calls == [("pre", "foo", ("1",)), ("post", "foo", ("1",))]
+    assert printed(mocked_repl) == [(1,)]
+
+
+def test_hooks_composed_at_registration(mocked_repl: Riposte, process):
+    calls = trace(mocked_repl)
+
+    @mocked_repl.command("foo")
+    def foo():
+        pass
+
+    execute = mocked_repl._commands["foo"].execute
+    process(mocked_repl, "foo")
+
+    assert mocked_repl._commands["foo"].execute is execute
+    assert [call[0] for call in calls] == ["pre", "post"]
+
+
+def test_hooks_order(mocked_repl: Riposte, process):
+    calls = []
+    mocked_repl.command("foo")(lambda: None)
+    for idx in range(3):
+        mocked_repl.hook("pre_execute")(
+            lambda command, args, idx=idx: calls.append(idx)
+        )
+
+    process(mocked_repl, "foo")
+
+    assert calls == [0, 1, 2]
+
+
+def test_pre_execute_prevents_execution(mocked_repl: Riposte, process):
+    handler = mock.Mock(__annotations__={})
+    mocked_repl.command("foo")(handler)
+
+    @mocked_repl.hook(Hook.PRE_EXECUTE)
+    def deny(command, args):
+        raise RiposteException("denied")
+
+    with pytest.raises(RiposteException):
+        process(mocked_repl, "foo")
+    handler.assert_not_called()
+
+
+def test_on_error(mocked_repl: Riposte, process):
+    @mocked_repl.command("foo")
+    def foo():
+        raise CommandError("failed")
+
+    calls = trace(mocked_repl)
+    with pytest.raises(CommandError):
+        process(mocked_repl, "foo")
+    with pytest.raises(CommandError):
+        process(mocked_repl, "foo too many")
+
+    assert calls == [
+        ("pre", "foo", ()),
+        ("error", "foo", "CommandError"),
+        ("pre", "foo", ("too", "many")),
+        ("error", "foo", "CommandError"),
+    ]
+
+
+def test_post_execute_after_generator(mocked_repl: Riposte, process):
+    @mocked_repl.command("letters")
+    def letters(word: str):
+        for letter in word:
+            calls.append(("letter", letter))
+            yield letter
+
+    calls = trace(mocked_repl)
+    process(mocked_repl, "letters ab")
+
+    assert calls == [
+        ("pre", "letters", ("ab",)),
+        ("letter", "a"),
+        ("letter", "b"),
+        ("post", "letters", ("ab",)),
+    ]
+
+
+def test_on_error_in_generator(mocked_repl: Riposte, process, printed):
+    @mocked_repl.command("foo")
+    def foo():
+        yield 1
+        raise RiposteException("failed")
+
+    calls = trace(mocked_repl)
+    with pytest.raises(RiposteException):
+        process(mocked_repl, "foo")
+
+    assert [call[0] for call in calls] == ["pre", "error"]
+    assert printed(mocked_repl) == [(1,)]
+
+
+def test_coroutine(mocked_repl: Riposte, process):
+    @mocked_repl.command("sleep")
+    async def sleep():
+        await asyncio.sleep(0)
+        calls.append(("slept",))
+
+    @mocked_repl.command("fail")
+    async def fail():
+        raise RiposteException("failed")
+
+    calls = trace(mocked_repl)
+    process(mocked_repl, "sleep")
+    with pytest.raises(RiposteException):
+        process(mocked_repl, "fail")
+
+    assert calls == [
+        ("pre", "sleep", ()),
+        ("slept",),
+        ("post", "sleep", ()),
+        ("pre", "fail", ()),
+        ("error", "fail", "RiposteException"),
+    ]
+
+
+def test_async_generator(mocked_repl: Riposte, process, printed):
+    @mocked_repl.command("letters")
+    async def letters(word: str):
+        for letter in word:
+            await asyncio.sleep(0)
+            yield letter
+
+    calls = trace(mocked_repl)
+    process(mocked_repl, "letters ab")
+
+    assert printed(mocked_repl) == [("a",), ("b",)]
+    assert [call[0] for call in calls] == ["pre", "post"]
+
+
+@pytest.mark.parametrize("repl_options", ({"pipes": True},))
+def test_pipes(mocked_repl: Riposte, process, printed):
+    repl = mocked_repl
+    repl.command("numbers")(lambda: iter([1, 2]))
+
+    @repl.command("double")
+    def double(*, stdin):
+        for item in stdin:
+            yield item * 2
+
+    calls = trace(repl)
+    process(repl, "numbers | double")
+
+    assert printed(repl) == [(2,), (4,)]
+    assert [call[:2] for call in calls] == [
+        ("pre", "numbers"),
+        ("post", "numbers"),
+        ("pre", "double"),
+        ("post", "double"),
+    ]
+
+
+def test_with_metrics(history_file, process):
+    repl = Riposte(history_file=history_file, metrics=MetricsSettings())
+    repl.command("foo")(lambda: None)
+    calls = trace(repl)
+
+    process(repl, "foo")
+
+    assert [call[0] for call in calls] == ["pre", "post"]
+    assert repl.metrics.command("foo").calls == 1
+
+
+def test_pre_parse(mocked_repl: Riposte, process, printed):
+    mocked_repl.command("foo")(lambda *args: mocked_repl.print(*args))
+    lines = []
+
+    @mocked_repl.hook(Hook.PRE_PARSE)
+    def record(line):
+        lines.append(line)
+
+    @mocked_repl.hook(Hook.PRE_PARSE)
+    def alias(line):
+        if line.startswith("f "):
+            return "foo" + line[1:]
+
+    process(mocked_repl, "f bar")
+
+    assert lines == ["f bar"]
+    assert printed(mocked_repl) == [("bar",)]
+
+
+def test_pre_parse_skips_compiled_lines(repl: Riposte):
+    lines = []
+    repl.command("foo")(lambda: None)
+    repl.hook(Hook.PRE_PARSE)(lines.append)
+
+    ((command, args),) = repl._resolve_input((("foo", ()),))
+
+    assert command.name == "foo"
+    assert lines == []
+
+
+def test_pre_parse_with_metrics(history_file, process):
+    repl = Riposte(history_file=history_file, metrics=MetricsSettings())
+    repl.command("foo")(lambda: None)
+    repl.hook(Hook.PRE_PARSE)(lambda line: "foo")
+
+    process(repl, "anything")
+
+    assert repl.metrics.command("foo").parse.count == 1
+
+
+def test_unknown_hook(repl: Riposte):
+    with pytest.raises(ValueError):
+        repl.hook("post_parse")
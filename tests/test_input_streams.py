@@ -1,4 +1,5 @@
-import io
+import os
+import threading
 from unittest import mock
 
 import pytest
@@ -30,25 +31,269 @@ def test_cli_input():
         next(input_stream)()
 
 
-@mock.patch(
-    "builtins.open", return_value=io.StringIO("foo bar\nscoo bee; doo\nbee")
-)
-def test_file_input(mock_open):
-    path = "foobar.txt"
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo bar\nscoo bee; doo\r\nbee")
+    return path
 
-    input_stream = input_streams.file_input(path)
+
+def test_file_input(script):
+    input_stream = input_streams.file_input(script)
 
     assert next(input_stream)() == "foo bar\n"
     assert next(input_stream)() == "scoo bee; doo\n"
     assert next(input_stream)() == "bee"
-    mock_open.assert_called_once_with(path, "r")
+    with pytest.raises(StopIteration):
+        next(input_stream)
+
+
+def test_file_input_universal_newlines(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo\rbar\r\r\nbaz\r")
+    input_stream = input_streams.file_input(path)
+
+    assert [line() for line in input_stream] == [
+        "foo\n",
+        "bar\n",
+        "\n",
+        "baz\n",
+    ]
+    assert path.read_text().splitlines(keepends=True) == [
+        "foo\n",
+        "bar\n",
+        "\n",
+        "baz\n",
+    ]
+
+
+def test_file_input_position(script):
+    input_stream = input_streams.file_input(script)
+
+    next(input_stream)
+    next(input_stream)
+
+    assert input_stream.line_number == 2
+    assert input_stream.line_offset == 8
+    assert input_stream.offset == 23
+
+
+def test_file_input_resume(script):
+    input_stream = input_streams.file_input(script, offset=8)
+
+    assert [line() for line in input_stream] == ["scoo bee; doo\n", "bee"]
+
+
+def test_file_input_resume_line_number(script):
+    input_stream = input_streams.file_input(script, offset=8, line_number=1)
+
+    next(input_stream)
+
+    assert input_stream.line_number == 2
+
+
+@pytest.fixture
+def fifo(tmp_path):
+    if not hasattr(os, "mkfifo"):
+        pytest.skip("named pipes aren't available")
+    path = tmp_path / "script.fifo"
+    os.mkfifo(path)
+
+    writers = []
+
+    def write(content):
+        writer = threading.Thread(target=path.write_bytes, args=(content,))
+        writer.start()
+        writers.append(writer)
+
+    yield path, write
+
+    for writer in writers:
+        writer.join()
+
+
+def test_file_input_fifo(fifo):
+    path, write = fifo
+    write(b"foo bar\nscoo bee; doo\r\nbaz\rbee")
+    input_stream = input_streams.file_input(path)
+
+    assert [line() for line in input_stream] == [
+        "foo bar\n",
+        "scoo bee; doo\n",
+        "baz\n",
+        "bee",
+    ]
+    assert input_stream.offset == 30
+
+
+def test_file_input_fifo_resume(fifo):
+    path, write = fifo
+    write(b"foo bar\nscoo bee; doo\r\nbee")
+    input_stream = input_streams.file_input(path, offset=8, line_number=1)
+
+    assert next(input_stream)() == "scoo bee; doo\n"
+    assert input_stream.line_number == 2
+    assert input_stream.line_offset == 8
+    assert [line() for line in input_stream] == ["bee"]
+
+
+def test_compiled_file_input_fifo(fifo):
+    path, write = fifo
+    write(b"foo bar\n")
+
+    input_stream = input_streams.compiled_file_input(path, {"foo"})
+
+    # a pipe can't be read twice, there's nothing to cache
+    assert type(input_stream) is input_streams.FileInput
+    assert [line() for line in input_stream] == ["foo bar\n"]
+
+
+@pytest.mark.parametrize("content", (b"", b"\n"))
+def test_file_input_empty(tmp_path, content):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(content)
+
+    assert [line() for line in input_streams.file_input(path)] == [
+        line.decode() for line in content.splitlines(keepends=True)
+    ]
 
 
-@mock.patch("builtins.open", side_effect=IOError)
-def test_file_input_error(mock_open):
-    path = "foobar.txt"
+def test_file_input_error(tmp_path):
+    input_stream = input_streams.file_input(tmp_path / "foobar.txt")
 
     with pytest.raises(StopRiposteException):
-        input_stream = input_streams.file_input(path)
         next(input_stream)()
-        mock_open.assert_called_once_with(path, "r")
+
+
+def test_file_input_decode_error(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo\n\xff\n")
+    input_stream = input_streams.FileInput(path, encoding="utf-8")
+
+    next(input_stream)
+    with pytest.raises(StopRiposteException, match="line 2"):
+        next(input_stream)
+
+
+def test_compiled_file_input(script, tmp_path):
+    commands = {"foo", "scoo", "doo"}
+
+    input_stream = input_streams.compiled_file_input(script, commands)
+    assert isinstance(input_stream, input_streams.CompilingFileInput)
+    compiled = [line() for line in input_stream]
+
+    input_stream = input_streams.compiled_file_input(script, commands)
+    assert isinstance(input_stream, input_streams.CompiledScript)
+    assert [line() for line in input_stream] == compiled == [
+        (("foo", ("bar",)),),
+        (("scoo", ("bee",)), ("doo", ())),
+        "bee",  # unknown command, left for `Riposte` to report
+    ]
+
+
+def test_compiled_file_input_cache_dir(script, tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    for _ in input_streams.compiled_file_input(script, {"foo"}, cache_dir):
+        pass
+
+    assert input_streams.script_cache_path(script, cache_dir).exists()
+    assert isinstance(
+        input_streams.compiled_file_input(script, {"foo"}, cache_dir),
+        input_streams.CompiledScript,
+    )
+
+
+def test_compiled_file_input_invalidation(script):
+    for _ in input_streams.compiled_file_input(script, {"foo"}):
+        pass
+
+    assert isinstance(
+        input_streams.compiled_file_input(script, {"foo", "bar"}),
+        input_streams.CompilingFileInput,
+    )
+
+    script.write_bytes(b"foo baz\n")
+    assert isinstance(
+        input_streams.compiled_file_input(script, {"foo"}),
+        input_streams.CompilingFileInput,
+    )
+
+
+def test_compiled_file_input_interrupted(script):
+    input_stream = input_streams.compiled_file_input(script, {"foo"})
+    next(input_stream)
+
+    assert not input_streams.script_cache_path(script).exists()
+
+
+def test_compiled_file_input_interrupted_close(script):
+    input_stream = input_streams.compiled_file_input(script, {"foo"})
+    next(input_stream)
+
+    input_stream.close()
+
+    assert list(script.parent.iterdir()) == [script]
+
+
+def test_compiled_file_input_loaded_lazily(script):
+    for _ in input_streams.compiled_file_input(script, {"foo"}):
+        pass
+    cache_path = input_streams.script_cache_path(script)
+    cache_path.write_bytes(cache_path.read_bytes()[:-2])
+
+    input_stream = input_streams.compiled_file_input(script, {"foo"})
+    assert next(input_stream)() == (("foo", ("bar",)),)
+    next(input_stream)
+    with pytest.raises(StopRiposteException, match="compiled script"):
+        next(input_stream)
+
+
+def test_compiled_file_input_syntax_error(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo 'bar\n")
+
+    assert [
+        line() for line in input_streams.compiled_file_input(path, {"foo"})
+    ] == ["foo 'bar\n"]
+
+
+def test_compiled_file_input_missing_file(tmp_path):
+    input_stream = input_streams.compiled_file_input(
+        tmp_path / "foobar.txt", {"foo"}
+    )
+
+    with pytest.raises(StopRiposteException):
+        next(input_stream)
+
+
+def test_compiled_file_input_operators(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo bar &\nbaz &\n")
+
+    input_stream = input_streams.compiled_file_input(
+        path, {"foo"}, operators="&"
+    )
+    assert [line() for line in input_stream] == [
+        (("&", ("foo", "bar")),),
+        "baz &\n",  # unknown command, left for `Riposte` to report
+    ]
+
+    # `&` means something else without background jobs
+    assert isinstance(
+        input_streams.compiled_file_input(path, {"foo"}),
+        input_streams.CompilingFileInput,
+    )
+
+
+def test_compiled_file_input_pipe(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_bytes(b"foo a | bar b\nfoo | baz\n")
+
+    input_stream = input_streams.compiled_file_input(
+        path, {"foo", "bar"}, operators="|"
+    )
+    assert [line() for line in input_stream] == [
+        (("|", (["foo", "a"], ["bar", "b"])),),
+        "foo | baz\n",
+    ]
@@ -0,0 +1,256 @@
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte
+from riposte.exceptions import CommandError, RiposteException
+from riposte.jobs import JobStatus, current_job
+
+
+@pytest.fixture
+def repl_options():
+    return {"background_jobs": True}
+
+
+def test_builtin_commands(mocked_repl: Riposte):
+    assert {"jobs", "wait", "kill"} <= set(mocked_repl._commands)
+
+
+def test_disabled(repl: Riposte, foo_command, process):
+    assert repl.jobs is None
+    assert "jobs" not in repl._commands
+
+    process(repl, "foo &")
+
+    foo_command._func.assert_called_once_with("&")
+
+
+def test_background(mocked_repl: Riposte, process, printed):
+    release = threading.Event()
+
+    @mocked_repl.command("block")
+    def block(name: str):
+        mocked_repl.print("started", name)
+        release.wait()
+
+    process(mocked_repl, "block foo &")  # returns right away
+    (job,) = mocked_repl.jobs.jobs
+    assert job.status in (JobStatus.PENDING, JobStatus.RUNNING)
+
+    release.set()
+    process(mocked_repl, "wait 1")
+
+    assert job.status is JobStatus.DONE
+    assert mocked_repl.jobs.jobs == []
+    assert printed(mocked_repl) == [
+        ("\033[94m[*]\033[0m", "[1] block foo"),
+        ("[1]", "started", "foo"),  # output of the job is tagged
+        ("\033[94m[*]\033[0m", "[1] done      block foo"),
+    ]
+
+
+def test_background_printing_returns_to_prompt(history_file):
+    repl = Riposte(history_file=history_file, background_jobs=True)
+    repl._printer_thread.start()
+    stop = threading.Event()
+    terminal = mock.Mock(write=lambda text: stop.wait(0.001))
+
+    @repl.command("spam")
+    def spam():
+        while not stop.is_set():
+            repl.print("spam", file=terminal)
+
+    repl.input_stream = iter([lambda: "spam &"])
+    prompt = threading.Thread(target=repl._run_sequential)
+    prompt.start()
+    prompt.join(timeout=5)
+    try:
+        # the line is done while the job keeps printing
+        assert not prompt.is_alive()
+        assert repl.jobs.jobs[0].status is JobStatus.RUNNING
+    finally:
+        stop.set()
+        repl.jobs.shutdown()
+
+
+def test_background_unknown_command(mocked_repl: Riposte, process):
+    with pytest.raises(CommandError):
+        process(mocked_repl, "foo &")
+
+
+def test_jobs(mocked_repl: Riposte, process, printed):
+    started, release = threading.Event(), threading.Event()
+
+    @mocked_repl.command("block")
+    def block():
+        started.set()
+        release.wait()
+
+    @mocked_repl.command("noop")
+    def noop():
+        pass
+
+    process(mocked_repl, "noop & block &")
+    mocked_repl.jobs.jobs[0].future.result()
+    started.wait()
+    mocked_repl._printer_thread.reset_mock()
+
+    process(mocked_repl, "jobs")
+    process(mocked_repl, "jobs")  # finished jobs are listed only once
+
+    release.set()
+    mocked_repl.jobs.shutdown()
+
+    assert printed(mocked_repl)[:3] == [
+        ("[1] done      noop",),
+        ("[2] running   block",),
+        ("[2] running   block",),
+    ]
+
+
+def test_kill(mocked_repl: Riposte, process, printed):
+    started = threading.Event()
+
+    @mocked_repl.command("loop")
+    def loop():
+        started.set()
+        while True:
+            current_job().check()
+            threading.Event().wait(0.001)
+
+    process(mocked_repl, "loop &")
+    started.wait()
+    process(mocked_repl, "kill 1")
+    process(mocked_repl, "wait")
+
+    assert printed(mocked_repl)[-1] == (
+        "\033[94m[*]\033[0m",
+        "[1] cancelled loop",
+    )
+
+
+def test_kill_coroutine(mocked_repl: Riposte, process):
+    started = threading.Event()
+
+    @mocked_repl.command("sleep")
+    async def sleep():
+        started.set()
+        await asyncio.sleep(60)
+
+    process(mocked_repl, "sleep &")
+    started.wait()
+    process(mocked_repl, "kill 1")
+    (job,) = mocked_repl.jobs.jobs
+    process(mocked_repl, "wait")
+
+    assert job.status is JobStatus.CANCELLED
+
+
+def test_kill_pending(mocked_repl: Riposte, process):
+    repl = mocked_repl
+    repl.jobs.workers = 1
+    release = threading.Event()
+    handler = mock.Mock(__annotations__={})
+    repl.command("noop")(handler)
+
+    @repl.command("block")
+    def block():
+        release.wait()
+
+    process(repl, "block & noop &")
+    process(repl, "kill 2")
+    release.set()
+    process(repl, "wait")
+
+    handler.assert_not_called()
+
+
+def test_kill_unknown_job(mocked_repl: Riposte, process):
+    with pytest.raises(CommandError, match="No such job: 1"):
+        process(mocked_repl, "kill 1")
+
+
+def test_job_failed(mocked_repl: Riposte, process, printed):
+    @mocked_repl.command("fail")
+    def fail():
+        raise RiposteException("failed")
+
+    process(mocked_repl, "fail &")
+    (job,) = mocked_repl.jobs.jobs
+    process(mocked_repl, "wait")
+
+    assert job.status is JobStatus.FAILED
+    tag, prefix, err = printed(mocked_repl)[1]
+    assert (tag, prefix, str(err)) == ("[1]", "\033[91m[-]\033[0m", "failed")
+
+
+def test_current_job(mocked_repl: Riposte, process):
+    jobs = []
+
+    @mocked_repl.command("foo")
+    def foo():
+        jobs.append(current_job())
+
+    process(mocked_repl, "foo; foo & wait")
+
+    assert jobs[0] is None
+    assert jobs[1].id == 1
+
+
+def test_run_waits_for_jobs(mocked_repl: Riposte):
+    handler = mock.Mock(__annotations__={})
+    mocked_repl.command("foo")(handler)
+    mocked_repl.parse_cli_arguments = mock.Mock()
+    mocked_repl.input_stream = iter([lambda: "foo &"])
+
+    mocked_repl.run()
+
+    handler.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "repl_options", ({"background_jobs": True, "pipes": True},)
+)
+def test_background_pipeline(mocked_repl: Riposte, process, printed):
+    repl = mocked_repl
+
+    @repl.command("numbers")
+    def numbers(limit: int):
+        yield from range(limit)
+
+    @repl.command("double")
+    def double(*, stdin):
+        for number in stdin:
+            yield number * 2
+
+    process(repl, "numbers 3 | double &")
+    process(repl, "wait")
+
+    assert printed(repl) == [
+        ("\033[94m[*]\033[0m", "[1] numbers 3 | double"),
+        ("[1]", 0),
+        ("[1]", 2),
+        ("[1]", 4),
+        ("\033[94m[*]\033[0m", "[1] done      numbers 3 | double"),
+    ]
+
+
+def test_kill_generator(mocked_repl: Riposte, process):
+    started = threading.Event()
+
+    @mocked_repl.command("forever")
+    def forever():
+        started.set()
+        while True:  # cancelled between the items, no checks needed
+            yield "item"
+            threading.Event().wait(0.001)
+
+    process(mocked_repl, "forever &")
+    started.wait()
+    process(mocked_repl, "kill 1")
+    (job,) = mocked_repl.jobs.jobs
+    process(mocked_repl, "wait")
+
+    assert job.status is JobStatus.CANCELLED
@@ -0,0 +1,158 @@
+import shlex
+
+import pytest
+
+from riposte import lexer
+from riposte.exceptions import CommandError, RiposteException
+
+
+def two_pass_tokenize(line):
+    """Reference implementation: non-POSIX split followed by POSIX split."""
+    commands = []
+    command = []
+    for element in shlex.split(line, posix=False):
+        if element[-2:] == "\\;":
+            command.append(element)
+        elif element[-2:] == ";;":
+            raise CommandError("unexpected token: ;;")
+        elif element[-1] == ";":
+            if element[:-1]:
+                command.append(element[:-1])
+            commands.append(command)
+            command = []
+        else:
+            command.append(element)
+    if command:
+        commands.append(command)
+
+    return [
+        (name, args)
+        for name, *args in (
+            shlex.split(" ".join(command)) for command in commands if command
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    ("input", "expected"),
+    (
+        ("foo bar baz", [("foo", ["bar", "baz"])]),
+        ("foo bar;", [("foo", ["bar"])]),
+        ("foo bar; ;", [("foo", ["bar"])]),
+        (
+            "foo bar; scoo bee; doo bee",
+            [("foo", ["bar"]), ("scoo", ["bee"]), ("doo", ["bee"])],
+        ),
+        ("foo   ;   bar;  ;", [("foo", []), ("bar", [])]),
+        ("foo 'bar;' scoo bee", [("foo", ["bar;", "scoo", "bee"])]),
+        (r"foo bar\; scoo bee", [("foo", ["bar;", "scoo", "bee"])]),
+        (r"foo bar\\; scoo bee", [("foo", [r"bar\;", "scoo", "bee"])]),
+        ("foo 'bar baz'x", [("foo", ["bar baz", "x"])]),
+        ("foo bar'baz  qux'", [("foo", ["barbaz qux"])]),
+        (r"foo bar\ baz", [("foo", ["bar baz"])]),
+        ('foo "a \\" b"', [("foo", ['a " b'])]),
+        ("foo '' \"\"", [("foo", ["", ""])]),
+        ("", []),
+        ("  \t\n", []),
+    ),
+)
+def test_tokenize(input, expected):
+    assert lexer.tokenize(input) == expected
+    assert two_pass_tokenize(input) == expected
+
+
+def test_tokenize_unexpected_token():
+    with pytest.raises(CommandError):
+        lexer.tokenize("foo bar;;")
+
+
+@pytest.mark.parametrize(
+    "invalid_line",
+    (
+        "'scoo",
+        "scoo'",
+        '"scoo',
+        'scoo"',
+        "'scoo\"",
+        "foo; bar 'scoo",
+        "foo \\",
+    ),
+)
+def test_tokenize_invalid_line(invalid_line):
+    with pytest.raises(RiposteException):
+        lexer.tokenize(invalid_line)
+
+
+def test_tokenize_unclosed_quotation_precedes_unexpected_token():
+    with pytest.raises(RiposteException, match="No closing quotation"):
+        lexer.tokenize("foo;; 'bar")
+
+
+@pytest.mark.parametrize(
+    ("input", "expected"),
+    (
+        ("foo bar &", [("&", ["foo", "bar"])]),
+        ("foo bar&", [("&", ["foo", "bar"])]),
+        ("foo & bar", [("&", ["foo"]), ("bar", [])]),
+        ("foo; bar &", [("foo", []), ("&", ["bar"])]),
+        ("foo & bar &", [("&", ["foo"]), ("&", ["bar"])]),
+        ("foo 'bar &' &", [("&", ["foo", "bar &"])]),
+        (r"foo bar\&", [("foo", ["bar&"])]),
+        ("foo a&b", [("foo", ["a&b"])]),
+    ),
+)
+def test_tokenize_background(input, expected):
+    assert lexer.tokenize(input, operators="&") == expected
+
+
+def test_tokenize_background_disabled():
+    assert lexer.tokenize("foo bar &") == [("foo", ["bar", "&"])]
+
+
+@pytest.mark.parametrize(
+    "invalid_line", ("&", "foo; &", "foo && bar", "foo &;")
+)
+def test_tokenize_background_unexpected_token(invalid_line):
+    with pytest.raises(CommandError):
+        lexer.tokenize(invalid_line, operators="&")
+
+
+@pytest.mark.parametrize(
+    ("input", "expected"),
+    (
+        ("foo | bar", [("|", [["foo"], ["bar"]])]),
+        ("foo a| bar b", [("|", [["foo", "a"], ["bar", "b"]])]),
+        (
+            "foo | bar | baz; qux",
+            [("|", [["foo"], ["bar"], ["baz"]]), ("qux", [])],
+        ),
+        ("foo | bar &", [("&", ["|", ["foo"], ["bar"]])]),
+        ("foo 'a | b' | bar", [("|", [["foo", "a | b"], ["bar"]])]),
+        (r"foo \| bar", [("foo", ["|", "bar"])]),
+        ("foo a|b", [("foo", ["a|b"])]),
+    ),
+)
+def test_tokenize_pipe(input, expected):
+    assert lexer.tokenize(input, operators="&|") == expected
+
+
+@pytest.mark.parametrize(
+    "invalid_line",
+    ("|", "| foo", "foo |", "foo | | bar", "foo || bar", "foo |; bar"),
+)
+def test_tokenize_pipe_unexpected_token(invalid_line):
+    with pytest.raises(CommandError):
+        lexer.tokenize(invalid_line, operators="|")
+
+
+@pytest.mark.parametrize(
+    "line", ("foo bar", "foo 'bar baz'", "foo | bar x", "foo | bar &")
+)
+def test_render(line):
+    ((name, args),) = lexer.tokenize(line, operators="&|")
+    assert lexer.render(name, args) == line
+
+
+def test_command_names():
+    ((name, args),) = lexer.tokenize("foo | bar x | baz &", operators="&|")
+    assert list(lexer.command_names(name, args)) == ["foo", "bar", "baz"]
@@ -0,0 +1,296 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte
+from riposte.command import Command
+from riposte.exceptions import CommandError, RiposteException
+from riposte.metrics import (
+    BUCKETS,
+    CommandMetrics,
+    Histogram,
+    Metrics,
+    MetricsDumper,
+    MetricsSettings,
+)
+
+
+@pytest.fixture
+def repl_options():
+    return {"metrics": MetricsSettings()}
+
+
+def test_histogram():
+    histogram = Histogram()
+    for value in (0.00005, 0.0001, 0.003, 0.003, 20.0):
+        histogram.observe(value)
+
+    assert histogram.count == 5
+    assert histogram.mean == pytest.approx(4.00123)
+    assert histogram.quantile(0.4) == 0.0001
+    assert histogram.quantile(0.8) == 0.005
+    assert histogram.quantile(1.0) == float("inf")
+    cumulative = dict(histogram.cumulative())
+    assert cumulative["0.0001"] == 2
+    assert cumulative["0.005"] == 4
+    assert cumulative["+Inf"] == 5
+    assert len(cumulative) == len(BUCKETS) + 1
+
+
+def test_histogram_empty():
+    assert Histogram().mean == 0.0
+
+
+def test_not_measured(command: Command):
+    assert command.metrics is None
+    assert "execute" not in vars(command)  # no overhead at all
+
+
+def test_measure():
+    handler = mock.Mock(return_value=None)
+    metrics = CommandMetrics("foo")
+    command = Command("foo", lambda: handler(), "")
+    command.measure(metrics)
+
+    command.execute()
+    with pytest.raises(CommandError):
+        command.execute("too", "many")
+    handler.side_effect = ValueError
+    with pytest.raises(ValueError):
+        command.execute()
+
+    assert metrics.calls == 3
+    assert metrics.errors == {"CommandError": 1, "ValueError": 1}
+    assert metrics.guides.count == 2
+    assert metrics.handler.count == 1
+
+
+def test_measure_generator():
+    def numbers():
+        yield 1
+        yield 2
+        raise RiposteException("failed")
+
+    metrics = CommandMetrics("numbers")
+    command = Command("numbers", numbers, "")
+    command.measure(metrics)
+
+    items = command.execute()
+    assert metrics.handler.count == 0  # not consumed yet
+
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(RiposteException):
+        next(items)
+
+    assert metrics.handler.count == 1
+    assert metrics.errors == {"RiposteException": 1}
+
+
+def test_measure_abandoned_generator():
+    closed = []
+
+    def numbers():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(True)
+
+    metrics = CommandMetrics("numbers")
+    command = Command("numbers", numbers, "")
+    command.measure(metrics)
+
+    items = command.execute()
+    next(items)
+    items.close()
+
+    assert closed == [True]
+    assert metrics.handler.count == 1
+    assert metrics.errors == {}
+
+
+def test_measure_coroutine(mocked_repl: Riposte, process):
+    @mocked_repl.command("sleep")
+    async def sleep():
+        await asyncio.sleep(0.01)
+
+    @mocked_repl.command("fail")
+    async def fail():
+        raise RiposteException("failed")
+
+    process(mocked_repl, "sleep")
+    with pytest.raises(RiposteException):
+        process(mocked_repl, "fail")
+
+    assert mocked_repl.metrics.command("sleep").handler.sum >= 0.01
+    assert mocked_repl.metrics.command("fail").errors == {
+        "RiposteException": 1
+    }
+
+
+def test_measure_async_generator(mocked_repl: Riposte, process, printed):
+    @mocked_repl.command("letters")
+    async def letters(word: str):
+        for letter in word:
+            await asyncio.sleep(0)
+            yield letter
+
+    process(mocked_repl, "letters ab")
+
+    assert printed(mocked_repl) == [("a",), ("b",)]
+    assert mocked_repl.metrics.command("letters").handler.count == 1
+
+
+def test_measure_parsing(history_file, process):
+    repl = Riposte(
+        history_file=history_file, metrics=MetricsSettings(), pipes=True
+    )
+    repl.command("foo")(lambda: [])
+    repl.command("bar")(lambda *, stdin: None)
+
+    process(repl, "foo; foo | bar")
+    with pytest.raises(CommandError):
+        process(repl, "unknown")
+
+    assert repl.metrics.command("foo").parse.count == 2
+    assert repl.metrics.command("foo").calls == 2
+    assert repl.metrics.command("bar").parse.count == 1
+    assert repl.metrics.parse_errors == {"CommandError": 1}
+
+
+@mock.patch("riposte.metrics.perf_counter", side_effect=(0.0, 0.003))
+def test_measure_parsing_split(mocked_perf_counter):
+    metrics = Metrics()
+    foo = Command("foo", lambda: None, "")
+    bar = Command("bar", lambda: None, "")
+
+    metrics.measure_parsing(lambda line: ((foo, ()), (bar, ()), (foo, ())), "")
+
+    # the line is parsed once, its time isn't counted for every command
+    assert metrics.command("foo").parse.sum == pytest.approx(0.002)
+    assert metrics.command("bar").parse.sum == pytest.approx(0.001)
+
+
+def test_disabled(repl: Riposte, foo_command: Command, process):
+    process(repl, "foo")
+
+    assert repl.metrics is None
+    assert "stats" not in repl._commands
+    assert "execute" not in vars(foo_command)
+
+
+def test_stats_command(mocked_repl: Riposte, process, printed):
+    mocked_repl.command("foo")(mock.Mock(__annotations__={}))
+    mocked_repl.command("bar")(mock.Mock(__annotations__={}))
+
+    process(mocked_repl, "foo; foo")
+    process(mocked_repl, "stats")
+
+    header, foo, stats = printed(mocked_repl)  # "bar" never called
+    assert header[0].split() == [
+        "command",
+        "calls",
+        "errors",
+        "parse",
+        "guides",
+        "handler",
+        "p95",
+    ]
+    assert foo[0].split()[:3] == ["foo", "2", "0"]
+    assert stats[0].split()[:3] == ["stats", "1", "0"]
+
+
+def test_stats_reset(mocked_repl: Riposte, process):
+    foo = mock.Mock(__annotations__={})
+    mocked_repl.command("foo")(foo)
+    process(mocked_repl, "foo")
+
+    process(mocked_repl, "stats reset")
+    process(mocked_repl, "foo")
+
+    assert mocked_repl.metrics.command("foo").calls == 1
+    assert mocked_repl.metrics.command("stats").calls == 0
+
+
+def test_stats_unknown_subcommand(mocked_repl: Riposte, process):
+    with pytest.raises(CommandError, match="Unknown subcommand: foo"):
+        process(mocked_repl, "stats foo")
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    foo = metrics.command('fo"o')
+    foo.called()
+    foo.failed(ValueError())
+    foo.handler.observe(0.002)
+    metrics.parse_errors["CommandError"] = 2
+    return metrics
+
+
+def test_openmetrics(metrics: Metrics):
+    lines = metrics.to_openmetrics().splitlines()
+
+    assert 'riposte_command_calls_total{command="fo\\"o"} 1' in lines
+    assert (
+        'riposte_command_errors_total{command="fo\\"o",type="ValueError"} 1'
+        in lines
+    )
+    assert (
+        'riposte_command_handler_seconds_bucket{command="fo\\"o",le="0.0025"}'
+        " 1" in lines
+    )
+    assert 'riposte_command_handler_seconds_sum{command="fo\\"o"} 0.002' in (
+        lines
+    )
+    assert 'riposte_command_parse_seconds_count{command="fo\\"o"} 0' in lines
+    assert 'riposte_parse_errors_total{type="CommandError"} 2' in lines
+    assert lines[-1] == "# EOF"
+
+
+def test_json(metrics: Metrics):
+    snapshot = json.loads(metrics.to_json())
+
+    assert snapshot["commands"]['fo"o']["calls"] == 1
+    assert snapshot["commands"]['fo"o']["handler"]["buckets"]["+Inf"] == 1
+    assert snapshot["parse_errors"] == {"CommandError": 2}
+
+
+def test_dump(metrics: Metrics, tmp_path):
+    metrics.dump(tmp_path / "metrics.json")
+    metrics.dump(tmp_path / "metrics.prom")
+
+    assert json.loads((tmp_path / "metrics.json").read_text())
+    assert (tmp_path / "metrics.prom").read_text().endswith("# EOF\n")
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "metrics.json",
+        "metrics.prom",
+    ]
+
+
+def test_dumper(metrics: Metrics, tmp_path):
+    path = tmp_path / "metrics.json"
+    dumper = MetricsDumper(metrics, path, interval=0.001)
+    with mock.patch.object(metrics, "dump", wraps=metrics.dump) as dump:
+        dumper.start()
+        while dump.call_count < 2:
+            pass
+        dumper.stop()
+
+    assert not dumper.is_alive()
+    assert json.loads(path.read_text())["parse_errors"] == {"CommandError": 2}
+
+
+def test_run_dumps_metrics(history_file, tmp_path):
+    path = tmp_path / "metrics.json"
+    repl = Riposte(history_file=history_file, metrics=MetricsSettings(path))
+    repl.command("foo")(mock.Mock(__annotations__={}))
+    repl.parse_cli_arguments = mock.Mock()
+    repl.input_stream = iter([lambda: "foo"])
+
+    repl.run()
+
+    assert json.loads(path.read_text())["commands"]["foo"]["calls"] == 1
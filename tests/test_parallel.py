@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte, input_streams
+from riposte.exceptions import RiposteException
+from riposte.parallel import Parallel, ParallelRunner
+
+
+@pytest.fixture
+def parallel_repl(mocked_repl: Riposte):
+    repl = mocked_repl
+
+    @repl.command("echo")
+    def echo(*words: str):
+        repl.print("begin", *words)
+        repl.print("end", *words)
+
+    @repl.command("fail")
+    def fail():
+        repl.print("failing")
+        raise RiposteException("failed")
+
+    return repl
+
+
+def run(repl, commands, **settings):
+    repl.input_stream = input_streams.cli_input(commands)
+    ParallelRunner(repl, Parallel(workers=4, **settings)).run()
+
+
+def test_parallel_ordered(parallel_repl, printed):
+    run(parallel_repl, "; ".join(f"echo {idx}" for idx in range(50)))
+
+    assert printed(parallel_repl) == [
+        line
+        for idx in range(50)
+        for line in (("begin", str(idx)), ("end", str(idx)))
+    ]
+
+
+def test_parallel_unordered_grouped(parallel_repl, printed):
+    echoed = threading.Event()
+    parallel_repl._printer_thread.put.side_effect = lambda resource: (
+        echoed.set() if resource.content == ("end", "1") else None
+    )
+
+    @parallel_repl.command("slow")
+    def slow():
+        echoed.wait(timeout=5)
+        parallel_repl.print("slow")
+
+    run(parallel_repl, "slow; echo 1", ordered=False)
+
+    assert printed(parallel_repl) == [("begin", "1"), ("end", "1"), ("slow",)]
+
+
+def test_parallel_keep_going(parallel_repl, printed):
+    parallel_repl.input_stream = iter(
+        [lambda: "fail", lambda: "foo", lambda: "echo 1"]
+    )
+    ParallelRunner(parallel_repl, Parallel(workers=4)).run()
+
+    assert printed(parallel_repl) == [
+        ("failing",),
+        ("\033[91m[-]\033[0m", mock.ANY),
+        ("\033[91m[-]\033[0m", mock.ANY),  # unknown command `foo`
+        ("begin", "1"),
+        ("end", "1"),
+    ]
+
+
+def test_parallel_script_errors(parallel_repl, printed, tmp_path):
+    script = tmp_path / "script.rpst"
+    script.write_text("echo 1\nfail\nfoo\n")
+    parallel_repl.pipelined = True
+    parallel_repl.input_stream = input_streams.file_input(script)
+
+    ParallelRunner(parallel_repl, Parallel(workers=4)).run()
+
+    assert [line[:2] for line in printed(parallel_repl)[-3:]] == [
+        ("failing",),
+        ("\033[91m[-]\033[0m", "line 2:"),
+        ("\033[91m[-]\033[0m", "line 3:"),
+    ]
+    assert parallel_repl.exit_code == 1
+
+
+def test_parallel_fail_fast(parallel_repl, printed):
+    parallel_repl.input_stream = iter(
+        [lambda: "fail"] + [lambda: "echo 1"] * 100
+    )
+    ParallelRunner(
+        parallel_repl, Parallel(workers=1, fail_fast=True)
+    ).run()
+
+    assert printed(parallel_repl)[:2] == [
+        ("failing",),
+        ("\033[91m[-]\033[0m", mock.ANY),
+    ]
+    assert len(printed(parallel_repl)) < 2 + 2 * 100
+
+
+@mock.patch("riposte.riposte.ParallelRunner")
+def test_run_parallel(mocked_runner, repl: Riposte):
+    repl.parallel = Parallel()
+    repl.pipelined = True
+    repl.parse_cli_arguments = mock.Mock()
+
+    repl.run()
+
+    mocked_runner.assert_called_once_with(repl, repl.parallel)
+    mocked_runner.return_value.run.assert_called_once_with()
+
+
+@mock.patch("riposte.riposte.ParallelRunner")
+def test_run_parallel_interactive(mocked_runner, repl: Riposte):
+    repl.parallel = Parallel()
+    repl._process = mock.Mock(side_effect=StopIteration)
+    repl.parse_cli_arguments = mock.Mock()
+
+    repl.run()
+
+    mocked_runner.assert_not_called()
+
+
+def test_parallel_coroutine_handler(parallel_repl, printed):
+    @parallel_repl.command("sleep")
+    async def sleep(word: str):
+        await asyncio.sleep(0)
+        parallel_repl.print(word)
+
+    parallel_repl.input_stream = input_streams.cli_input("sleep a; sleep b")
+
+    ParallelRunner(parallel_repl, Parallel(workers=2)).run()
+
+    assert printed(parallel_repl) == [("a",), ("b",)]
@@ -1,10 +1,19 @@
+import asyncio
+import io
+import threading
 from unittest import mock
 
 import pytest
 
-from riposte.printer import Palette
-from riposte.printer.mixins import PrinterBaseMixin, PrinterMixin
-from riposte.printer.thread import PrintResource
+from riposte.printer import OverflowPolicy, Palette
+from riposte.printer.loop import LoopPrinter
+from riposte.printer.mixins import (
+    PrinterBaseMixin,
+    PrinterMixin,
+    capture_output,
+    tag_output,
+)
+from riposte.printer.thread import PrinterThread, PrintResource, render
 
 
 @pytest.fixture
@@ -71,3 +80,281 @@ def test_printer_mixin_base(args, kwargs):
     printer_base_mixin._printer_thread.put.assert_called_once_with(
         PrintResource(content=args, **kwargs)
     )
+
+
+def test_render():
+    assert render(PrintResource(("foo", 1), sep="-", end="+", file=None)) == (
+        "foo-1+"
+    )
+    assert render(PrintResource(("foo", 1), sep=None, end=None, file=None)) == (
+        "foo 1\n"
+    )
+
+
+def test_printer_thread_write():
+    stdout, stderr = mock.Mock(), mock.Mock()
+    batch = [
+        PrintResource(("foo",), sep=" ", end="\n", file=stdout),
+        PrintResource(("bar",), sep=" ", end="\n", file=stdout),
+        PrintResource(("baz",), sep=" ", end="\n", file=stderr),
+        PrintResource(("qux",), sep=" ", end="\n", file=stdout),
+    ]
+    manager = mock.Mock()
+    manager.attach_mock(stdout, "stdout")
+    manager.attach_mock(stderr, "stderr")
+
+    PrinterThread._write(batch)
+
+    assert manager.mock_calls == [
+        mock.call.stdout.write("foo\nbar\n"),
+        mock.call.stdout.flush(),
+        mock.call.stderr.write("baz\n"),
+        mock.call.stderr.flush(),
+        mock.call.stdout.write("qux\n"),
+        mock.call.stdout.flush(),
+    ]
+
+
+def test_printer_thread():
+    file = io.StringIO()
+    printer_thread = PrinterThread(latency=0.01)
+    printer_thread.start()
+
+    for idx in range(1000):
+        printer_thread.put(
+            PrintResource(content=(idx,), sep=" ", end="\n", file=file)
+        )
+    printer_thread.wait()
+
+    assert file.getvalue() == "".join(f"{idx}\n" for idx in range(1000))
+
+
+def test_printer_thread_own_queue():
+    file = io.StringIO()
+    resource = PrintResource(content=("foo",), sep=" ", end="\n", file=file)
+    started, idle = PrinterThread(), PrinterThread()
+    started.start()
+
+    idle.put(resource)
+    started.put(resource)
+    started.wait()  # doesn't wait for `idle` thread's queue
+
+    assert file.getvalue() == "foo\n"
+    assert idle.queue.qsize() == 1
+
+
+def resource_for(file, idx):
+    return PrintResource(content=(idx,), sep=" ", end="\n", file=file)
+
+
+def test_printer_thread_drop_oldest():
+    file = io.StringIO()
+    printer_thread = PrinterThread(
+        maxsize=2, overflow=OverflowPolicy.DROP_OLDEST
+    )
+
+    for idx in range(5):
+        printer_thread.put(resource_for(file, idx))
+    printer_thread.start()
+    printer_thread.wait()
+
+    assert file.getvalue() == "3\n4\n"
+    assert printer_thread.dropped == 3
+
+
+def test_printer_thread_spill():
+    file, other_file = io.StringIO(), io.StringIO()
+    printer_thread = PrinterThread(maxsize=2, overflow=OverflowPolicy.SPILL)
+
+    for idx in range(5):
+        printer_thread.put(resource_for(file, idx))
+    printer_thread.put(resource_for(other_file, "foo"))
+    printer_thread.start()
+    printer_thread.wait()
+
+    assert printer_thread.spilled == 4
+
+    for idx in range(5, 1000):
+        printer_thread.put(resource_for(file, idx))
+    printer_thread.wait()
+
+    assert file.getvalue() == "".join(f"{idx}\n" for idx in range(1000))
+    assert other_file.getvalue() == "foo\n"
+
+
+class BlockedFile(io.StringIO):
+    """File blocking the first write until `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.release.wait()
+        return super().write(text)
+
+
+def test_printer_thread_spill_slow_consumer():
+    file = BlockedFile()
+    printer_thread = PrinterThread(maxsize=2, overflow=OverflowPolicy.SPILL)
+    printer_thread.start()
+
+    printer_thread.put(resource_for(file, 0))
+    file.writing.wait()  # the first batch is being written
+    for idx in range(1, 5):  # 1 and 2 are queued, the rest spilled
+        printer_thread.put(resource_for(file, idx))
+    file.release.set()
+    printer_thread.wait()
+
+    assert printer_thread.spilled == 2
+    assert file.getvalue() == "0\n1\n2\n3\n4\n"
+
+
+def test_printer_thread_wait_busy_producer():
+    file = io.StringIO()
+    printer_thread = PrinterThread()
+    printer_thread.start()
+    stop = threading.Event()
+
+    def produce():
+        while not stop.is_set():
+            printer_thread.put(resource_for(file, "job"))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    try:
+        printer_thread.put(resource_for(file, "foo"))
+        waiting = threading.Thread(target=printer_thread.wait)
+        waiting.start()
+        waiting.join(timeout=5)
+
+        # doesn't wait for resources put after it has been called
+        assert not waiting.is_alive()
+        assert "foo\n" in file.getvalue()
+    finally:
+        stop.set()
+        producer.join()
+
+
+def test_printer_thread_close():
+    file = io.StringIO()
+    printer_thread = PrinterThread(maxsize=2, overflow=OverflowPolicy.SPILL)
+    printer_thread.close()  # never started, nothing to stop
+    printer_thread.start()
+
+    for idx in range(5):
+        printer_thread.put(resource_for(file, idx))
+    printer_thread.close()
+
+    assert not printer_thread.is_alive()
+    assert file.getvalue() == "0\n1\n2\n3\n4\n"
+    printer_thread.wait()  # nothing to wait for once closed
+    printer_thread.close()
+
+
+def test_printer_mixin_counters():
+    printer_base_mixin = PrinterBaseMixin()
+    printer_base_mixin._printer_thread = mock.Mock(dropped=1, spilled=2)
+
+    assert printer_base_mixin.printer_dropped == 1
+    assert printer_base_mixin.printer_spilled == 2
+
+
+def test_capture_output(args, kwargs):
+    printer_base_mixin = PrinterBaseMixin()
+    printer_base_mixin._printer_thread = mock.Mock()
+
+    with capture_output() as resources:
+        printer_base_mixin._print(*args, **kwargs)
+
+    printer_base_mixin._printer_thread.put.assert_not_called()
+    assert resources == [PrintResource(content=args, **kwargs)]
+
+
+def test_capture_output_per_task():
+    printer_base_mixin = PrinterBaseMixin()
+    printer_base_mixin._printer_thread = mock.Mock()
+
+    async def task(name):
+        with capture_output() as resources:
+            printer_base_mixin._print(name)
+            await asyncio.sleep(0)
+            printer_base_mixin._print(name)
+        return [resource.content for resource in resources]
+
+    async def main():
+        return await asyncio.gather(task("foo"), task("bar"))
+
+    assert asyncio.run(main()) == [[("foo",)] * 2, [("bar",)] * 2]
+    printer_base_mixin._printer_thread.put.assert_not_called()
+
+
+def test_loop_printer_no_loop():
+    file = io.StringIO()
+    printer = LoopPrinter()
+
+    printer.put(resource_for(file, "foo"))
+
+    assert file.getvalue() == "foo\n"
+
+
+def test_loop_printer():
+    file = mock.Mock()
+    printer = LoopPrinter()
+
+    async def main():
+        printer.loop = asyncio.get_running_loop()
+        for idx in range(3):
+            printer.put(resource_for(file, idx))
+        assert file.write.call_count == 0  # written by the loop
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    file.write.assert_called_once_with("0\n1\n2\n")
+    file.flush.assert_called_once_with()
+
+
+def test_loop_printer_close():
+    file = io.StringIO()
+    printer = LoopPrinter()
+    printer.loop = mock.Mock()
+
+    printer.put(resource_for(file, "foo"))
+    printer.close()
+
+    assert file.getvalue() == "foo\n"
+
+
+def test_loop_printer_latency():
+    file = mock.Mock()
+    printer = LoopPrinter(latency=0.01)
+
+    async def main():
+        printer.loop = asyncio.get_running_loop()
+        printer.put(resource_for(file, 0))
+        await asyncio.sleep(0)
+        assert file.write.call_count == 0  # still waiting for more
+        printer.put(resource_for(file, 1))
+        await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+
+    file.write.assert_called_once_with("0\n1\n")
+
+
+def test_tag_output():
+    printer_base_mixin = PrinterBaseMixin()
+    printer_base_mixin._printer_thread = mock.Mock()
+
+    with tag_output("[1]"):
+        printer_base_mixin._print("foo")
+    printer_base_mixin._print("bar")
+
+    put = printer_base_mixin._printer_thread.put
+    assert [resource.content for (resource,), _ in put.call_args_list] == [
+        ("[1]", "foo"),
+        ("bar",),
+    ]
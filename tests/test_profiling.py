@@ -0,0 +1,268 @@
+import asyncio
+import pstats
+import time
+
+import pytest
+
+from riposte import Riposte
+from riposte.command import Command
+from riposte.exceptions import CommandError
+from riposte.profiling import (
+    CProfiler,
+    Profiler,
+    ProfilerType,
+    ProfilingSettings,
+    SamplingProfiler,
+)
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def slow_part():
+    busy(0.02)
+
+
+@pytest.fixture
+def repl_options():
+    return {"profiling": ProfilingSettings()}
+
+
+@pytest.fixture
+def profiling_repl(mocked_repl: Riposte):
+    repl = mocked_repl
+
+    @repl.command("work")
+    def work():
+        slow_part()
+
+    @repl.command("letters")
+    def letters(word: str):
+        for letter in word:
+            slow_part()
+            yield letter
+
+    return repl
+
+
+def reported(contents):
+    """Lines of the profile report among the `contents` printed."""
+    return [
+        content[0]
+        for content in contents
+        if len(content) == 1 and isinstance(content[0], str)
+    ]
+
+
+def test_not_profiled(command: Command):
+    assert command.profiler is None
+    assert "execute" not in vars(command)
+
+
+def test_profiler_abstract():
+    with pytest.raises(TypeError):
+        Profiler()
+
+
+def test_cprofiler():
+    profiler = CProfiler()
+    profiled = profiler.wrap(lambda: slow_part())
+
+    profiled()
+    profiled()
+
+    stats = {
+        function[2]: stat for function, stat in profiler.stats().items()
+    }
+    assert stats["slow_part"][1] == 2
+    assert stats["slow_part"][3] >= 0.04
+    assert "execute_profiled" not in stats
+    lines = profiler.report(limit=3)
+    assert lines[0].split() == ["calls", "own", "total", "function"]
+    assert len(lines) == 4
+
+
+def test_cprofiler_generator():
+    profiler = CProfiler()
+
+    def numbers():
+        for number in range(3):
+            slow_part()
+            yield number
+
+    items = profiler.wrap(numbers)()
+    assert list(items) == [0, 1, 2]
+    busy(0.05)  # between the items, not profiled
+
+    stats = {
+        function[2]: stat for function, stat in profiler.stats().items()
+    }
+    assert stats["slow_part"][1] == 3
+    assert "busy" in stats
+    assert stats["busy"][3] < 0.1
+
+
+def test_cprofiler_reset():
+    profiler = CProfiler()
+    profiler.wrap(slow_part)()
+
+    profiler.reset()
+
+    assert profiler.stats() == {}
+    assert profiler.report() == [profiler.report()[0]]
+
+
+def test_cprofiler_nested():
+    profiler = CProfiler()
+    inner = profiler.wrap(slow_part)
+    outer = profiler.wrap(lambda: inner())
+
+    outer()
+
+    stats = {
+        function[2]: stat for function, stat in profiler.stats().items()
+    }
+    assert stats["slow_part"][1] == 1
+
+
+def test_cprofiler_dump(tmp_path):
+    profiler = CProfiler()
+    profiler.wrap(slow_part)()
+
+    profiler.dump(tmp_path / "work.prof")
+
+    stats = pstats.Stats(str(tmp_path / "work.prof"))
+    assert any(name == "slow_part" for _, _, name in stats.stats)
+
+
+def test_sampling_profiler(tmp_path):
+    profiler = SamplingProfiler(interval=0.001)
+
+    profiler.wrap(slow_part)()
+    sampler = profiler._sampler
+    if sampler is not None:
+        sampler.join()
+
+    assert profiler.samples
+    for stack in profiler.samples:
+        assert stack[0].startswith("slow_part (test_profiling.py:")
+    assert stack[-1].startswith("busy ")
+    lines = profiler.report()
+    assert lines[0].split() == ["samples", "own", "%", "total", "%", "function"]
+    assert any(line.endswith(stack[0]) for line in lines[1:])
+
+    profiler.dump(tmp_path / "work.folded")
+    for line in (tmp_path / "work.folded").read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("slow_part ")
+        assert int(count) > 0
+
+
+def test_profile_command(profiling_repl: Riposte, process, printed):
+    process(profiling_repl, "profile work")
+
+    lines = reported(printed(profiling_repl))
+    assert lines[0].split() == ["calls", "own", "total", "function"]
+    assert any("(slow_part)" in line for line in lines)
+    assert len(lines) <= profiling_repl.profiling.limit + 1
+    assert profiling_repl._commands["work"].profiler is None
+
+
+def test_profile_command_generator(profiling_repl: Riposte, process, printed):
+    process(profiling_repl, "profile letters ab")
+
+    assert printed(profiling_repl)[:2] == [("a",), ("b",)]
+    stats = profiling_repl.profiler.stats()
+    assert any(
+        name == "slow_part" and stat[1] == 2
+        for (_, _, name), stat in stats.items()
+    )
+
+
+def test_profile_command_coroutine(
+    profiling_repl: Riposte, process, printed
+):
+    @profiling_repl.command("sleep")
+    async def sleep():
+        await asyncio.sleep(0)
+        slow_part()
+
+    process(profiling_repl, "profile sleep")
+
+    lines = reported(printed(profiling_repl))
+    assert any("(slow_part)" in line for line in lines)
+
+
+def test_profile_toggle(profiling_repl: Riposte, process):
+    process(profiling_repl, "profile on work")
+    process(profiling_repl, "work")
+    process(profiling_repl, "work")
+    process(profiling_repl, "letters a")
+    process(profiling_repl, "profile off")
+    process(profiling_repl, "work")
+
+    stats = profiling_repl.profiler.stats()
+    assert [
+        stat[1] for (_, _, name), stat in stats.items() if name == "slow_part"
+    ] == [2]
+    assert "execute" not in vars(profiling_repl._commands["work"])
+
+    with pytest.raises(CommandError):
+        process(profiling_repl, "profile on unknown")
+
+
+def test_profile_toggle_all(profiling_repl: Riposte, process):
+    process(profiling_repl, "profile on")
+
+    assert profiling_repl._commands["work"].profiler is not None
+    assert profiling_repl._commands["letters"].profiler is not None
+    assert profiling_repl._commands["profile"].profiler is None
+    with pytest.raises(CommandError):
+        process(profiling_repl, "profile work")
+
+
+def test_profile_dump(profiling_repl: Riposte, tmp_path, process):
+    with pytest.raises(CommandError):
+        process(profiling_repl, "profile dump work.prof")
+
+    process(profiling_repl, "profile work")
+    process(profiling_repl, f"profile dump {tmp_path / 'work.prof'}")
+
+    stats = pstats.Stats(str(tmp_path / "work.prof"))
+    assert any(name == "slow_part" for _, _, name in stats.stats)
+    with pytest.raises(CommandError):
+        process(profiling_repl, "profile dump")
+
+
+@pytest.mark.parametrize(
+    "repl_options",
+    ({"profiling": ProfilingSettings(profiler=ProfilerType.SAMPLING)},),
+)
+def test_profile_sampling(mocked_repl: Riposte, tmp_path, process, printed):
+    repl = mocked_repl
+    repl.command("work")(slow_part)
+
+    process(repl, "profile work")
+    process(repl, f"profile dump {tmp_path / 'work.folded'}")
+
+    assert isinstance(repl.profiler, SamplingProfiler)
+    assert reported(printed(repl))[0].split()[0] == "samples"
+    assert (tmp_path / "work.folded").read_text().startswith(
+        "execute (command.py:"
+    )
+
+
+def test_complete_profile_command(profiling_repl: Riposte):
+    complete = profiling_repl._complete_profile_command
+
+    assert complete("o", "profile o", 8, 9) == ["off", "on"]
+    assert complete("w", "profile w", 8, 9) == ["work"]
+    assert complete("", "profile on ", 11, 11) == ["letters", "work"]
+    assert complete("", "profile work ", 13, 13) == []
+
+
+def test_disabled(repl: Riposte):
+    assert "profile" not in repl._commands
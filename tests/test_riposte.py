@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from unittest import mock
 
@@ -5,6 +6,7 @@ import pytest
 
 from riposte import Riposte, input_streams
 from riposte.command import Command
+from riposte.completion import CompletionSettings, CompletionStrategy
 from riposte.exceptions import CommandError, RiposteException
 
 
@@ -108,45 +110,20 @@ def test_complete_already_attached(repl: Riposte, foo_command: Command):
             pass
 
 
-@pytest.mark.parametrize(
-    ("input", "expected"),
-    (
-        ("foo bar baz", ["foo bar baz"]),
-        ("foo bar;", ["foo bar"]),
-        ("foo bar; ;", ["foo bar"]),
-        ("foo bar; scoo bee; doo bee", ["foo bar", "scoo bee", "doo bee"]),
-        ("foo   ;   bar;  ;", ["foo", "bar"]),
-        ("foo 'bar;' scoo bee", ["foo 'bar;' scoo bee"]),
-        (r"foo bar\; scoo bee", ["foo bar\\; scoo bee"]),
-        (r"foo bar\\; scoo bee", ["foo bar\\\\; scoo bee"]),
-        (r"foo bar\\\; scoo bee", ["foo bar\\\\\\; scoo bee"]),
-    ),
-)
-def test_split_inline_commands(input, expected, repl: Riposte):
-    assert repl._split_inline_commands(input) == expected
-
-
-def test_split_inline_commands_unexpected_token(repl: Riposte):
-    with pytest.raises(CommandError):
-        repl._split_inline_commands("foo bar;;")
-
-
 @mock.patch("builtins.input", return_value="foo bar")
 def test_process(mocked_input, repl: Riposte, foo_command: Command):
     repl._process()
     foo_command._func.assert_called_once_with("bar")
 
 
+@mock.patch("riposte.riposte.lexer")
 @mock.patch("builtins.input", return_value="")
-def test_process_no_input(mocked_input, repl: Riposte):
-    repl._split_inline_commands = mock.MagicMock()
-    repl._parse_line = mock.Mock()
+def test_process_no_input(mocked_input, mocked_lexer, repl: Riposte):
     repl._get_command = mock.Mock()
 
     repl._process()
 
-    repl._split_inline_commands.assert_not_called()
-    repl._parse_line.assert_not_called()
+    mocked_lexer.tokenize.assert_not_called()
     repl._get_command.assert_not_called()
 
 
@@ -191,12 +168,71 @@ def test_banner_alternative_stream(mocked_print, repl: Riposte):
     mocked_print.assert_not_called()
 
 
+@pytest.mark.parametrize(("pipelined", "waits"), ((False, 3), (True, 0)))
+def test_run_pipelined(pipelined, waits, repl: Riposte):
+    repl.pipelined = pipelined
+    repl._printer_thread = mock.Mock()
+    repl._process = mock.Mock(side_effect=(None, None, StopIteration))
+    repl.parse_cli_arguments = mock.Mock()
+
+    repl.run()
+
+    assert repl._printer_thread.wait.call_count == waits
+    repl._printer_thread.close.assert_called_once_with()
+
+
+def test_run_stops_printer(repl: Riposte):
+    repl._process = mock.Mock(side_effect=StopIteration)
+    repl.parse_cli_arguments = mock.Mock()
+
+    repl.run()
+
+    assert not repl._printer_thread.is_alive()
+
+
+@pytest.mark.parametrize("script_cache", (False, True))
+def test_run_file_input_errors(script_cache, repl: Riposte, tmp_path):
+    script = tmp_path / "script.rpst"
+    script.write_text("foo bar\nunknown\nfoo baz\n")
+    repl.script_cache = script_cache
+    repl.pipelined = True
+    repl.error = mock.Mock()
+
+    @repl.command("foo")
+    def foo(arg: str):
+        pass
+
+    for _ in range(2):  # the second time from the compiled script
+        repl.input_stream = repl._file_input(script)
+        repl._run_sequential()
+
+    (location, err), _ = repl.error.call_args
+    assert location == "line 2:"
+    assert isinstance(err, CommandError)
+    assert repl.error.call_count == 2
+    assert repl.exit_code == 1  # same as when sharded
+
+
+@pytest.mark.parametrize(("pipelined", "exit_code"), ((False, 0), (True, 1)))
+def test_run_exit_code(pipelined, exit_code, repl: Riposte):
+    repl.pipelined = pipelined
+    repl._process = mock.Mock(
+        side_effect=(RiposteException("foo"), StopIteration)
+    )
+    repl.parse_cli_arguments = mock.Mock()
+
+    assert repl.run() == exit_code  # doesn't exit the process
+    assert repl.exit_code == exit_code
+
+
 def test_parse_cli_arguments_prompt(repl: Riposte):
     arguments = mock.Mock(c="", file="")
     repl.parser.parse_args = mock.Mock(return_value=arguments)
 
     repl.parse_cli_arguments()
 
+    assert repl.pipelined is False
+
     assert repl.input_stream.gi_code is input_streams.prompt_input.__code__
 
 
@@ -208,9 +244,41 @@ def test_parse_cli_arguments_cli(mocked_input_streams, repl: Riposte):
     repl.parse_cli_arguments()
 
     mocked_input_streams.cli_input.assert_called_once_with(arguments.c)
+    assert repl.pipelined is True
     assert repl.input_stream is mocked_input_streams.cli_input.return_value
 
 
+@mock.patch("riposte.riposte.input_streams")
+def test_parse_cli_arguments_file_script_cache(
+    mocked_input_streams, repl: Riposte, foo_command
+):
+    repl.script_cache = Path("cache")
+    arguments = mock.Mock(c="", file="foo.txt")
+    repl.parser.parse_args = mock.Mock(return_value=arguments)
+
+    repl.parse_cli_arguments()
+
+    mocked_input_streams.compiled_file_input.assert_called_once_with(
+        Path(arguments.file),
+        commands=frozenset({"foo"}),
+        cache_dir=Path("cache"),
+        operators="",
+    )
+    assert (
+        repl.input_stream
+        is mocked_input_streams.compiled_file_input.return_value
+    )
+
+
+def test_process_compiled_line(repl: Riposte, foo_command):
+    repl.input_stream = iter([lambda: (("foo", ("bar",)), ("foo", ()))])
+
+    repl._process()
+
+    assert foo_command._func.call_args_list == [mock.call("bar"), mock.call()]
+    assert repl.parse_cache_info().misses == 0
+
+
 @mock.patch("riposte.riposte.input_streams")
 def test_parse_cli_arguments_file(mocked_input_streams, repl: Riposte):
     arguments = mock.Mock(c="", file="foo.txt")
@@ -221,4 +289,357 @@ def test_parse_cli_arguments_file(mocked_input_streams, repl: Riposte):
     mocked_input_streams.file_input.assert_called_once_with(
         Path(arguments.file)
     )
+    assert repl.pipelined is True
     assert repl.input_stream is mocked_input_streams.file_input.return_value
+
+
+@mock.patch("builtins.input", return_value="foo bar; foo baz")
+def test_process_parse_cache(mocked_input, repl: Riposte, foo_command):
+    repl._process()
+    repl._process()
+
+    assert foo_command._func.call_args_list == [
+        mock.call("bar"),
+        mock.call("baz"),
+        mock.call("bar"),
+        mock.call("baz"),
+    ]
+    assert repl.parse_cache_info().hits == 1
+    assert repl.parse_cache_info().misses == 1
+
+
+def test_parse_cache_invalidation(repl: Riposte, foo_command):
+    repl._resolve_input("foo")
+
+    @repl.command(name="bar")
+    def bar():
+        pass
+
+    assert repl.parse_cache_info().currsize == 0
+
+
+def test_parse_cache_unknown_command(repl: Riposte):
+    with pytest.raises(CommandError):
+        repl._resolve_input("foo")
+
+    assert repl.parse_cache_info().currsize == 0
+
+
+def test_parse_cache_size(history_file):
+    repl = Riposte(history_file=history_file, parse_cache_size=1)
+
+    assert repl.parse_cache_info().maxsize == 1
+
+
+def test_printer_thread_per_instance(history_file):
+    assert (
+        Riposte(history_file=history_file)._printer_thread.queue
+        is not Riposte(history_file=history_file)._printer_thread.queue
+    )
+
+
+@mock.patch("builtins.input", side_effect=["foo bar", "foo baz"])
+def test_process_coroutine_handler(mocked_input, repl: Riposte):
+    calls = []
+
+    @repl.command("foo")
+    async def foo(arg: str):
+        await asyncio.sleep(0)
+        calls.append((arg, asyncio.get_running_loop()))
+
+    repl._process()
+    repl._process()
+
+    assert [arg for arg, _ in calls] == ["bar", "baz"]
+    assert calls[0][1] is calls[1][1] is repl.loop
+
+
+@mock.patch("riposte.riposte.readline")
+def test_complete_coroutine_completer(mocked_readline, repl, foo_command):
+    mocked_readline.get_line_buffer.return_value = "foo ba"
+    mocked_readline.get_begidx.return_value = 4
+    mocked_readline.get_endidx.return_value = 6
+
+    @repl.complete("foo")
+    async def complete_foo(text, line, start_index, end_index):
+        await asyncio.sleep(0)
+        return ["bar", "baz"]
+
+    assert repl._complete("ba", 0) == "bar"
+    assert repl._complete("ba", 1) == "baz"
+    assert repl._complete("ba", 2) is None
+
+
+def test_await_running_loop(repl: Riposte):
+    async def answer():
+        return 42
+
+    async def main():
+        # e.g. completer called by `readline` in a different thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, repl._await, answer())
+
+    assert repl.loop.run_until_complete(main()) == 42
+
+
+def test_close_loop(repl: Riposte):
+    loop = repl.loop
+    task = loop.create_task(asyncio.sleep(60))
+
+    repl._close_loop()
+
+    assert task.cancelled()
+    assert loop.is_closed()
+    assert repl._loop is None
+
+
+@mock.patch("builtins.input", return_value="numbers 3")
+def test_process_generator_handler(mocked_input, repl: Riposte):
+    repl._printer_thread = mock.Mock()
+
+    @repl.command("numbers")
+    def numbers(limit: int):
+        yield from range(limit)
+
+    repl._process()
+
+    assert [
+        resource.content
+        for (resource,), _ in repl._printer_thread.put.call_args_list
+    ] == [(0,), (1,), (2,)]
+
+
+@mock.patch("builtins.input", return_value="numbers 4 | even | double")
+def test_process_pipe(mocked_input, history_file):
+    repl = Riposte(history_file=history_file, pipes=True)
+    repl._printer_thread = mock.Mock()
+
+    @repl.command("numbers")
+    def numbers(limit: int):
+        yield from range(limit)
+
+    @repl.command("even")
+    def even(*, stdin):
+        return (number for number in stdin if not number % 2)
+
+    @repl.command("double")
+    async def double(*, stdin):
+        for number in stdin:
+            yield number * 2
+
+    repl._process()
+
+    assert [
+        resource.content
+        for (resource,), _ in repl._printer_thread.put.call_args_list
+    ] == [(0,), (4,)]
+
+
+def test_resolve_pipe(history_file):
+    repl = Riposte(history_file=history_file, pipes=True)
+    foo, bar = mock.Mock(__annotations__={}), lambda *, stdin: None
+    repl.command("foo")(foo)
+    repl.command("bar")(bar)
+
+    ((pipeline, args),) = repl._resolve_input("foo x | bar y")
+
+    assert pipeline.name == "foo | bar"
+    assert args == (("x",), ("y",))
+    with pytest.raises(CommandError, match="doesn't accept piped input"):
+        repl._resolve_input("bar | foo")
+
+
+def test_resolve_pipe_disabled(repl: Riposte, foo_command):
+    assert repl._resolve_input("foo | bar") == ((foo_command, ("|", "bar")),)
+
+
+def test_resolve_pipe_enabled_later(repl: Riposte, foo_command):
+    repl.command("bar")(lambda *, stdin: None)
+    repl._resolve_input("foo x | bar")  # cached without pipes
+
+    repl.pipes = True
+    ((pipeline, args),) = repl._resolve_input("foo x | bar")
+
+    assert pipeline.name == "foo | bar"
+    assert args == (("x",), ())
+
+
+def test_command_index(repl: Riposte):
+    for name in ("git.push", "foo", "git.pull"):
+        repl.command(name)(mock.Mock(__annotations__={}))
+
+    assert list(repl.command_index) == ["foo", "git.pull", "git.push"]
+    assert repl._raw_command_completer("git.p", "git.p", 0, 5) == [
+        "git.pull",
+        "git.push",
+    ]
+    assert repl._raw_command_completer("f", "f", 0, 1) == ["foo "]
+
+
+def test_contextual_complete_view(repl: Riposte):
+    for name in ("git.push", "git.pull", "ls"):
+        repl.command(name)(mock.Mock(__annotations__={}))
+    git = repl.command_index.view(lambda name: name.startswith("git."))
+    repl.contextual_complete = lambda: git
+
+    assert repl._raw_command_completer("", "", 0, 0) == [
+        "git.pull",
+        "git.push",
+    ]
+
+    repl.command("git.log")(mock.Mock(__annotations__={}))  # view is live
+
+    assert repl._raw_command_completer("git.l", "git.l", 0, 5) == [
+        "git.log "
+    ]
+
+
+def test_contextual_complete_list(repl: Riposte):
+    repl.contextual_complete = lambda: ["foo", "bar", "baz"]
+
+    assert repl._raw_command_completer("ba", "ba", 0, 2) == ["bar", "baz"]
+
+
+@mock.patch("riposte.riposte.readline")
+def test_complete_cached(mocked_readline, history_file):
+    repl = Riposte(
+        history_file=history_file, completion=CompletionSettings(ttl=60)
+    )
+    mocked_readline.get_line_buffer.return_value = "foo ba"
+    mocked_readline.get_begidx.return_value = 4
+    mocked_readline.get_endidx.return_value = 6
+    completer = mock.Mock(return_value=["bar", "baz"])
+    repl.command("foo")(mock.Mock(__annotations__={}))
+    repl.complete("foo")(completer)
+
+    assert repl._complete("ba", 0) == "bar"
+    assert repl._complete("ba", 0) == "bar"
+
+    completer.assert_called_once_with("ba", "foo ba", 4, 6)
+
+
+@mock.patch("riposte.riposte.readline")
+def test_complete_cached_coroutine(mocked_readline, history_file):
+    repl = Riposte(
+        history_file=history_file, completion=CompletionSettings(ttl=60)
+    )
+    mocked_readline.get_line_buffer.return_value = "foo ba"
+    mocked_readline.get_begidx.return_value = 4
+    mocked_readline.get_endidx.return_value = 6
+    repl.command("foo")(mock.Mock(__annotations__={}))
+
+    @repl.complete("foo")
+    async def complete_foo(text, line, start_index, end_index):
+        await asyncio.sleep(0)
+        return ["bar"]
+
+    assert repl._complete("ba", 0) == "bar"
+    assert repl._loop is None  # app's loop is left alone
+
+
+@mock.patch("riposte.riposte.readline")
+def test_complete_prefetch(mocked_readline, history_file):
+    repl = Riposte(
+        history_file=history_file,
+        completion=CompletionSettings(ttl=60, prefetch=True),
+    )
+    mocked_readline.get_line_buffer.return_value = "fo"
+    mocked_readline.get_begidx.return_value = 0
+    mocked_readline.get_endidx.return_value = 2
+    completer = mock.Mock(return_value=["bar"])
+    repl.command("foo")(mock.Mock(__annotations__={}))
+    repl.complete("foo")(completer)
+
+    assert repl._complete("fo", 0) == "foo "
+
+    # arguments are prefetched once the command is completed
+    assert repl.completion_cache.get(("foo", "foo "), completer) == ["bar"]
+    completer.assert_called_once_with("", "foo ", 4, 4)
+
+
+def test_prefetch_completions_noop(repl: Riposte, foo_command):
+    repl.prefetch_completions("foo ")  # cache disabled
+    repl.completion_cache = mock.Mock()
+
+    repl.prefetch_completions("fo")
+    repl.prefetch_completions("unknown ")
+    repl.prefetch_completions("'foo ")
+
+    repl.completion_cache.prefetch.assert_not_called()
+
+
+@mock.patch("riposte.riposte.readline")
+def test_fuzzy_completion(mocked_readline, history_file):
+    repl = Riposte(
+        history_file=history_file,
+        completion=CompletionSettings(strategy=CompletionStrategy.FUZZY),
+    )
+    history = ["git.pull origin", "ls"]
+    mocked_readline.get_current_history_length.return_value = len(history)
+    mocked_readline.get_history_item.side_effect = lambda idx: history[idx - 1]
+    for name in ("git.push", "git.pull", "gh.pr"):
+        repl.command(name)(mock.Mock(__annotations__={}))
+
+    assert repl._raw_command_completer("gpu", "gpu", 0, 3) == [
+        "git.pull",  # recently used
+        "git.push",
+        " ",  # no common prefix, readline keeps the text
+    ]
+    assert repl._raw_command_completer("gpus", "gpus", 0, 4) == ["git.push "]
+    assert repl._raw_command_completer("git.pu", "git.pu", 0, 6) == [
+        "git.pull",
+        "git.push",
+    ]
+
+    repl.contextual_complete = lambda: ["gh.pr", "git.push"]
+
+    assert repl._raw_command_completer("gp", "gp", 0, 2) == [
+        "gh.pr",
+        "git.push",
+        " ",
+    ]
+
+
+@mock.patch("builtins.print")
+@mock.patch("riposte.riposte.readline")
+def test_fuzzy_completion_display(mocked_readline, mocked_print, history_file):
+    repl = Riposte(
+        history_file=history_file,
+        completion=CompletionSettings(strategy=CompletionStrategy.FUZZY),
+    )
+    mocked_readline.set_completion_display_matches_hook.assert_called_once_with(
+        repl._display_matches
+    )
+    mocked_readline.get_line_buffer.return_value = "dpl"
+    repl.completion_matches = ["deploy", "db.pull", " "]
+
+    repl._display_matches("d", ["db.pull", "deploy"], 7)
+
+    assert mocked_print.call_args_list[1] == mock.call(
+        "deploy", "db.pull", sep="  "
+    )
+    assert mocked_print.call_args_list[2] == mock.call(
+        repl.prompt, "dpl", sep="", end=""
+    )
+
+
+@mock.patch("riposte.riposte.readline")
+def test_fuzzy_completion_usage(mocked_readline, history_file):
+    repl = Riposte(
+        history_file=history_file,
+        completion=CompletionSettings(strategy=CompletionStrategy.FUZZY),
+    )
+    mocked_readline.get_current_history_length.return_value = 1
+    mocked_readline.get_history_item.return_value = "git.pull origin"
+    for name in ("git.push", "git.pull"):
+        repl.command(name)(mock.Mock(__annotations__={}))
+
+    assert repl._raw_command_completer("gpu", "gpu", 0, 3)[0] == "git.pull"
+    loaded = mocked_readline.get_history_item.call_count
+
+    for _ in range(3):
+        repl._record_history("git.push origin")
+
+    assert repl._raw_command_completer("gpu", "gpu", 0, 3)[0] == "git.push"
+    # usage is counted as input comes, history isn't read again
+    assert mocked_readline.get_history_item.call_count == loaded
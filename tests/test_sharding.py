@@ -0,0 +1,141 @@
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+from riposte import Riposte
+from riposte.exceptions import RiposteException, StopRiposteException
+from riposte.sharding import Shard, ShardedRunner, ShardStatus, split_script
+
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "script.rpst"
+    path.write_text("".join(f"echo {idx}\n" for idx in range(100)))
+    return path
+
+
+@pytest.fixture
+def sharded_repl(mocked_repl: Riposte):
+    @mocked_repl.command("echo")
+    def echo(value: int):
+        if value == 13:
+            raise RiposteException("unlucky")
+        mocked_repl.print("echo", value)
+
+    return mocked_repl
+
+
+@pytest.mark.parametrize("shards", (1, 2, 3, 7, 200))
+def test_split_script(script, shards):
+    content = script.read_bytes()
+
+    split = split_script(script, shards)
+
+    assert len(split) == shards
+    assert split[0].start == 0
+    assert split[-1].end == len(content)
+    for previous, shard in zip(split, split[1:]):
+        assert previous.end == shard.start
+        assert shard.start == 0 or content[shard.start - 1 : shard.start] in (
+            b"\n",
+            b"",
+        )
+
+
+def test_split_script_lines(script):
+    content = script.read_bytes()
+
+    lines = [
+        line
+        for shard in split_script(script, 4)
+        for line in content[shard.start : shard.end].splitlines()
+    ]
+
+    assert lines == content.splitlines()
+
+
+def test_sharded_runner(sharded_repl, script, printed):
+    runner = ShardedRunner(sharded_repl, script, shards=4)
+
+    exit_code = runner.run()
+
+    output = printed(sharded_repl, sys.stdout)
+    assert sorted(output) == sorted(
+        [(f"echo {idx}\n",) for idx in range(100) if idx != 13]
+        + [("\033[91m[-]\033[0m line 14: unlucky\n",)]
+    )
+    assert exit_code == 1
+    assert [status.exit_code for status in runner.statuses].count(1) == 1
+    assert sum(status.executed for status in runner.statuses) == 99
+    assert sum(status.failed for status in runner.statuses) == 1
+    assert sum(status.lines for status in runner.statuses) == 100
+    assert all(status.progress == 1.0 for status in runner.statuses)
+    reports = printed(sharded_repl, sys.stderr)
+    assert len(reports) == 4 + 4  # progress, summary
+    progress = [message for _, message in reports[:4]]
+    # the last progress of every shard tells its commands as well
+    assert sorted(progress) == sorted(map(str, runner.statuses))
+
+
+def test_sharded_runner_missing_file(sharded_repl, tmp_path):
+    with pytest.raises(StopRiposteException):
+        ShardedRunner(sharded_repl, tmp_path / "foo.rpst", shards=2).run()
+
+
+@mock.patch("riposte.riposte.ShardedRunner")
+def test_run_sharded(mocked_runner, repl: Riposte, script):
+    repl.shards = 4
+    repl.parser.parse_args = mock.Mock(
+        return_value=mock.Mock(c="", file=str(script))
+    )
+    mocked_runner.return_value.run.return_value = 3
+
+    assert repl.run() == 3
+
+    mocked_runner.assert_called_once_with(repl, script, 4)
+    assert repl.exit_code == 3
+
+
+@mock.patch("riposte.riposte.ShardedRunner")
+def test_run_sharded_success(mocked_runner, repl: Riposte, script):
+    repl.shards = 4
+    repl.parser.parse_args = mock.Mock(
+        return_value=mock.Mock(c="", file=str(script))
+    )
+    mocked_runner.return_value.run.return_value = 0
+
+    assert repl.run() == 0
+
+
+@mock.patch("riposte.riposte.ShardedRunner")
+def test_run_sharded_pipe(mocked_runner, repl: Riposte, tmp_path):
+    path = tmp_path / "script.fifo"
+    os.mkfifo(path)
+    repl.shards = 4
+    repl.parser.parse_args = mock.Mock(
+        return_value=mock.Mock(c="", file=str(path))
+    )
+    repl._run_sequential = mock.Mock()
+
+    repl.run()
+
+    mocked_runner.assert_not_called()
+    repl._run_sequential.assert_called_once_with()
+
+
+def test_sharding_without_fork(monkeypatch, history_file, script):
+    monkeypatch.delattr("os.fork")
+
+    with pytest.raises(ValueError, match="fork"):
+        Riposte(history_file=history_file, shards=4)
+    with pytest.raises(ValueError, match="fork"):
+        ShardedRunner(mock.Mock(), script, shards=4)
+
+
+def test_shard_status():
+    status = ShardStatus(Shard(0, 10, 20))
+    status.position = 15
+
+    assert status.progress == 0.5